@@ -3,6 +3,8 @@
 import logging
 from fastapi import APIRouter, Depends, BackgroundTasks
 from backend.core.ingestion_service import ingestion_service
+from backend.core.backfill_service import backfill_service
+from backend.core.embedding_cache import embedding_cache
 
 router = APIRouter()
 
@@ -27,4 +29,36 @@ def trigger_gmail_ingestion(background_tasks: BackgroundTasks):
     """
     logging.info("API ENDPOINT: Received request to start Gmail ingestion.")
     background_tasks.add_task(run_ingestion_task)
-    return {"status": "success", "message": "Gmail ingestion process started in the background. Check terminal for progress."}
\ No newline at end of file
+    return {"status": "success", "message": "Gmail ingestion process started in the background. Check terminal for progress."}
+
+
+@router.post("/backfill", summary="Start a Full-Mailbox Backfill")
+def trigger_backfill(background_tasks: BackgroundTasks, restart: bool = False):
+    """
+    Walks every page of the mailbox in the background. An interrupted backfill resumes
+    from its last checkpoint unless `restart=true` is passed.
+    """
+    logging.info(f"API ENDPOINT: Received request to start a backfill (restart={restart}).")
+    if backfill_service.progress["running"]:
+        return {"status": "running", "message": "A backfill is already in progress.", "backfill": backfill_service.status()}
+    background_tasks.add_task(backfill_service.run, restart)
+    return {"status": "success", "message": "Backfill started in the background."}
+
+
+@router.get("/backfill", summary="Get Backfill Progress")
+def get_backfill_status():
+    """Returns the progress counters and saved checkpoint of the current or last backfill."""
+    return {"status": "success", "backfill": backfill_service.status()}
+
+
+
+@router.get("/pipeline", summary="Get Ingestion Pipeline Stats")
+def get_pipeline_stats():
+    """Queue depth, throughput and utilization of each stage of the current or last ingestion run."""
+    return {"status": "success", "pipeline": ingestion_service.pipeline_stats()}
+
+
+@router.get("/embedding-cache", summary="Get Embedding Cache Stats")
+def get_embedding_cache_stats():
+    """Size and lifetime hit rate of the persistent embedding cache."""
+    return {"status": "success", "embedding_cache": embedding_cache.stats()}
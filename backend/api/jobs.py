@@ -1,57 +1,82 @@
 # backend/api/jobs.py (Corrected Version)
 
 import logging
-from fastapi import APIRouter, HTTPException
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel, Field, ConfigDict
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 
-from backend.db.database import SessionLocal
-from backend.db import models
+from backend.api.pagination import decode_cursor, encode_cursor
+from backend.db.database import get_async_db
+from backend.db import crud
 
 router = APIRouter()
 
 # --- Pydantic Models for the API Response ---
+class JobTimelineEvent(BaseModel):
+    email_id: str
+    status: str
+    subject: Optional[str] = None
+    received_at: Optional[str] = None
+
 class JobResultItem(BaseModel):
-    id: str
+    id: int
+    thread_id: str
     company: Optional[str] = "Unknown Company"
-    subject: str
+    subject: Optional[str] = None
     # --- THE DEFINITIVE FIX ---
-    # The field name here MUST match the data source (models.Email.job_status)
-    job_status: str = Field(alias="status") 
+    # Latest status of the application, from its most recently received email
+    job_status: str = Field(alias="status")
+    latest_email_id: Optional[str] = None
+    email_count: int
+    last_updated_at: datetime
+    timeline: List[JobTimelineEvent]
 
     model_config = ConfigDict(
         # This allows us to still output 'status' in the JSON
         # while using 'job_status' in our Python code.
         populate_by_name=True
-    ) 
-        
+    )
+
 class JobsResponse(BaseModel):
     status: str = "success"
     results: List[JobResultItem]
+    # Pass back as `cursor` for the next page; null on the last page.
+    next_cursor: Optional[str] = None
+
 
-@router.get("/", response_model=JobsResponse, summary="Get all job-related emails")
-def get_job_applications():
-    logging.info("Fetching job application data from SQL database...")
-    db = SessionLocal()
+@router.get("/", response_model=JobsResponse, summary="Get job applications, most recently updated first")
+async def get_job_applications(
+    status: Optional[List[str]] = Query(None, description="Only applications whose latest status is one of these."),
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page."),
+    db: AsyncSession = Depends(get_async_db),
+):
+    logging.info("Fetching job applications from SQL database...")
+    position = decode_cursor(cursor) if cursor else None
     try:
-        job_categories = ['Applied', 'Interview', 'Offer', 'Rejected', 'Job Application']
-        
-        job_emails = db.query(models.Email).filter(
-            models.Email.job_status.in_(job_categories)
-        ).all()
+        # One row past the page tells us whether there is a next page.
+        applications = (await db.execute(
+            crud.job_applications_page_query(status, position, limit + 1)
+        )).scalars().all()
 
-        # This mapping will now work correctly because the field names match.
+        page = applications[:limit]
         results = [
             JobResultItem(
-                id=email.id,
-                company=email.job_company,
-                subject=email.subject,
-                job_status=email.job_status # Now maps to the correct field
-            ) for email in job_emails
+                id=application.id,
+                thread_id=application.thread_id,
+                company=application.company or "Unknown Company",
+                subject=application.subject,
+                status=application.status,
+                latest_email_id=application.latest_email_id,
+                email_count=application.email_count,
+                last_updated_at=application.last_updated_at,
+                timeline=application.timeline,
+            ) for application in page
         ]
-        return JobsResponse(results=results)
+        next_cursor = encode_cursor(page[-1].last_updated_at, page[-1].id) if len(applications) > limit else None
+        return JobsResponse(results=results, next_cursor=next_cursor)
     except Exception as e:
         logging.error(f"Error fetching job data: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Internal server error while fetching job data.")
-    finally:
-        db.close()
\ No newline at end of file
@@ -1,19 +1,95 @@
 # backend/api/logger.py
 
 import asyncio
+import json
 import logging
-from typing import List
-from fastapi import WebSocket, APIRouter, WebSocketDisconnect
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+from fastapi import WebSocket, APIRouter, WebSocketDisconnect, Query
+
+from backend.core.config import settings
 
 # --- NEW: Create the APIRouter instance ---
 # This is the 'router' that main.py was looking for.
 router = APIRouter()
 
-# --- Connection Manager (No changes needed) ---
+
+def log_record(record: logging.LogRecord, formatter: Optional[logging.Formatter] = None) -> dict:
+    """The structured form of a record that the log stream buffers and sends."""
+    entry = {"ts": round(record.created, 3), "level": record.levelname, "logger": record.name, "message": record.getMessage()}
+    if record.exc_info:
+        entry["exc"] = (formatter or logging.Formatter()).formatException(record.exc_info)
+    return entry
+
+
+class LogFilter:
+    """A viewer's subscription: a minimum level and, optionally, logger names (each including its children)."""
+    def __init__(self, level: str = "INFO", loggers: Optional[List[str]] = None):
+        levelno = logging.getLevelName(level.upper())
+        self.levelno = levelno if isinstance(levelno, int) else logging.INFO
+        self.loggers = [name for name in (loggers or []) if name]
+
+    def matches(self, entry: dict) -> bool:
+        if logging.getLevelName(entry["level"]) < self.levelno:
+            return False
+        if not self.loggers:
+            return True
+        name = entry["logger"]
+        return any(name == prefix or name.startswith(prefix + ".") for prefix in self.loggers)
+
+
+class _LogClient:
+    """One connected log viewer: its filter, a bounded drop-oldest queue of records and at most one send in flight."""
+    def __init__(self, websocket: WebSocket, queue_size: int, log_filter: LogFilter):
+        self.websocket = websocket
+        self.filter = log_filter
+        self.queue_size = queue_size
+        self.queue: Deque[dict] = deque(maxlen=queue_size)
+        self.dropped = 0
+        self.unreported_drops = 0
+        self.sending: Optional[asyncio.Task] = None
+
+    def enqueue(self, records: List[dict]):
+        records = [entry for entry in records if self.filter.matches(entry)]
+        overflow = max(0, len(self.queue) + len(records) - self.queue_size)
+        self.dropped += overflow
+        self.unreported_drops += overflow
+        self.queue.extend(records)
+
+    def take_frame(self) -> str:
+        """A JSON frame: {"records": [...]}, plus "dropped" when records were lost since the last frame."""
+        frame: Dict[str, Any] = {"records": list(self.queue)}
+        self.queue.clear()
+        if self.unreported_drops:
+            frame["dropped"] = self.unreported_drops
+            self.unreported_drops = 0
+        return json.dumps(frame, separators=(",", ":"))
+
+
+# --- Connection Manager ---
 class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
+    """
+    Fans log records out to the connected viewers without ever blocking the code that logs.
+    publish() only appends to an inbox and the replay buffer, from any thread. On the
+    event loop, a flusher moves the inbox into each viewer's bounded queue every
+    LOG_STREAM_FLUSH_INTERVAL_MS, keeping what the viewer's filter asks for, and sends
+    every viewer its backlog as one frame, concurrently; a slow viewer only loses its
+    own oldest records, and a dead or stuck one is disconnected.
+    """
+    def __init__(self, queue_size: Optional[int] = None, flush_interval_ms: Optional[int] = None,
+                 send_timeout: Optional[float] = None, buffer_size: Optional[int] = None):
+        self.queue_size = queue_size or settings.LOG_STREAM_QUEUE_SIZE
+        self.flush_interval = (flush_interval_ms or settings.LOG_STREAM_FLUSH_INTERVAL_MS) / 1000
+        self.send_timeout = send_timeout or settings.LOG_STREAM_SEND_TIMEOUT
+        self.clients: Dict[WebSocket, _LogClient] = {}
         self.main_loop = None
+        self._inbox: Deque[dict] = deque()
+        # The most recent records, replayed to each viewer when it connects.
+        self._buffer: Deque[dict] = deque(maxlen=buffer_size or settings.LOG_STREAM_BUFFER_SIZE)
+        self._lock = threading.Lock()
+        self._flusher: Optional[asyncio.Task] = None
+        self.counters = {"published": 0, "dropped": 0, "frames_sent": 0, "disconnected": 0}
 
     def set_main_loop(self):
         """Call this once on startup to capture the main event loop."""
@@ -24,47 +100,118 @@ class ConnectionManager:
             logging.error("Could not capture main event loop. Websocket logging will not work.")
             self.main_loop = None
 
-    async def connect(self, websocket: WebSocket):
+    def start(self):
+        """Captures the running loop and starts the flusher. Call from the app's startup."""
+        self.set_main_loop()
+        if self.main_loop and self._flusher is None:
+            self._flusher = self.main_loop.create_task(self._flush_loop())
+
+    async def stop(self):
+        if self._flusher:
+            self._flusher.cancel()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+            self._flusher = None
+
+    async def connect(self, websocket: WebSocket, log_filter: Optional[LogFilter] = None):
+        """Accepts a viewer and queues the buffered records that match its filter for the next frame."""
         await websocket.accept()
-        self.active_connections.append(websocket)
+        client = _LogClient(websocket, self.queue_size, log_filter or LogFilter())
+        with self._lock:
+            # Records still in the inbox are the newest in the buffer; the next flush delivers them.
+            client.enqueue(list(self._buffer)[:max(0, len(self._buffer) - len(self._inbox))])
+            self.clients[websocket] = client
 
     def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
+        """Forgets a viewer; safe to call more than once."""
+        client = self.clients.pop(websocket, None)
+        if client and client.sending and client.sending is not asyncio.current_task():
+            client.sending.cancel()
 
-    async def broadcast(self, message: str):
-        for connection in self.active_connections:
-            await connection.send_text(message)
+    def publish(self, entry: dict):
+        """Buffers a structured record and queues it for the connected viewers. Safe to call from any thread."""
+        with self._lock:
+            self._buffer.append(entry)
+            self.counters["published"] += 1
+            if not self.clients:
+                return
+            if len(self._inbox) >= self.queue_size:
+                self._inbox.popleft()
+                self.counters["dropped"] += 1
+            self._inbox.append(entry)
+
+    def flush(self):
+        """Hands the inbox to every viewer and starts a send for each one that is idle. Runs on the loop."""
+        with self._lock:
+            records = list(self._inbox)
+            self._inbox.clear()
+        for client in list(self.clients.values()):
+            if records:
+                before = client.dropped
+                client.enqueue(records)
+                self.counters["dropped"] += client.dropped - before
+            if client.queue and client.sending is None:
+                client.sending = asyncio.create_task(self._send(client, client.take_frame()))
+
+    async def _send(self, client: _LogClient, frame: str):
+        try:
+            await asyncio.wait_for(client.websocket.send_text(frame), self.send_timeout)
+            self.counters["frames_sent"] += 1
+        except Exception:
+            # Closed socket or a viewer that stopped reading; either way it is gone.
+            self.counters["disconnected"] += 1
+            self.disconnect(client.websocket)
+        finally:
+            client.sending = None
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            self.flush()
+
+    def stats(self) -> dict:
+        return {
+            **self.counters,
+            "buffered": len(self._buffer),
+            "clients": len(self.clients),
+            "viewers": [{"queued": len(client.queue), "dropped": client.dropped} for client in self.clients.values()],
+        }
 
 manager = ConnectionManager()
 
-# --- WebSocketLogHandler (No changes needed) ---
+# --- WebSocketLogHandler ---
 class WebSocketLogHandler(logging.Handler):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
     def emit(self, record):
-        """This method is called by the logging framework from any thread."""
-        log_entry = self.format(record)
-        if manager.main_loop and manager.main_loop.is_running():
-            asyncio.run_coroutine_threadsafe(
-                manager.broadcast(log_entry), 
-                manager.main_loop
-            )
-        else:
-            print(f"FALLBACK LOG: {log_entry}")
+        """Called by the logging framework from any thread; never waits on a viewer."""
+        try:
+            manager.publish(log_record(record, self.formatter))
+        except Exception:
+            self.handleError(record)
 
 # --- NEW: WebSocket Endpoint ---
 # This defines the actual API endpoint that the front end can connect to.
 @router.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
+async def websocket_endpoint(
+    websocket: WebSocket,
+    level: str = Query("INFO", description="Minimum level to stream, e.g. WARNING."),
+    logger: Optional[List[str]] = Query(None, description="Only these loggers (and their children)."),
+):
     """
-    WebSocket endpoint for streaming logs to the frontend.
+    WebSocket endpoint for streaming logs to the frontend, starting with a replay of recent
+    records. Each message is a JSON frame {"records": [{"ts", "level", "logger", "message"}, ...]}.
     """
-    await manager.connect(websocket)
+    await manager.connect(websocket, LogFilter(level, logger))
     try:
         while True:
             # Keep the connection alive
             await websocket.receive_text()
     except WebSocketDisconnect:
+        print("Log viewer client disconnected.")
+    finally:
         manager.disconnect(websocket)
-        print("Log viewer client disconnected.")
\ No newline at end of file
+
+@router.get("/stats", summary="Log stream counters (published, dropped, frames sent, viewers)")
+def log_stream_stats():
+    return manager.stats()
@@ -0,0 +1,22 @@
+# backend/api/pagination.py
+
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from fastapi import HTTPException
+
+
+def encode_cursor(timestamp: datetime, key) -> str:
+    """An opaque keyset cursor for the (timestamp, key) of the last row of a page."""
+    payload = json.dumps([timestamp.isoformat(), key])
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+def decode_cursor(cursor: str) -> tuple:
+    """The (timestamp, key) encoded by encode_cursor(); a malformed cursor is a 400."""
+    try:
+        timestamp, key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(timestamp), key
+    except (binascii.Error, ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail="Invalid cursor.") from e
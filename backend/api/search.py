@@ -1,20 +1,29 @@
 # backend/api/search.py
 
 import logging
-from fastapi import APIRouter, HTTPException, Query
+import time
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field, ConfigDict
-from typing import List
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal, Optional
 
 # --- KEY CHANGE: Import the correct, unified service ---
+from backend.core.config import settings
 from backend.core.ingestion_service import ingestion_service
-from backend.db.database import SessionLocal
-from backend.db import models
+from backend.core.metrics import SEARCH_REQUESTS, SEARCH_RESULTS, SEARCH_SECONDS
+from backend.core.search_service import SearchFilters, best_chunk_per_email, reciprocal_rank_fusion, search_service
+from backend.db.database import get_async_db
+from backend.db import crud, models
 
 router = APIRouter()
 
 class SearchResultItem(BaseModel):
     id: str; sender: str; subject: str
     preview: str = Field(..., alias="snippet")
+    # Reciprocal-rank fusion score; higher is better in every mode.
     relevance_score: float = Field(..., alias="distance")
     category: str; has_attachment: bool = Field(default=False)
     model_config = ConfigDict(populate_by_name=True)
@@ -22,61 +31,119 @@ class SearchResultItem(BaseModel):
 class SearchResponse(BaseModel):
     status: str = "success"; results: List[SearchResultItem]
 
-@router.get("/", response_model=SearchResponse, summary="Search emails via vector search")
-def search_emails(query: str = Query(..., min_length=2)):
+@router.get("/", response_model=SearchResponse, summary="Search emails (keyword, vector or hybrid)")
+async def search_emails(
+    query: str = Query(..., min_length=2),
+    mode: Literal["keyword", "vector", "hybrid"] = Query("hybrid", description="Which indexes to search."),
+    category: Optional[str] = Query(None, description="Only emails in this category, e.g. Receipt."),
+    sender: Optional[str] = Query(None, description="Only emails from this address."),
+    received_after: Optional[datetime] = Query(None, description="Only emails received at or after this date/time (UTC if no offset)."),
+    received_before: Optional[datetime] = Query(None, description="Only emails received before this date/time (UTC if no offset)."),
+    has_attachment: Optional[bool] = Query(None, description="Only emails with (true) or without (false) attachments."),
+    db: AsyncSession = Depends(get_async_db),
+):
     """
-    UPGRADED Search Implementation:
-    1. Queries ChromaDB for initial semantic candidates.
-    2. Enriches results with full data from the SQL database.
-    3. (Future enhancement) Could add a re-ranking step here.
+    Hybrid Search Implementation:
+    1. Queries ChromaDB for semantic candidates and the SQLite FTS5 index for keyword
+       candidates (or just one of them, depending on `mode`). With chunked body embeddings
+       on, the body chunks are searched too, each email ranked by its closest chunk.
+       Metadata filters are applied inside both queries, before their candidate limits.
+    2. Merges the ranked lists with reciprocal-rank fusion.
+    3. Enriches the top results with full data from the SQL database.
     """
-    logging.info(f"Received search query: '{query}'")
-    
-    # --- KEY CHANGE: Use the collection from our unified service ---
-    collection = ingestion_service.collection
-    if collection.count() == 0: return SearchResponse(results=[])
+    logging.info(f"Received search query: '{query}' (mode={mode})")
+    started = time.perf_counter()
+    timings = {}
+    outcome = "error"
+    filters = SearchFilters(category, sender, received_after, received_before, has_attachment)
 
     try:
-        # Step 1: Get top results from ChromaDB
-        chroma_results = collection.query(
-            query_texts=[query],
-            n_results=20, # Get a slightly larger pool of candidates
-            include=["metadatas", "documents", "distances"]
-        )
-        
-        email_ids = chroma_results['ids'][0]
-        if not email_ids: return SearchResponse(results=[])
+        rankings = []
+        if mode in ("vector", "hybrid"):
+            step_started = time.perf_counter()
+            # Encoding and Chroma are blocking, so they run on the threadpool.
+            rankings.append(await run_in_threadpool(_vector_candidates, query, filters, mode))
+            timings["vector"] = time.perf_counter() - step_started
+            if settings.EMBED_CHUNKS_ENABLED:
+                step_started = time.perf_counter()
+                rankings.append(await run_in_threadpool(_chunk_candidates, query, filters, mode))
+                timings["chunks"] = time.perf_counter() - step_started
+        if mode in ("keyword", "hybrid"):
+            step_started = time.perf_counter()
+            conditions = filters.sql_conditions()
+            rankings.append(await db.run_sync(lambda session: crud.keyword_search(session, query, settings.SEARCH_CANDIDATES, conditions)))
+            timings["keyword"] = time.perf_counter() - step_started
 
-        # Step 2: Enrich with SQL data
-        db = SessionLocal()
-        try:
-            sql_emails_dict = {email.id: email for email in db.query(models.Email).filter(models.Email.id.in_(email_ids)).all()}
-        finally:
-            db.close()
+        fused = reciprocal_rank_fusion(rankings, k=settings.SEARCH_RRF_K)[:settings.SEARCH_RESULT_LIMIT]
+        if not fused:
+            outcome = "empty"
+            return SearchResponse(results=[])
 
-        # Step 3: Combine and format results
-        formatted_results = []
-        for i in range(len(email_ids)):
-            email_id = email_ids[i]
-            if email_id in sql_emails_dict:
-                sql_email = sql_emails_dict[email_id]
-                formatted_results.append(SearchResultItem(
-                    id=email_id,
-                    distance=chroma_results['distances'][0][i],
-                    snippet=chroma_results['documents'][0][i],
-                    sender=sql_email.sender,
-                    subject=sql_email.subject,
-                    category=sql_email.category,
-                    has_attachment=len(sql_email.attachments) > 0
-                ))
-        
-        # Here you could add a re-ranking model in the future to improve this sort order
-        # For now, we sort by the distance score from ChromaDB (lower is better)
-        formatted_results.sort(key=lambda x: x.relevance_score)
-        
-        return SearchResponse(results=formatted_results[:15]) # Return the top 15 after sorting
+        # Enrich with SQL data
+        step_started = time.perf_counter()
+        email_ids = [email_id for email_id, _ in fused]
+        sql_emails = (await db.execute(select(models.Email).where(models.Email.id.in_(email_ids)))).scalars()
+        sql_emails_dict = {email.id: email for email in sql_emails}
+        timings["enrich"] = time.perf_counter() - step_started
+
+        formatted_results = [
+            SearchResultItem(
+                id=email_id,
+                distance=round(score, 5),
+                snippet=sql_emails_dict[email_id].snippet or "",
+                sender=sql_emails_dict[email_id].sender or "",
+                subject=sql_emails_dict[email_id].subject or "",
+                category=sql_emails_dict[email_id].category or "General",
+                has_attachment=sql_emails_dict[email_id].attachment_count > 0,
+            )
+            for email_id, score in fused if email_id in sql_emails_dict
+        ]
+        outcome = "ok"
+        SEARCH_RESULTS.observe(len(formatted_results), mode=mode)
+        return SearchResponse(results=formatted_results)
 
     except Exception as e:
         logging.error(f"Error during search: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Internal server error during search.")
-    
\ No newline at end of file
+    finally:
+        timings["total"] = time.perf_counter() - started
+        for step, seconds in timings.items():
+            SEARCH_SECONDS.observe(seconds, mode=mode, step=step)
+        SEARCH_REQUESTS.inc(mode=mode, outcome=outcome)
+        step_times = ", ".join(f"{name} {seconds * 1000:.1f}" for name, seconds in timings.items() if name != "total")
+        logging.info(f"Search mode={mode} took {timings['total'] * 1000:.1f} ms ({step_times})")
+
+def _vector_candidates(query: str, filters: SearchFilters, mode: str = "vector") -> List[str]:
+    """Email IDs nearest to the query embedding among those matching `filters`, closest first."""
+    # --- KEY CHANGE: Use the collection from our unified service ---
+    collection = ingestion_service.collection
+    if collection.count() == 0:
+        return []
+    with SEARCH_SECONDS.time(mode=mode, step="embed"):
+        query_embedding = search_service.embed_query(query)
+    chroma_results = collection.query(
+        query_embeddings=[query_embedding],
+        n_results=settings.SEARCH_CANDIDATES,
+        where=filters.chroma_where(),
+        include=["distances"],
+    )
+    return chroma_results['ids'][0] if chroma_results.get('ids') else []
+
+def _chunk_candidates(query: str, filters: SearchFilters, mode: str = "vector") -> List[str]:
+    """Email IDs whose closest body chunk is nearest to the query, among those matching `filters`."""
+    collection = ingestion_service.chunk_collection
+    if collection.count() == 0:
+        return []
+    query_embedding = search_service.embed_query(query)
+    chroma_results = collection.query(
+        query_embeddings=[query_embedding],
+        n_results=settings.SEARCH_CANDIDATES * settings.SEARCH_CHUNK_OVERSAMPLE,
+        where=filters.chroma_where(),
+        include=["metadatas"],
+    )
+    metadatas = chroma_results['metadatas'][0] if chroma_results.get('metadatas') else []
+    return best_chunk_per_email(metadatas)[:settings.SEARCH_CANDIDATES]
+
+@router.get("/cache", summary="Query embedding cache statistics")
+def query_cache_stats():
+    return search_service.query_cache.stats()
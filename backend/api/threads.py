@@ -0,0 +1,51 @@
+# backend/api/threads.py
+
+import logging
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+
+from backend.api.pagination import decode_cursor, encode_cursor
+from backend.db.database import get_async_db
+from backend.db import crud
+
+router = APIRouter()
+
+# --- Pydantic Models for the API Response ---
+class ThreadItem(BaseModel):
+    thread_id: str
+    subject: Optional[str] = None
+    message_count: int
+    participants: List[str]
+    first_received_at: Optional[datetime] = None
+    last_received_at: datetime
+    latest_email_id: Optional[str] = None
+    latest_category: Optional[str] = None
+    latest_job_status: Optional[str] = None
+
+class ThreadsResponse(BaseModel):
+    status: str = "success"
+    results: List[ThreadItem]
+    # Pass back as `cursor` for the next page; null on the last page.
+    next_cursor: Optional[str] = None
+
+@router.get("/", response_model=ThreadsResponse, summary="Get conversations, most recently active first")
+async def get_threads(
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page."),
+    db: AsyncSession = Depends(get_async_db),
+):
+    position = decode_cursor(cursor) if cursor else None
+    try:
+        # One row past the page tells us whether there is a next page.
+        threads = (await db.execute(crud.threads_page_query(position, limit + 1))).scalars().all()
+
+        page = threads[:limit]
+        results = [ThreadItem.model_validate(thread, from_attributes=True) for thread in page]
+        next_cursor = encode_cursor(page[-1].last_received_at, page[-1].thread_id) if len(threads) > limit else None
+        return ThreadsResponse(results=results, next_cursor=next_cursor)
+    except Exception as e:
+        logging.error(f"Error fetching threads: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Internal server error while fetching threads.")
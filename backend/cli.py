@@ -0,0 +1,40 @@
+"""Command-line entry points for long-running maintenance jobs.
+
+Usage::
+
+    python -m backend.cli backfill [--restart] [--workers N]
+    python -m backend.cli refresh-metadata
+"""
+import argparse
+import logging
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m backend.cli", description="Aperture maintenance commands.")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    backfill = subcommands.add_parser("backfill", help="Ingest the whole mailbox, resuming from the last checkpoint.")
+    backfill.add_argument("--restart", action="store_true", help="Ignore any saved checkpoint and start from the first page.")
+    backfill.add_argument("--workers", type=int, default=None, help="Gmail fetch threads in the ingestion pipeline.")
+
+    subcommands.add_parser("refresh-metadata", help="Rewrite the search metadata of every indexed email from SQLite.")
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(name)s - %(message)s")
+
+    from backend.db.migrate import run_migrations
+    run_migrations()
+
+    if args.command == "backfill":
+        # Imported here so `--help` doesn't pay for loading the models.
+        from backend.core.backfill_service import backfill_service
+        result = backfill_service.run(restart=args.restart, workers=args.workers)
+        if result.get("error"):
+            raise SystemExit(1)
+    elif args.command == "refresh-metadata":
+        from backend.core.ingestion_service import ingestion_service
+        ingestion_service.refresh_vector_metadata()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+# backend/core/backfill_service.py
+
+import json
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Deque, Optional
+
+from backend.core.auth_service import build_google_service, get_user_credentials
+from backend.core.config import settings
+from backend.core.embedding_cache import embedding_cache
+from backend.core.gmail_client import list_message_ids
+from backend.core.ingestion_service import PRIMARY_QUERY, ingestion_service
+from backend.db import crud
+from backend.db.database import SessionLocal, WriterSession
+
+# sync_state key holding the JSON checkpoint of an unfinished backfill.
+CHECKPOINT_KEY = "backfill_checkpoint"
+
+
+@dataclass
+class _PendingChunk:
+    """A chunk of message IDs submitted to the pipeline, in listing order."""
+    page_token: Optional[str]
+    last_id: Optional[str]
+    next_page_token: Optional[str]
+    last_of_page: bool
+    future: Future
+
+
+class BackfillService:
+    """
+    Walks every page of the mailbox and feeds the message IDs, a chunk at a time, into
+    the ingestion pipeline. Progress is checkpointed to SQLite as (page token, last
+    processed ID in that page), so an interrupted backfill resumes where it stopped.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.progress = {"running": False, "pages": 0, "processed": 0, "started_at": None, "finished_at": None, "error": None}
+
+    def status(self) -> dict:
+        return {**self.progress, "checkpoint": self.load_checkpoint()}
+
+    def load_checkpoint(self) -> dict:
+        db = SessionLocal()
+        try:
+            value = crud.get_sync_value(db, CHECKPOINT_KEY)
+            return json.loads(value) if value else {}
+        finally:
+            db.close()
+
+    def save_checkpoint(self, checkpoint: Optional[dict]):
+        db = WriterSession()
+        try:
+            crud.set_sync_value(db, CHECKPOINT_KEY, json.dumps(checkpoint) if checkpoint else None)
+            db.commit()
+        finally:
+            db.close()
+
+    def run(self, restart: bool = False, workers: Optional[int] = None, query: str = PRIMARY_QUERY) -> dict:
+        """Runs a backfill to completion (or first failure). Only one backfill runs at a time."""
+        if not self._lock.acquire(blocking=False):
+            logging.warning("A backfill is already running; ignoring this request.")
+            return self.status()
+        try:
+            self.progress.update(running=True, pages=0, processed=0, started_at=time.time(), finished_at=None, error=None)
+            self._run(restart, workers or settings.PIPELINE_FETCH_WORKERS, query)
+        except Exception as e:
+            self.progress["error"] = str(e)
+            logging.error(f"BACKFILL FAILED: {e}. Progress is checkpointed; run again to resume.", exc_info=True)
+        finally:
+            self.progress.update(running=False, finished_at=time.time())
+            self._lock.release()
+        return self.status()
+
+    def _run(self, restart: bool, workers: int, query: str):
+        creds = get_user_credentials()
+        if not creds:
+            raise RuntimeError("No valid credentials found.")
+
+        checkpoint = {} if restart else self.load_checkpoint()
+        page_token = checkpoint.get("page_token")
+        watermark = checkpoint.get("watermark")
+        if checkpoint:
+            logging.info(f"Resuming backfill from checkpoint {checkpoint}")
+        else:
+            logging.info(f"Starting full-mailbox backfill with {workers} Gmail fetch workers...")
+
+        lister = build_google_service(creds)
+        in_flight: Deque[_PendingChunk] = deque()
+        max_in_flight = workers * 2
+        started = time.perf_counter()
+        cache_before = embedding_cache.lookups()
+
+        pipeline = ingestion_service.start_pipeline(creds, fetch_workers=workers)
+        try:
+            while True:
+                message_ids, next_page_token = list_message_ids(lister, query, settings.BACKFILL_PAGE_SIZE, page_token)
+                self.progress["pages"] += 1
+                if watermark in message_ids:
+                    # Everything up to the watermark was stored before the restart.
+                    message_ids = message_ids[message_ids.index(watermark) + 1:]
+                watermark = None
+                # One IN query per page keeps already-stored mail out of the pipeline entirely.
+                message_ids = ingestion_service.filter_new_ids(message_ids)
+
+                chunks = [message_ids[i:i + settings.BACKFILL_CHUNK_SIZE] for i in range(0, len(message_ids), settings.BACKFILL_CHUNK_SIZE)]
+                if not chunks:
+                    done: Future = Future()
+                    done.set_result(0)
+                    in_flight.append(_PendingChunk(page_token, None, next_page_token, True, done))
+                for index, chunk in enumerate(chunks):
+                    # Bound the chunks queued ahead of the oldest unfinished one so memory stays flat.
+                    while len(in_flight) >= max_in_flight:
+                        self._complete_oldest(in_flight, started)
+                    last_of_page = index == len(chunks) - 1
+                    tracker = ingestion_service.submit(pipeline, chunk)
+                    in_flight.append(_PendingChunk(page_token, chunk[-1], next_page_token, last_of_page, tracker.future))
+
+                if not next_page_token:
+                    break
+                page_token = next_page_token
+
+            while in_flight:
+                self._complete_oldest(in_flight, started)
+        finally:
+            pipeline.close()
+
+        self.save_checkpoint(None)
+        logging.info(f"BACKFILL COMPLETE: {self.progress['processed']} messages checked across {self.progress['pages']} pages.")
+        embedding_cache.log_cycle(cache_before, "the backfill")
+
+    def _complete_oldest(self, in_flight: Deque[_PendingChunk], started: float):
+        """
+        Waits for the oldest chunk and advances the checkpoint past it. Chunks complete
+        in any order, but the checkpoint only moves over a contiguous prefix.
+        """
+        pending = in_flight.popleft()
+        # A chunk that failed (e.g. messages Gmail kept answering 429/5xx for) raises here,
+        # ending the run with the checkpoint still before it, so a rerun resumes from it.
+        self.progress["processed"] += pending.future.result()
+        if pending.last_of_page:
+            self.save_checkpoint({"page_token": pending.next_page_token, "watermark": None} if pending.next_page_token else None)
+        else:
+            self.save_checkpoint({"page_token": pending.page_token, "watermark": pending.last_id})
+
+        elapsed = time.perf_counter() - started
+        rate = self.progress["processed"] / elapsed if elapsed > 0 else 0.0
+        logging.info(f"Backfill progress: {self.progress['processed']} messages, {self.progress['pages']} pages listed ({rate:.1f} msg/s)")
+
+# The singleton instance that the API and CLI use
+backfill_service = BackfillService()
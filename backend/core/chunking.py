@@ -0,0 +1,21 @@
+# backend/core/chunking.py
+
+from typing import List, Optional
+
+
+def chunk_text(text: str, max_tokens: int, overlap: int, max_chunks: Optional[int] = None) -> List[str]:
+    """
+    Splits `text` into windows of at most `max_tokens` whitespace-separated tokens, each
+    starting `max_tokens - overlap` tokens after the previous one, so a sentence cut at a
+    window edge is still whole in the next window. Stops after `max_chunks` windows.
+    """
+    tokens = text.split()
+    if not tokens:
+        return []
+    step = max(1, max_tokens - overlap)
+    chunks = []
+    for start in range(0, len(tokens), step):
+        chunks.append(" ".join(tokens[start:start + max_tokens]))
+        if start + max_tokens >= len(tokens) or (max_chunks and len(chunks) >= max_chunks):
+            break
+    return chunks
@@ -1,59 +1,144 @@
 # backend/core/classification_service.py
 
-import re
-import spacy
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from typing import List, Optional, Tuple
+
+from backend.core.config import settings
+from backend.core.keyword_matcher import KeywordMatcher
+from backend.core.metrics import CLASSIFICATION_SECONDS, CLASSIFIED_EMAILS
+from backend.core.model_registry import NER_MODEL, model_registry
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "classification_rules.json")
 
 class ClassificationService:
-    def __init__(self):
+    def __init__(self, rules_path: str | None = None):
+        """
+        Initializes the classification service with the rules file. The spaCy model is
+        loaded by the model registry the first time NER is needed.
+        """
+        self.rules_path = rules_path or settings.CLASSIFICATION_RULES_PATH or DEFAULT_RULES_PATH
+        self._rules_mtime = None
+        self._last_reload_check = 0.0
+        self._reload_lock = threading.Lock()
+        self.reload_rules()
+
+    def reload_rules(self):
         """
-        Initializes the classification service with NLP model and predefined rules.
+        Reads the rules file and compiles each rule table into a single matcher.
+        The new matchers are swapped in together, so concurrent classifications see
+        either the old rules or the new ones, never a mix.
         """
-        self.nlp = spacy.load("en_core_web_sm")
-        self.general_rules = {
-            "Job Application": [
-                "application", "applied", "resume", "cv", "interview", "recruiting", 
-                "talent acquisition", "we've received your application", "next steps", "coding challenge"
-            ],
-            "Receipt": ["receipt", "invoice", "order confirmation", "your order", "billing statement"],
-            "Newsletter": ["unsubscribe", "view in browser", "newsletter", "daily digest"]
-        }
-        self.job_status_rules = {
-            "Rejected": ["unfortunately", "not been selected", "other candidates", "filled the position"],
-            "Interview": ["interview", "coding challenge", "assessment", "next steps"],
-            "Offer": ["offer of employment", "job offer"],
-            "Applied": ["application received", "we've received your application", "confirming your application"]
-        }
-        self.common_orgs_to_ignore = ["gmail", "linkedin", "indeed", "glassdoor"]
+        with open(self.rules_path, "r") as rules_file:
+            rules = json.load(rules_file)
+        general_rules = rules["general_rules"]
+        job_status_rules = rules["job_status_rules"]
+        self._rules = (
+            general_rules,
+            job_status_rules,
+            [org.lower() for org in rules.get("common_orgs_to_ignore", [])],
+            KeywordMatcher(general_rules),
+            KeywordMatcher(job_status_rules),
+        )
+        self._rules_mtime = os.path.getmtime(self.rules_path)
+        logging.info(f"Loaded classification rules from {self.rules_path}")
+
+    def _maybe_reload_rules(self):
+        """Picks up edits to the rules file, checking its mtime at most every few seconds."""
+        now = time.monotonic()
+        if now - self._last_reload_check < settings.CLASSIFICATION_RULES_RELOAD_INTERVAL:
+            return
+        if not self._reload_lock.acquire(blocking=False):
+            return
+        try:
+            self._last_reload_check = now
+            if os.path.getmtime(self.rules_path) != self._rules_mtime:
+                self.reload_rules()
+        except (OSError, ValueError, KeyError) as e:
+            # A half-written or broken file keeps the previous rules in place.
+            logging.error(f"Could not reload classification rules: {e}")
+        finally:
+            self._reload_lock.release()
+
+    @property
+    def nlp(self):
+        return model_registry.get(NER_MODEL)
+
+    @property
+    def general_rules(self) -> dict:
+        return self._rules[0]
+
+    @property
+    def job_status_rules(self) -> dict:
+        return self._rules[1]
+
+    @property
+    def common_orgs_to_ignore(self) -> list:
+        return self._rules[2]
 
     def classify_email(self, subject: str, body: str) -> dict:
         """
         Classifies an email and extracts job details if applicable.
         Returns a dictionary with category, company, and status.
         """
+        with CLASSIFICATION_SECONDS.time(step="rules"):
+            result = self._classify_by_rules(subject, body)
+        if result["category"] == "Job Application":
+            with CLASSIFICATION_SECONDS.time(step="ner"):
+                doc = self.nlp(self._ner_text(subject, body))
+                result["company"] = self._extract_company_name(doc)
+        CLASSIFIED_EMAILS.inc(category=result["category"])
+        return result
+
+    def classify_emails(
+        self,
+        emails: List[Tuple[str, str]],
+        batch_size: Optional[int] = None,
+        n_process: Optional[int] = None,
+    ) -> List[dict]:
+        """
+        Batch version of classify_email for a list of (subject, body) pairs. The rules run
+        per email; the job applications among them go through NER together in nlp.pipe.
+        """
+        with CLASSIFICATION_SECONDS.time(step="rules"):
+            results = [self._classify_by_rules(subject, body) for subject, body in emails]
+        job_indexes = [i for i, result in enumerate(results) if result["category"] == "Job Application"]
+        if job_indexes:
+            with CLASSIFICATION_SECONDS.time(step="ner"):
+                texts = [self._ner_text(*emails[i]) for i in job_indexes]
+                docs = self.nlp.pipe(
+                    texts,
+                    batch_size=batch_size or settings.NER_BATCH_SIZE,
+                    n_process=n_process or settings.NER_N_PROCESS,
+                )
+                for i, doc in zip(job_indexes, docs):
+                    results[i]["company"] = self._extract_company_name(doc)
+        for category, count in Counter(result["category"] for result in results).items():
+            CLASSIFIED_EMAILS.inc(count, category=category)
+        return results
+
+    def _classify_by_rules(self, subject: str, body: str) -> dict:
+        self._maybe_reload_rules()
+        _, _, _, category_matcher, status_matcher = self._rules
         text_to_check = f"{subject.lower()} {body.lower()}"
-        
-        # Step 1: General Classification
-        category = "General"
-        for cat, keywords in self.general_rules.items():
-            if any(re.search(r'\b' + re.escape(kw) + r'\b', text_to_check) for kw in keywords):
-                category = cat
-                break
-
-        # Step 2: If it's a job application, extract details
-        company = None
+
+        # Step 1: General Classification (rule order is priority order)
+        category = category_matcher.first_match(text_to_check) or "General"
+
+        # Step 2: If it's a job application, determine its status (the company comes from NER)
         status = None
         if category == "Job Application":
-            doc = self.nlp(f"{subject}\n{body[:500]}") # Process subject and first 500 chars of body
-            company = self._extract_company_name(doc)
-            status = self._determine_job_status(text_to_check)
+            status = status_matcher.first_match(text_to_check) or "Applied"
 
-        return {"category": category, "company": company, "status": status}
+        return {"category": category, "company": None, "status": status}
 
-    def _determine_job_status(self, text: str) -> str:
-        for status, keywords in self.job_status_rules.items():
-            if any(re.search(r'\b' + re.escape(kw) + r'\b', text) for kw in keywords):
-                return status
-        return "Applied" # Default status for a job email
+    @staticmethod
+    def _ner_text(subject: str, body: str) -> str:
+        return f"{subject}\n{body[:500]}" # Process subject and first 500 chars of body
 
     def _extract_company_name(self, doc) -> str | None:
         for ent in doc.ents:
@@ -63,4 +148,3 @@ class ClassificationService:
 
 # Create a single, importable instance of the service
 classification_service = ClassificationService()
-
@@ -9,9 +9,133 @@ class Settings(BaseSettings):
     SQLITE_PATH: str = "aperture_local.db"
     CHROMA_DB_PATH: str = "chroma_db"
 
+    # --- SQLite storage profile ---
+    # "tuned" applies the pragmas and reader pool below; "default" leaves SQLite and the pool as shipped.
+    SQLITE_PROFILE: str = "tuned"
+    # WAL lets readers keep going while the ingestion writer commits.
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    # NORMAL is durable across app crashes in WAL mode; only an OS crash can lose the last commits.
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    # Bytes of the database file to memory-map for reads.
+    SQLITE_MMAP_SIZE: int = 268435456
+    # Page cache per connection; negative values are KiB (-65536 = 64 MB).
+    SQLITE_CACHE_SIZE: int = -65536
+    # How long a connection waits on a locked database before raising "database is locked".
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    # Reader connections kept open, plus how many more may be opened under load.
+    SQLITE_POOL_SIZE: int = 8
+    SQLITE_MAX_OVERFLOW: int = 8
+    # Seconds a write waits for the single writer connection before giving up.
+    SQLITE_WRITER_TIMEOUT: float = 60.0
+
+    # --- Models (loaded once per process, see backend/core/model_registry.py) ---
+    SPACY_MODEL_NAME: str = "en_core_web_sm"
+    EMBEDDING_MODEL_NAME: str = "all-MiniLM-L6-v2"
+    # How the embedding model runs (see backend/core/encoders.py): "torch" (SentenceTransformer, fp32),
+    # "torch_int8" (the same model with int8 dynamically quantized Linear layers) or "onnx" (ONNX Runtime).
+    EMBEDDING_BACKEND: str = "torch"
+    # ONNX file in the model's repo (or local directory) for the "onnx" backend. The sentence-transformers
+    # repos also ship int8 exports, e.g. onnx/model_qint8_avx512_vnni.onnx.
+    EMBEDDING_ONNX_FILE: str = "onnx/model.onnx"
+    # CPU threads for the torch_int8 and onnx backends; 0 keeps the runtime's default.
+    EMBEDDING_THREADS: int = 0
+    # Load every model in a background thread as soon as the server starts, instead of on first use.
+    MODEL_WARMUP_ON_STARTUP: bool = True
+
+    # --- Search ---
+    # Query embeddings kept in the search LRU cache.
+    QUERY_EMBEDDING_CACHE_SIZE: int = 1024
+    # Candidates taken from each of the vector and keyword indexes before fusing.
+    SEARCH_CANDIDATES: int = 20
+    # Results returned by /search.
+    SEARCH_RESULT_LIMIT: int = 15
+    # Reciprocal-rank fusion constant; larger values flatten the advantage of the top ranks.
+    SEARCH_RRF_K: int = 60
+
+    # --- Gmail fetching ---
+    # Number of messages requested per Gmail batch HTTP call (the API caps this at 100).
+    GMAIL_BATCH_SIZE: int = 50
+    # How many times a failed sub-request is retried before it is given up on.
+    GMAIL_BATCH_MAX_RETRIES: int = 3
+    # Base delay in seconds for the exponential backoff between retry rounds.
+    GMAIL_BATCH_RETRY_BACKOFF: float = 1.0
+
+    # --- Message parsing ---
+    # Most bytes of text/plain (and, separately, text/html) decoded per message; the rest is skipped.
+    MIME_MAX_BODY_BYTES: int = 262144
+
+    # --- Full-mailbox backfill ---
+    # Message IDs requested per messages.list page (Gmail allows up to 500).
+    BACKFILL_PAGE_SIZE: int = 500
+    # Message IDs submitted to the pipeline at a time; also the checkpoint granularity.
+    BACKFILL_CHUNK_SIZE: int = 50
+
+    # --- Ingestion pipeline (fetch -> parse -> classify -> embed -> persist) ---
+    # Capacity of the bounded queue in front of each stage; a full queue blocks its producer.
+    PIPELINE_QUEUE_SIZE: int = 100
+    # Threads per stage. Persisting always uses a single writer thread.
+    PIPELINE_FETCH_WORKERS: int = 4
+    PIPELINE_PARSE_WORKERS: int = 2
+    PIPELINE_CLASSIFY_WORKERS: int = 2
+    PIPELINE_EMBED_WORKERS: int = 1
+    # Emails the writer groups into one commit and one Chroma add.
+    PIPELINE_PERSIST_BATCH_SIZE: int = 64
+
+    # --- Embedding ---
+    # Texts encoded per SentenceTransformer.encode call during ingestion.
+    EMBED_BATCH_SIZE: int = 64
+    # Seconds the embed stage waits for a micro-batch to fill before encoding what it has.
+    EMBED_FLUSH_TIMEOUT: float = 0.2
+
+    # Keep the vectors of texts already encoded, so duplicate and templated mail is encoded once.
+    EMBEDDING_CACHE_ENABLED: bool = True
+    # SQLite file of the embedding cache, separate from the main database.
+    EMBEDDING_CACHE_PATH: str = "embedding_cache.db"
+    # Cached vectors kept; the least recently used beyond this are evicted (384-dim: ~1.6 KB each).
+    EMBEDDING_CACHE_MAX_ENTRIES: int = 200000
+
+    # --- Chunked body embeddings ---
+    # Also embed each email's full body, in overlapping chunks, into the "email_chunks" collection.
+    # Search then matches text past the subject and snippet. Costs one vector per chunk at ingest.
+    EMBED_CHUNKS_ENABLED: bool = False
+    # Whitespace tokens per chunk; 128 words stays under the encoder's 256 word-piece input limit.
+    EMBED_CHUNK_TOKENS: int = 128
+    # Tokens shared by consecutive chunks.
+    EMBED_CHUNK_OVERLAP: int = 32
+    # Chunks embedded per email; the rest of a very long body is not indexed.
+    EMBED_MAX_CHUNKS_PER_EMAIL: int = 16
+    # Chunk hits fetched per search, as a multiple of SEARCH_CANDIDATES, before collapsing to one per email.
+    SEARCH_CHUNK_OVERSAMPLE: int = 4
+
+    # --- Classification ---
+    # JSON rules file; empty means the bundled backend/core/classification_rules.json.
+    CLASSIFICATION_RULES_PATH: str = ""
+    # Seconds between checks of the rules file's mtime for hot reloading.
+    CLASSIFICATION_RULES_RELOAD_INTERVAL: float = 5.0
+    # Texts per spaCy nlp.pipe batch when extracting company names.
+    NER_BATCH_SIZE: int = 64
+    # spaCy worker processes for nlp.pipe; 1 runs NER in the calling thread.
+    NER_N_PROCESS: int = 1
+    # Seconds the classify stage waits to gather a page of emails before running NER on what it has.
+    CLASSIFY_FLUSH_TIMEOUT: float = 0.1
+
+    # --- Metrics ---
+    # Record stage/step timings and counters for /metrics; off makes every recording call a no-op.
+    METRICS_ENABLED: bool = True
+
+    # --- Log streaming (the /log/ws viewer) ---
+    # Records buffered per viewer; when a viewer falls behind, its oldest records are dropped.
+    LOG_STREAM_QUEUE_SIZE: int = 1000
+    # Milliseconds between frames; records logged in between go out together.
+    LOG_STREAM_FLUSH_INTERVAL_MS: int = 100
+    # Seconds a single frame may take to send before the viewer is disconnected.
+    LOG_STREAM_SEND_TIMEOUT: float = 10.0
+    # Most recent records kept in memory and replayed to each viewer when it connects.
+    LOG_STREAM_BUFFER_SIZE: int = 500
+
     class Config:
         # This tells pydantic-settings to look for a .env file
         env_file = ".env"
 
 # Create a single, importable instance of the settings
-settings = Settings()
\ No newline at end of file
+settings = Settings()
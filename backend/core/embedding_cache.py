@@ -0,0 +1,139 @@
+# backend/core/embedding_cache.py
+
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from backend.core.config import settings
+from backend.core.encoders import encoder_id
+from backend.core.metrics import EMBEDDING_CACHE_LOOKUPS
+
+
+def normalize_text(text: str) -> str:
+    """Whitespace-insensitive form of a text; the tokenizer splits on whitespace, so runs and line breaks don't change the vector."""
+    return " ".join(text.split())
+
+
+class EmbeddingCache:
+    """
+    A persistent map from (model, normalized text) to its embedding, so duplicate and
+    templated mail (notifications, receipts, recruiter templates) is encoded once.
+    Entries live in their own SQLite file, keyed by a SHA-256 of the model name and the
+    text, and the least recently used ones are evicted beyond `max_entries`.
+    The file is opened on first use; all access goes through one connection and a lock.
+    """
+    def __init__(self, path: str, model_name: str, max_entries: int):
+        self.path = path
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self._conn: Optional[sqlite3.Connection] = None
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key BLOB PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_embeddings_last_used ON embeddings (last_used)")
+            conn.commit()
+            self._size = conn.execute("SELECT count(*) FROM embeddings").fetchone()[0]
+            self._conn = conn
+        return self._conn
+
+    def key(self, text: str) -> bytes:
+        return hashlib.sha256(f"{self.model_name}\0{normalize_text(text)}".encode()).digest()
+
+    def get_many(self, keys: Sequence[bytes]) -> List[Optional[np.ndarray]]:
+        """The cached vector for each key, or None; hits are marked as recently used."""
+        found: Dict[bytes, np.ndarray] = {}
+        with self._lock:
+            conn = self._connection()
+            unique = list(dict.fromkeys(keys))
+            # SQLite allows 999 bound parameters per statement in older builds.
+            for start in range(0, len(unique), 900):
+                page = unique[start:start + 900]
+                rows = conn.execute(f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(page))})", page)
+                found.update((key, np.frombuffer(vector, dtype=np.float32)) for key, vector in rows)
+            if found:
+                now = time.time()
+                conn.executemany("UPDATE embeddings SET last_used = ? WHERE key = ?", [(now, key) for key in found])
+                conn.commit()
+        return [found.get(key) for key in keys]
+
+    def put_many(self, keys: Sequence[bytes], vectors: Sequence[np.ndarray]):
+        now = time.time()
+        rows = [(key, np.asarray(vector, dtype=np.float32).tobytes(), now) for key, vector in zip(keys, vectors)]
+        with self._lock:
+            conn = self._connection()
+            before = conn.total_changes
+            conn.executemany("INSERT OR IGNORE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)", rows)
+            self._size += conn.total_changes - before
+            if self._size > self.max_entries:
+                excess = self._size - self.max_entries
+                conn.execute("DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY last_used LIMIT ?)", (excess,))
+                self._size -= excess
+            conn.commit()
+
+    def encode(self, encoder, texts: List[str], batch_size: int) -> np.ndarray:
+        """
+        Embeds `texts` like encoder.encode(texts, batch_size=...), encoding only the texts
+        that are neither cached nor repeated earlier in the same call.
+        """
+        keys = [self.key(text) for text in texts]
+        cached = self.get_many(keys)
+        missing: Dict[bytes, int] = {}
+        for index, (key, vector) in enumerate(zip(keys, cached)):
+            if vector is None:
+                missing.setdefault(key, index)
+        hits = len(texts) - len(missing)
+        by_key: Dict[bytes, np.ndarray] = {}
+        if missing:
+            encoded = encoder.encode([texts[index] for index in missing.values()], batch_size=min(batch_size, len(missing)))
+            self.put_many(list(missing), encoded)
+            by_key = dict(zip(missing, encoded))
+        vectors = [by_key[key] if vector is None else vector for key, vector in zip(keys, cached)]
+        with self._lock:
+            self.hits += hits
+            self.misses += len(missing)
+        EMBEDDING_CACHE_LOOKUPS.inc(hits, outcome="hit")
+        EMBEDDING_CACHE_LOOKUPS.inc(len(missing), outcome="miss")
+        return np.vstack(vectors) if vectors else np.zeros((0, 0), dtype=np.float32)
+
+    def lookups(self) -> Tuple[int, int]:
+        """(hits, misses) so far, for reporting on one ingestion cycle."""
+        with self._lock:
+            return self.hits, self.misses
+
+    def log_cycle(self, since: Tuple[int, int], label: str):
+        hits, misses = (now - before for now, before in zip(self.lookups(), since))
+        if hits + misses:
+            logging.info(f"Embedding cache for {label}: {hits}/{hits + misses} texts served from cache ({hits / (hits + misses):.1%}), {self._size} entries stored.")
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": self._size,
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+# The single cache shared by every service in the process
+embedding_cache = EmbeddingCache(settings.EMBEDDING_CACHE_PATH, encoder_id(), settings.EMBEDDING_CACHE_MAX_ENTRIES)
@@ -0,0 +1,147 @@
+# backend/core/encoders.py
+
+import json
+import os
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+
+from backend.core.config import settings
+
+# Values of settings.EMBEDDING_BACKEND.
+TORCH_BACKEND = "torch"
+TORCH_INT8_BACKEND = "torch_int8"
+ONNX_BACKEND = "onnx"
+EMBEDDING_BACKENDS = (TORCH_BACKEND, TORCH_INT8_BACKEND, ONNX_BACKEND)
+
+
+def hub_model_id(model_name: str) -> str:
+    """The Hugging Face repo of a model name, resolving bare names the way SentenceTransformer does."""
+    return model_name if "/" in model_name or os.path.isdir(model_name) else f"sentence-transformers/{model_name}"
+
+
+def encoder_id(backend: Optional[str] = None, model_name: Optional[str] = None) -> str:
+    """
+    Identifies the vectors an encoder produces, for keying cached embeddings. The quantized
+    backends give vectors close to, but not identical with, the fp32 model's.
+    """
+    backend = backend or settings.EMBEDDING_BACKEND
+    model_name = model_name or settings.EMBEDDING_MODEL_NAME
+    if backend == TORCH_BACKEND:
+        return model_name
+    if backend == ONNX_BACKEND:
+        return f"{model_name}@onnx:{settings.EMBEDDING_ONNX_FILE}"
+    return f"{model_name}@{backend}"
+
+
+class OnnxEncoder:
+    """
+    Runs a sentence-transformers model exported to ONNX on ONNX Runtime's CPU provider,
+    with the model's own tokenizer, pooling and normalization, so its vectors sit in the
+    same space as SentenceTransformer's and can share an index with them.
+    Implements the part of SentenceTransformer's interface the services use.
+    """
+    def __init__(self, session, tokenizer, max_seq_length: int = 256, pooling: str = "mean", normalize: bool = True):
+        if pooling not in ("mean", "cls"):
+            raise ValueError(f"Unsupported pooling mode {pooling!r}; only mean and cls pooling are implemented.")
+        self.session = session
+        self.tokenizer = tokenizer
+        self.max_seq_length = max_seq_length
+        self.pooling = pooling
+        self.normalize = normalize
+        self.input_names = [model_input.name for model_input in session.get_inputs()]
+
+    @classmethod
+    def from_pretrained(cls, model_name: str, file_name: str, threads: int = 0) -> "OnnxEncoder":
+        import onnxruntime
+        from huggingface_hub import snapshot_download
+        from transformers import AutoTokenizer
+
+        path = model_name if os.path.isdir(model_name) else snapshot_download(
+            hub_model_id(model_name), allow_patterns=[file_name, "*.json", "*.txt", "1_Pooling/*"])
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        session = onnxruntime.InferenceSession(os.path.join(path, file_name), options, providers=["CPUExecutionProvider"])
+
+        # Both the sentence-transformers 2.x config keys (what the hub repos ship) and the 6.x ones.
+        tokenizer = AutoTokenizer.from_pretrained(path)
+        max_seq_length = _read_json(path, "sentence_bert_config.json").get("max_seq_length")
+        if not max_seq_length:
+            max_seq_length = tokenizer.model_max_length if tokenizer.model_max_length < 100_000 else 256
+        pooling = _read_json(path, "1_Pooling/config.json")
+        modules = _read_json(path, "modules.json") or []
+        return cls(
+            session,
+            tokenizer,
+            max_seq_length=max_seq_length,
+            pooling=pooling.get("pooling_mode") or ("cls" if pooling.get("pooling_mode_cls_token") else "mean"),
+            normalize=any(module.get("type", "").endswith("Normalize") for module in modules),
+        )
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.session.get_outputs()[0].shape[-1]
+
+    def encode(self, sentences: Union[str, List[str]], batch_size: int = 32, **kwargs) -> np.ndarray:
+        single = isinstance(sentences, str)
+        texts = [sentences] if isinstance(sentences, str) else list(sentences)
+        # Longest first, as SentenceTransformer does, so each batch pads to similar lengths.
+        order = sorted(range(len(texts)), key=lambda index: -len(texts[index]))
+        embeddings: Dict[int, np.ndarray] = {}
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            embeddings.update(zip(batch, self._encode_batch([texts[index] for index in batch])))
+        if not texts:
+            return np.zeros((0, self.get_sentence_embedding_dimension()), dtype=np.float32)
+        result = np.vstack([embeddings[index] for index in range(len(texts))])
+        return result[0] if single else result
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        features = self.tokenizer(texts, padding=True, truncation=True, max_length=self.max_seq_length, return_tensors="np")
+        mask = features["attention_mask"].astype(np.int64)
+        inputs = {name: features[name].astype(np.int64) if name in features else np.zeros_like(mask) for name in self.input_names}
+        token_embeddings = self.session.run(None, inputs)[0]
+        if self.pooling == "cls":
+            pooled = token_embeddings[:, 0]
+        else:
+            weights = mask[..., None].astype(np.float32)
+            pooled = (token_embeddings * weights).sum(axis=1) / np.clip(weights.sum(axis=1), 1e-9, None)
+        if self.normalize:
+            pooled = pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled.astype(np.float32)
+
+
+def _read_json(path: str, name: str) -> Any:
+    try:
+        with open(os.path.join(path, name)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def _load_torch_int8(model_name: str, threads: int = 0):
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    if threads:
+        torch.set_num_threads(threads)
+    model = SentenceTransformer(model_name, device="cpu")
+    # The Linear layers hold almost all of a BERT-style encoder's weights and FLOPs; dynamic
+    # quantization stores them as int8 and quantizes their activations per batch.
+    torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    return model
+
+
+def load_encoder(backend: Optional[str] = None, model_name: Optional[str] = None):
+    """Builds the embedding model for `backend` (default: settings.EMBEDDING_BACKEND); every backend has SentenceTransformer's encode()."""
+    backend = backend or settings.EMBEDDING_BACKEND
+    model_name = model_name or settings.EMBEDDING_MODEL_NAME
+    if backend == TORCH_BACKEND:
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(model_name)
+    if backend == TORCH_INT8_BACKEND:
+        return _load_torch_int8(model_name, settings.EMBEDDING_THREADS)
+    if backend == ONNX_BACKEND:
+        return OnnxEncoder.from_pretrained(model_name, settings.EMBEDDING_ONNX_FILE, settings.EMBEDDING_THREADS)
+    raise ValueError(f"Unknown EMBEDDING_BACKEND {backend!r}; expected one of {', '.join(EMBEDDING_BACKENDS)}.")
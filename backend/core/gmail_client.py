@@ -0,0 +1,195 @@
+# backend/core/gmail_client.py
+
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from googleapiclient.errors import HttpError
+
+from backend.core.config import settings
+
+# The Gmail batch endpoint rejects batches with more than 100 sub-requests.
+MAX_BATCH_SIZE = 100
+
+# Sub-request failures worth retrying. Anything else (e.g. 404 for a message
+# that was deleted between list and get) is reported as a permanent failure.
+RETRYABLE_STATUS_CODES = {403, 429, 500, 502, 503, 504}
+
+
+# History record types we care about for keeping the local index in sync.
+HISTORY_TYPES = ["messageAdded", "messageDeleted", "labelAdded", "labelRemoved"]
+
+
+class HistoryExpiredError(Exception):
+    """Raised when Gmail no longer has history for the requested startHistoryId."""
+
+
+class FetchRetriesExhaustedError(Exception):
+    """Raised for messages that still failed with a retryable error after the last retry."""
+
+
+@dataclass
+class HistoryChanges:
+    """Net message changes since a given historyId."""
+    history_id: str
+    added: Dict[str, List[str]] = field(default_factory=dict)          # message ID -> label IDs
+    deleted: Set[str] = field(default_factory=set)
+    label_changes: Dict[str, List[str]] = field(default_factory=dict)  # message ID -> current label IDs
+
+
+@dataclass
+class BatchFetchResult:
+    """Outcome of a batched message fetch."""
+    messages: Dict[str, dict] = field(default_factory=dict)
+    failed: Dict[str, str] = field(default_factory=dict)  # message ID -> last error
+    # The IDs in `failed` whose last error was retryable (429, 5xx, transport) rather than permanent (404).
+    retries_exhausted: Set[str] = field(default_factory=set)
+    http_calls: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def messages_per_second(self) -> float:
+        return len(self.messages) / self.elapsed if self.elapsed > 0 else 0.0
+
+
+def _is_retryable(exception: Exception) -> bool:
+    if isinstance(exception, HttpError):
+        return exception.resp.status in RETRYABLE_STATUS_CODES
+    # Transport-level problems (timeouts, dropped connections) are worth another try.
+    return True
+
+
+def _chunks(items: List[str], size: int) -> Iterable[List[str]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def fetch_messages(
+    service,
+    message_ids: List[str],
+    batch_size: int | None = None,
+    max_retries: int | None = None,
+    backoff: float | None = None,
+    format: str = "full",
+) -> BatchFetchResult:
+    """
+    Fetches full Gmail messages using the batch endpoint, `batch_size` sub-requests
+    per HTTP call. Sub-requests that fail with a retryable error are collected and
+    only those IDs are re-sent, with exponential backoff between rounds.
+    """
+    batch_size = max(1, min(batch_size or settings.GMAIL_BATCH_SIZE, MAX_BATCH_SIZE))
+    max_retries = settings.GMAIL_BATCH_MAX_RETRIES if max_retries is None else max_retries
+    backoff = settings.GMAIL_BATCH_RETRY_BACKOFF if backoff is None else backoff
+
+    result = BatchFetchResult()
+    started = time.perf_counter()
+    pending = list(dict.fromkeys(message_ids))  # de-duplicate, keep order
+
+    for attempt in range(max_retries + 1):
+        if not pending:
+            break
+        if attempt > 0:
+            delay = backoff * (2 ** (attempt - 1))
+            logging.warning(f"Retrying {len(pending)} failed Gmail fetches in {delay:.1f}s (attempt {attempt}/{max_retries})")
+            time.sleep(delay)
+
+        retry_ids: List[str] = []
+
+        def on_response(request_id, response, exception):
+            if exception is None:
+                result.messages[request_id] = response
+                result.failed.pop(request_id, None)
+                return
+            result.failed[request_id] = str(exception)
+            if _is_retryable(exception):
+                retry_ids.append(request_id)
+
+        for chunk in _chunks(pending, batch_size):
+            batch = service.new_batch_http_request(callback=on_response)
+            for message_id in chunk:
+                batch.add(
+                    service.users().messages().get(userId='me', id=message_id, format=format),
+                    request_id=message_id,
+                )
+            try:
+                batch.execute()
+            except Exception as e:
+                # The whole HTTP call failed, so every ID in it needs another attempt.
+                logging.warning(f"Gmail batch request failed for {len(chunk)} messages: {e}")
+                for message_id in chunk:
+                    if message_id not in result.messages:
+                        result.failed[message_id] = str(e)
+                        retry_ids.append(message_id)
+            result.http_calls += 1
+
+        pending = retry_ids
+
+    result.elapsed = time.perf_counter() - started
+    # Whatever is still pending failed retryably on the last round.
+    result.retries_exhausted = set(pending)
+    if result.failed:
+        logging.error(f"Gave up fetching {len(result.failed)} Gmail messages: {sorted(result.failed)}")
+    return result
+
+
+def list_message_ids(service, query: str, page_size: int, page_token: Optional[str] = None) -> Tuple[List[str], Optional[str]]:
+    """Returns one page of message IDs matching `query` and the token for the next page (None on the last page)."""
+    response = service.users().messages().list(
+        userId='me', q=query, maxResults=page_size, pageToken=page_token
+    ).execute()
+    return [m['id'] for m in response.get('messages', [])], response.get('nextPageToken')
+
+
+def get_current_history_id(service) -> str:
+    """Returns the mailbox's current historyId, the starting point for incremental sync."""
+    profile = service.users().getProfile(userId='me').execute()
+    return str(profile['historyId'])
+
+
+def list_history(service, start_history_id: str, page_size: int = 500) -> HistoryChanges:
+    """
+    Pages through users.history.list from `start_history_id` and folds the records
+    into the net set of added, deleted and relabelled message IDs.
+    Raises HistoryExpiredError when Gmail answers 404 (the ID is too old).
+    """
+    changes = HistoryChanges(history_id=str(start_history_id))
+    page_token = None
+    while True:
+        try:
+            response = service.users().history().list(
+                userId='me',
+                startHistoryId=start_history_id,
+                historyTypes=HISTORY_TYPES,
+                maxResults=page_size,
+                pageToken=page_token,
+            ).execute()
+        except HttpError as e:
+            if e.resp.status == 404:
+                raise HistoryExpiredError(f"historyId {start_history_id} is no longer available") from e
+            raise
+
+        # Records arrive in chronological order, so later records win.
+        for record in response.get('history', []):
+            for item in record.get('messagesAdded', []):
+                message = item['message']
+                changes.added[message['id']] = message.get('labelIds', [])
+                changes.deleted.discard(message['id'])
+            for item in record.get('messagesDeleted', []):
+                message_id = item['message']['id']
+                changes.deleted.add(message_id)
+                changes.added.pop(message_id, None)
+                changes.label_changes.pop(message_id, None)
+            for item in record.get('labelsAdded', []) + record.get('labelsRemoved', []):
+                message = item['message']
+                if message['id'] in changes.deleted:
+                    continue
+                if message['id'] in changes.added:
+                    changes.added[message['id']] = message.get('labelIds', [])
+                else:
+                    changes.label_changes[message['id']] = message.get('labelIds', [])
+
+        changes.history_id = str(response.get('historyId', changes.history_id))
+        page_token = response.get('nextPageToken')
+        if not page_token:
+            return changes
@@ -1,118 +1,502 @@
 # backend/core/ingestion_service.py
 
 import logging
+import threading
+import time
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
-from typing import Optional
-import googleapiclient.discovery
-import base64
+from typing import Dict, List, Optional, Set
+
+from sqlalchemy import select
 
 # Core application imports
-from backend.db.database import SessionLocal
-from backend.db import models
+from backend.db.database import SessionLocal, WriterSession
+from backend.db import crud, models
 from backend.core.auth_service import get_user_credentials, build_google_service
+from backend.core.config import settings
+from backend.core.chunking import chunk_text
 from backend.core.classification_service import classification_service
+from backend.core.embedding_cache import embedding_cache
+from backend.core.gmail_client import FetchRetriesExhaustedError, HistoryExpiredError, fetch_messages, get_current_history_id, list_history, list_message_ids
+from backend.core.metrics import INGESTION_STEP_SECONDS
+from backend.core.mime import walk_payload
+from backend.core.model_registry import CHUNK_COLLECTION, EMAIL_COLLECTION, EMBEDDING_MODEL, model_registry
+from backend.core.pipeline import CompletionTracker, Pipeline, Stage
+from backend.core.search_service import chunk_id, vector_metadata
 
-# All required libraries
-from sentence_transformers import SentenceTransformer
-import spacy
-import chromadb
-from chromadb.config import Settings as ChromaSettings
+# sync_state key holding the Gmail historyId the index is current up to.
+HISTORY_ID_KEY = "gmail_history_id"
+# Gmail's label for the "Primary" inbox tab, the equivalent of `category:primary`.
+PRIMARY_LABEL = "CATEGORY_PERSONAL"
+PRIMARY_QUERY = "category:primary"
 
 class IngestionService:
     """A unified service for all ingestion, processing, and indexing."""
     def __init__(self):
-        logging.info("Initializing IngestionService (Unified)...")
-        # --- All necessary clients and models are loaded here ---
-        self.nlp = spacy.load("en_core_web_sm")
-        self.vector_model = SentenceTransformer('all-MiniLM-L6-v2')
-        self.chroma_client = chromadb.PersistentClient(
-            path="./chroma_db",
-            settings=ChromaSettings(anonymized_telemetry=False)
-        )
-        self.collection = self.chroma_client.get_or_create_collection(name="emails")
-        logging.info("IngestionService initialized successfully.")
-
-    def get_latest_email_date(self) -> Optional[datetime]:
-        # ... (implementation is correct, no changes needed)
-        db = SessionLocal()
-        try:
-            latest_email = db.query(models.Email).order_by(models.Email.received_at.desc()).first()
-            if latest_email: return latest_email.received_at
-            return None
-        finally: db.close()
+        # The embedding model and Chroma collection come from the shared model registry,
+        # which loads them on first use.
+        self.last_pipeline: Optional[Pipeline] = None
+
+    @property
+    def vector_model(self):
+        return model_registry.get(EMBEDDING_MODEL)
+
+    @property
+    def collection(self):
+        return model_registry.get(EMAIL_COLLECTION)
+
+    @property
+    def chunk_collection(self):
+        return model_registry.get(CHUNK_COLLECTION)
 
     def fetch_and_process_emails(self, limit: int = 50):
-        # ... (the full, correct implementation from our last exchange goes here) ...
-        # This is the function that fetches from Gmail, processes,
-        # vectorizes, and saves to both databases.
+        """
+        Brings the local index up to date with Gmail. When a historyId from a previous
+        sync is stored, only the changes since then are pulled via users.history.list;
+        on the first run, a full resync is done, and when the stored ID has expired the index
+        is caught up by listing the mailbox (see catch_up_after_expired_history).
+        """
         logging.info("Starting email fetch and process cycle...")
         creds = get_user_credentials()
         if not creds:
             logging.error("INGESTION FAILED: No valid credentials found.")
             return
 
+        db = SessionLocal()
+        try:
+            history_id = crud.get_sync_value(db, HISTORY_ID_KEY)
+        finally:
+            db.close()
+
+        if history_id:
+            try:
+                self.sync_from_history(creds, history_id)
+            except HistoryExpiredError:
+                logging.warning(f"Stored historyId {history_id} has expired; catching up by listing the mailbox.")
+                self.catch_up_after_expired_history(creds)
+            return
+        self.full_resync(creds, limit)
+
+    def sync_from_history(self, creds, history_id: str):
+        """Applies the added, deleted and relabelled messages since `history_id`."""
+        logging.info(f"Incremental sync from historyId {history_id}...")
+        changes = list_history(build_google_service(creds), history_id)
+
+        # A relabel can move a message we've never seen into the primary inbox.
+        to_ingest = [mid for mid, labels in changes.added.items() if PRIMARY_LABEL in labels]
+        to_ingest += [mid for mid, labels in changes.label_changes.items() if PRIMARY_LABEL in labels and mid not in changes.added]
+        logging.info(f"History since {history_id}: {len(changes.added)} added, {len(changes.deleted)} deleted, {len(changes.label_changes)} relabelled.")
+
+        if not self.ingest_message_ids(creds, to_ingest):
+            logging.error(f"Keeping historyId {history_id}; the changes will be retried next cycle.")
+            return
+        self._apply_changes(changes.deleted, changes.label_changes, changes.history_id)
+
+    def catch_up_after_expired_history(self, creds):
+        """
+        Brings the index up to date when the stored historyId is too old for users.history.list,
+        so the changes since it can't be read. The primary inbox is listed newest first and
+        unstored messages are ingested page by page until a whole page is already stored (older
+        mail is the backfill service's job). The listing then runs to the end, so stored emails
+        Gmail no longer lists can be checked: those it no longer has are deleted, and the ones
+        moved out of the primary inbox get their current labels. The historyId is read first and
+        saved only once all of that has been applied.
+        """
         service = build_google_service(creds)
-        latest_date = self.get_latest_email_date()
-        gmail_query = "category:primary"
-        if latest_date: gmail_query += f" after:{int(latest_date.timestamp())}"
+        history_id = get_current_history_id(service)
+
+        listed: Set[str] = set()
+        catching_up = True
+        page_token = None
+        while True:
+            page, page_token = list_message_ids(service, PRIMARY_QUERY, settings.BACKFILL_PAGE_SIZE, page_token)
+            listed.update(page)
+            if catching_up:
+                new_ids = self.filter_new_ids(page)
+                catching_up = bool(new_ids)
+                if not self.ingest_message_ids(creds, new_ids):
+                    logging.error("Keeping the expired historyId; the catch-up will be retried next cycle.")
+                    return
+            if not page_token:
+                break
+
+        db = SessionLocal()
+        try:
+            unlisted = sorted(crud.get_all_email_ids(db) - listed)
+        finally:
+            db.close()
+        label_changes: Dict[str, List[str]] = {}
+        gone: Set[str] = set()
+        if unlisted:
+            fetch_result = fetch_messages(service, unlisted, format="minimal")
+            if fetch_result.retries_exhausted:
+                logging.error("Keeping the expired historyId; stored emails Gmail no longer lists could not all be checked.")
+                return
+            label_changes = {message_id: message.get("labelIds", []) for message_id, message in fetch_result.messages.items()}
+            # What is left failed permanently (404): Gmail no longer has the message.
+            gone = set(fetch_result.failed)
+        self._apply_changes(gone, label_changes, history_id)
+
+    def _apply_changes(self, deleted: Set[str], label_changes: Dict[str, List[str]], history_id: str):
+        """
+        Deletes `deleted` emails, stores `label_changes` and advances the history cursor to
+        `history_id` in one transaction, then drops the deleted emails' vectors.
+        """
+        db = WriterSession()
+        try:
+            removed = crud.delete_emails(db, deleted) if deleted else 0
+            if label_changes:
+                crud.update_email_labels(db, label_changes)
+            # Only advance the cursor once everything up to it has been applied.
+            crud.set_sync_value(db, HISTORY_ID_KEY, history_id)
+            db.commit()
+        except Exception as e:
+            logging.error(f"DATABASE ERROR: {e}", exc_info=True)
+            db.rollback()
+            return
+        finally:
+            db.close()
+
+        # Vectors go only once the rows are gone for good. Deleting missing IDs is a no-op in
+        # Chroma, so a failure here leaves orphan vectors, which search drops at the SQL join.
+        if deleted:
+            deleted_ids = sorted(deleted)
+            try:
+                self.collection.delete(ids=deleted_ids)
+                if settings.EMBED_CHUNKS_ENABLED:
+                    self.chunk_collection.delete(where={"email_id": {"$in": deleted_ids}})
+            except Exception as e:
+                logging.error(f"Could not remove {len(deleted_ids)} deleted emails from the vector index: {e}", exc_info=True)
+            logging.info(f"Removed {removed} deleted emails from the index.")
+
+    def full_resync(self, creds, limit: int = 50):
+        """Lists the primary inbox and ingests anything not already stored, then records the historyId."""
+        service = build_google_service(creds)
+        # Read the historyId first so changes made while we list are picked up next cycle.
+        history_id = get_current_history_id(service)
+        gmail_query = PRIMARY_QUERY
 
         logging.info(f"Querying Gmail API with: '{gmail_query}'")
-        results = service.users().messages().list(userId='me', q=gmail_query, maxResults=limit).execute()
-        messages = results.get('messages', [])
+        # Only the newest `limit` messages; the backfill service walks the rest of the mailbox.
+        message_ids, _ = list_message_ids(service, gmail_query, limit)
 
-        if not messages:
+        if not message_ids:
             logging.info("No new messages found to ingest.")
+        elif not self.ingest_message_ids(creds, message_ids):
             return
 
+        db = WriterSession()
+        try:
+            crud.set_sync_value(db, HISTORY_ID_KEY, history_id)
+            db.commit()
+        finally:
+            db.close()
+
+    def ingest_message_ids(self, creds, message_ids) -> bool:
+        """
+        Runs every message ID not already in the database through the ingestion pipeline
+        and waits for it to drain. Returns False if any part could not be stored.
+        """
+        if not message_ids:
+            return True
+        cycle_started = time.perf_counter()
+        cache_before = embedding_cache.lookups()
+        new_ids = self.filter_new_ids(message_ids)
+        if not new_ids:
+            logging.info("All listed messages are already ingested.")
+            return True
+
+        pipeline = self.start_pipeline(creds)
+        trackers = [self.submit(pipeline, chunk) for chunk in _chunks(new_ids, settings.GMAIL_BATCH_SIZE)]
+        pipeline.close()
+
+        failures = [t.future.exception() for t in trackers if t.future.exception()]
+        stored = pipeline.stats()["stages"]["persist"]["emitted"]
+        elapsed = time.perf_counter() - cycle_started
+        rate = stored / elapsed if elapsed > 0 else 0.0
+        if failures:
+            logging.error(f"INGESTION INCOMPLETE: {len(failures)} of {len(trackers)} chunks failed; first error: {failures[0]}")
+            return False
+        logging.info(f"SUCCESS: Committed {stored} unique emails to the database in {elapsed:.2f}s ({rate:.1f} msg/s).")
+        embedding_cache.log_cycle(cache_before, "this cycle")
+        return True
+
+    # --- Staged pipeline: fetch -> parse -> classify -> embed -> persist ---
+
+    def start_pipeline(self, creds, fetch_workers: Optional[int] = None) -> Pipeline:
+        """
+        Builds and starts an ingestion pipeline. Gmail I/O, parsing, classification and
+        embedding each get their own thread pool; persisting is done by a single writer
+        so SQLite and Chroma see one serialized stream of writes.
+        """
+        # googleapiclient service objects are not thread-safe, so each fetch thread builds its own.
+        local = threading.local()
+
+        def fetch(jobs: List[FetchJob]) -> List[IngestItem]:
+            if not hasattr(local, "service"):
+                local.service = build_google_service(creds)
+            items = []
+            for job in jobs:
+                items.extend(self._fetch_stage(local.service, job))
+            return items
+
+        queue_size = settings.PIPELINE_QUEUE_SIZE
+        pipeline = Pipeline("ingestion", [
+            Stage("fetch", fetch, workers=fetch_workers or settings.PIPELINE_FETCH_WORKERS, queue_size=queue_size, on_error=_fail_jobs),
+            Stage("parse", _per_item(self._parse_stage), workers=settings.PIPELINE_PARSE_WORKERS, queue_size=queue_size, on_error=_fail_items),
+            Stage("classify", self._classify_stage, workers=settings.PIPELINE_CLASSIFY_WORKERS, queue_size=queue_size, batch_size=settings.GMAIL_BATCH_SIZE, flush_timeout=settings.CLASSIFY_FLUSH_TIMEOUT, on_error=_fail_items),
+            Stage("embed", self._embed_stage, workers=settings.PIPELINE_EMBED_WORKERS, queue_size=queue_size, batch_size=settings.EMBED_BATCH_SIZE, flush_timeout=settings.EMBED_FLUSH_TIMEOUT, on_error=_fail_items),
+            Stage("persist", self._persist_stage, workers=1, queue_size=queue_size, batch_size=settings.PIPELINE_PERSIST_BATCH_SIZE, flush_timeout=0.5, on_error=_fail_items),
+        ])
+        self.last_pipeline = pipeline
+        return pipeline.start()
+
+    def submit(self, pipeline: Pipeline, message_ids: List[str]) -> CompletionTracker:
+        """Queues a chunk of message IDs (blocking while the pipeline is full); the tracker resolves once all are stored or skipped."""
+        tracker = CompletionTracker(len(message_ids))
+        if message_ids:
+            pipeline.submit(FetchJob(message_ids, tracker))
+        return tracker
+
+    def filter_new_ids(self, message_ids) -> List[str]:
+        """Drops IDs that are already stored (one IN query per page) and duplicates, keeping order."""
+        message_ids = list(dict.fromkeys(message_ids))
         db = SessionLocal()
-        processed_in_this_batch = set()
         try:
-            for i, message_summary in enumerate(messages):
-                email_id = message_summary['id']
-                if email_id in processed_in_this_batch: continue
-                if db.query(models.Email).filter(models.Email.id == email_id).first(): continue
-                
-                logging.info(f"Processing message {i+1}/{len(messages)} (ID: {email_id})")
-                email_data = service.users().messages().get(userId='me', id=email_id, format='full').execute()
-                
-                headers = email_data['payload']['headers']
-                subject = next((h['value'] for h in headers if h['name'].lower() == 'subject'), 'No Subject')
-                sender = next((h['value'] for h in headers if h['name'].lower() == 'from'), 'No Sender')
-                date_str = next((h['value'] for h in headers if h['name'].lower() == 'date'), '')
-                try: received_at_dt = datetime.strptime(date_str, '%a, %d %b %Y %H:%M:%S %z').astimezone(timezone.utc)
-                except (ValueError, TypeError): received_at_dt = datetime.now(timezone.utc)
-
-                body_text = ""
-                if 'parts' in email_data['payload']:
-                    for part in email_data['payload']['parts']:
-                        if part.get('mimeType') == 'text/plain' and part.get('body', {}).get('data'):
-                            body_text = base64.urlsafe_b64decode(part['body']['data']).decode('utf-8', 'ignore'); break
-                
-                text_to_vectorize = f"Subject: {subject}\n\n{email_data['snippet']}"
-                embedding = self.vector_model.encode(text_to_vectorize).tolist()
-                
-                classification_results = classification_service.classify_email(subject, body_text)
-                db_email = models.Email(id=email_id, thread_id=email_data['threadId'], sender=sender, subject=subject, snippet=email_data['snippet'], received_at=received_at_dt, category=classification_results.get('category', 'General'), job_company=classification_results.get('company'), job_status=classification_results.get('status', 'Applied' if classification_results.get('category') == 'Job Application' else None))
-                
-                has_attachments = False
-                if 'parts' in email_data['payload']:
-                    for part in email_data['payload']['parts']:
-                        if part.get('filename'):
-                            has_attachments = True
-                            db_email.attachments.append(models.Attachment(filename=part['filename'], mime_type=part.get('mimeType', 'application/octet-stream'), size=part['body'].get('size', 0)))
-                
-                db.add(db_email)
-                self.collection.add(ids=[email_id], embeddings=[embedding], metadatas=[{"sender": sender, "subject": subject, "has_attachment": has_attachments}])
-                processed_in_this_batch.add(email_id)
+            existing = crud.get_existing_email_ids(db, message_ids)
+        finally:
+            db.close()
+        return [email_id for email_id in message_ids if email_id not in existing]
 
-            db.commit()
-            logging.info(f"SUCCESS: Committed {len(processed_in_this_batch)} unique emails to the database.")
+    def pipeline_stats(self) -> Optional[dict]:
+        return self.last_pipeline.stats() if self.last_pipeline else None
 
-        except Exception as e:
-            logging.error(f"DATABASE ERROR: {e}", exc_info=True)
+    def refresh_vector_metadata(self, page_size: int = 500) -> int:
+        """
+        Rewrites the Chroma metadata of every stored email (and of its body chunks) from SQLite,
+        so vectors indexed before a metadata field existed can be filtered on it. Returns the
+        number of emails updated.
+        """
+        updated = 0
+        last_id = ""
+        db = SessionLocal()
+        try:
+            while True:
+                emails = db.execute(
+                    select(models.Email.id, models.Email.sender, models.Email.subject, models.Email.category, models.Email.received_at, models.Email.attachment_count)
+                    .where(models.Email.id > last_id).order_by(models.Email.id).limit(page_size)
+                ).all()
+                if not emails:
+                    break
+                last_id = emails[-1].id
+                metadata = {email.id: vector_metadata(email.sender, email.subject, email.category, email.received_at, email.attachment_count > 0) for email in emails}
+                indexed = self.collection.get(ids=list(metadata), include=[])['ids']
+                if indexed:
+                    self.collection.update(ids=indexed, metadatas=[metadata[email_id] for email_id in indexed])
+                    updated += len(indexed)
+                if settings.EMBED_CHUNKS_ENABLED:
+                    chunks = self.chunk_collection.get(where={"email_id": {"$in": list(metadata)}}, include=["metadatas"])
+                    if chunks['ids']:
+                        self.chunk_collection.update(
+                            ids=chunks['ids'],
+                            metadatas=[{**metadata[chunk['email_id']], "email_id": chunk['email_id'], "chunk": chunk['chunk']} for chunk in chunks['metadatas']],
+                        )
+        finally:
+            db.close()
+        logging.info(f"Refreshed vector metadata for {updated} emails.")
+        return updated
+
+    def _fetch_stage(self, service, job: "FetchJob") -> List["IngestItem"]:
+        # Callers have already dropped IDs we store (see filter_new_ids); anything that
+        # slips through is ignored by the writer's ON CONFLICT DO NOTHING.
+        with INGESTION_STEP_SECONDS.time(step="gmail_fetch"):
+            fetch_result = fetch_messages(service, job.message_ids)
+        logging.info(f"Fetched {len(fetch_result.messages)}/{len(job.message_ids)} messages in {fetch_result.http_calls} batch calls ({fetch_result.elapsed:.2f}s, {fetch_result.messages_per_second:.1f} msg/s)")
+        exhausted = fetch_result.retries_exhausted.intersection(job.message_ids)
+        if exhausted:
+            # Fail the chunk so the history cursor / backfill checkpoint stays behind these messages.
+            job.tracker.fail(FetchRetriesExhaustedError(f"Gave up fetching {len(exhausted)} messages after retries: {sorted(exhausted)}"))
+        # Messages Gmail no longer has (404) are logged by fetch_messages; nothing more to do for them.
+        job.tracker.done(len(job.message_ids) - len(fetch_result.messages) - len(exhausted))
+        return [IngestItem(email_id, job.tracker, email_data=fetch_result.messages[email_id]) for email_id in job.message_ids if email_id in fetch_result.messages]
+
+    def _parse_stage(self, item: "IngestItem") -> "IngestItem":
+        email_data = item.email_data
+        headers = email_data['payload']['headers']
+        item.subject = next((h['value'] for h in headers if h['name'].lower() == 'subject'), 'No Subject')
+        item.sender = next((h['value'] for h in headers if h['name'].lower() == 'from'), 'No Sender')
+        date_str = next((h['value'] for h in headers if h['name'].lower() == 'date'), '')
+        try: item.received_at = datetime.strptime(date_str, '%a, %d %b %Y %H:%M:%S %z').astimezone(timezone.utc)
+        except (ValueError, TypeError): item.received_at = datetime.now(timezone.utc)
+
+        content = walk_payload(email_data['payload'])
+        item.body_text, item.attachments, item.inline_images = content.body_text, content.attachments, content.inline_images
+        if content.truncated:
+            logging.debug(f"Body of {item.message_id} cut at {settings.MIME_MAX_BODY_BYTES} bytes")
+        return item
+
+    def _classify_stage(self, items: List["IngestItem"]) -> List["IngestItem"]:
+        """Classifies a page of emails at once so NER runs through one nlp.pipe call."""
+        results = classification_service.classify_emails([(item.subject, item.body_text) for item in items])
+        for item, classification in zip(items, results):
+            item.classification = classification
+        return items
+
+    def _embed_stage(self, items: List["IngestItem"]) -> List["IngestItem"]:
+        """Encodes a micro-batch of emails with a single model call."""
+        texts_to_vectorize = [f"Subject: {item.subject}\n\n{item.email_data['snippet']}" for item in items]
+        with INGESTION_STEP_SECONDS.time(step="encode"):
+            embeddings = self._encode(texts_to_vectorize, batch_size=len(texts_to_vectorize))
+        for item, embedding in zip(items, embeddings):
+            item.embedding = embedding.tolist()
+        if settings.EMBED_CHUNKS_ENABLED:
+            self._embed_chunks(items)
+        return items
+
+    def _embed_chunks(self, items: List["IngestItem"]):
+        """Splits each body into overlapping chunks and encodes the chunks of the whole micro-batch together."""
+        chunks = [
+            chunk_text(item.body_text, settings.EMBED_CHUNK_TOKENS, settings.EMBED_CHUNK_OVERLAP, settings.EMBED_MAX_CHUNKS_PER_EMAIL)
+            for item in items
+        ]
+        texts = [text for item_chunks in chunks for text in item_chunks]
+        if not texts:
+            return
+        with INGESTION_STEP_SECONDS.time(step="encode_chunks"):
+            embeddings = self._encode(texts, batch_size=settings.EMBED_BATCH_SIZE)
+        start = 0
+        for item, item_chunks in zip(items, chunks):
+            item.chunk_embeddings = [embedding.tolist() for embedding in embeddings[start:start + len(item_chunks)]]
+            start += len(item_chunks)
+
+    def _encode(self, texts: List[str], batch_size: int):
+        """Encodes through the embedding cache, so texts seen before skip the model."""
+        if settings.EMBEDDING_CACHE_ENABLED:
+            return embedding_cache.encode(self.vector_model, texts, batch_size=batch_size)
+        return self.vector_model.encode(texts, batch_size=batch_size)
+
+    def _persist_stage(self, items: List["IngestItem"]) -> List["IngestItem"]:
+        """
+        The single writer: bulk-inserts a group of emails and their attachments, adds the
+        vectors of the newly inserted ones to Chroma in one call, and commits once. A failure
+        rolls back this group only, and takes back the vectors it added, so none outlive their
+        rows; groups committed before it are kept.
+        """
+        email_rows: List[dict] = []
+        attachment_rows: List[dict] = []
+        for item in items:
+            classification_results = item.classification
+            email_data = item.email_data
+            email_rows.append({
+                "id": item.message_id,
+                "thread_id": email_data['threadId'],
+                "label_ids": ",".join(email_data.get('labelIds', [])),
+                "sender": item.sender,
+                "subject": item.subject,
+                "snippet": email_data['snippet'],
+                "received_at": item.received_at,
+                "category": classification_results.get('category', 'General'),
+                "job_company": classification_results.get('company'),
+                "job_status": classification_results.get('status', 'Applied' if classification_results.get('category') == 'Job Application' else None),
+                "attachment_count": len(item.attachments),
+            })
+            attachment_rows.extend({**attachment, "email_id": item.message_id} for attachment in item.attachments)
+
+        db = WriterSession()
+        added_ids: List[str] = []
+        added_chunk_ids: List[str] = []
+        try:
+            with INGESTION_STEP_SECONDS.time(step="sqlite_insert"):
+                inserted = crud.bulk_insert_emails(db, email_rows, attachment_rows, bodies={item.message_id: item.body_text for item in items})
+            new_items = [item for item in items if item.message_id in inserted]
+            if new_items:
+                added_ids = [item.message_id for item in new_items]
+                with INGESTION_STEP_SECONDS.time(step="chroma_add"):
+                    self.collection.add(
+                        ids=added_ids,
+                        embeddings=[item.embedding for item in new_items],
+                        metadatas=[self._vector_metadata(item) for item in new_items],
+                    )
+            chunked = [item for item in new_items if item.chunk_embeddings]
+            if chunked:
+                added_chunk_ids = [chunk_id(item.message_id, index) for item in chunked for index in range(len(item.chunk_embeddings))]
+                with INGESTION_STEP_SECONDS.time(step="chroma_chunk_add"):
+                    self.chunk_collection.add(
+                        ids=added_chunk_ids,
+                        embeddings=[embedding for item in chunked for embedding in item.chunk_embeddings],
+                        metadatas=[
+                            {**self._vector_metadata(item), "email_id": item.message_id, "chunk": index}
+                            for item in chunked for index in range(len(item.chunk_embeddings))
+                        ],
+                    )
+            with INGESTION_STEP_SECONDS.time(step="sqlite_commit"):
+                db.commit()
+        except Exception:
             db.rollback()
+            self._discard_vectors(added_ids, added_chunk_ids)
+            raise
         finally:
             db.close()
 
+        for item in items:
+            item.tracker.done()
+        return new_items
+
+    def _discard_vectors(self, email_ids: List[str], chunk_ids: List[str]):
+        """Deletes vectors added for rows that were then rolled back (deleting IDs Chroma lacks is a no-op)."""
+        try:
+            if email_ids:
+                self.collection.delete(ids=email_ids)
+            if chunk_ids:
+                self.chunk_collection.delete(ids=chunk_ids)
+        except Exception as e:
+            # Search drops vectors without a row at the SQL join, so leftovers are only dead weight.
+            logging.error(f"Could not remove the vectors of {len(email_ids)} rolled-back emails: {e}", exc_info=True)
+
+    @staticmethod
+    def _vector_metadata(item: "IngestItem") -> dict:
+        return vector_metadata(item.sender, item.subject, item.classification.get('category'), item.received_at, bool(item.attachments))
+
+
+@dataclass
+class FetchJob:
+    """A chunk of message IDs entering the pipeline."""
+    message_ids: List[str]
+    tracker: CompletionTracker
+
+
+@dataclass
+class IngestItem:
+    """One message on its way through the pipeline; each stage fills in its part."""
+    message_id: str
+    tracker: CompletionTracker
+    email_data: dict = field(default_factory=dict)
+    subject: str = ""
+    sender: str = ""
+    received_at: Optional[datetime] = None
+    body_text: str = ""
+    attachments: List[dict] = field(default_factory=list)
+    inline_images: List[dict] = field(default_factory=list)
+    classification: dict = field(default_factory=dict)
+    embedding: List[float] = field(default_factory=list)
+    # One vector per body chunk, when EMBED_CHUNKS_ENABLED is on.
+    chunk_embeddings: List[List[float]] = field(default_factory=list)
+
+
+def _per_item(handler):
+    """Adapts a one-item stage function to the pipeline's list-in/list-out handler shape."""
+    return lambda items: [handler(item) for item in items]
+
+def _fail_items(items: List[IngestItem], error: Exception):
+    for item in items:
+        item.tracker.fail(error)
+
+def _fail_jobs(jobs: List[FetchJob], error: Exception):
+    for job in jobs:
+        job.tracker.fail(error)
+
+def _chunks(items: List[str], size: int) -> List[List[str]]:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
 # The singleton instance that the rest of the app will use
 ingestion_service = IngestionService()
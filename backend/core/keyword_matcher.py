@@ -0,0 +1,38 @@
+# backend/core/keyword_matcher.py
+
+import re
+from typing import Dict, List, Optional
+
+
+class KeywordMatcher:
+    """
+    Compiles an ordered rule table ({label: [keywords]}) into a single regex so that
+    the highest-priority label with a whole-word keyword hit is found in one pass.
+
+    The pattern is a zero-width lookahead tried at every word boundary, with one named
+    group per label in rule order. At any position the first group that matches is the
+    highest-priority label starting there, and because the lookahead consumes nothing,
+    overlapping keywords from lower-priority labels can't hide a higher-priority one.
+    """
+    def __init__(self, rules: Dict[str, List[str]]):
+        self.labels = list(rules)
+        groups = []
+        for index, keywords in enumerate(rules.values()):
+            alternatives = "|".join(re.escape(kw.lower()) for kw in keywords)
+            groups.append(f"(?P<r{index}>(?:{alternatives})\\b)" if alternatives else f"(?P<r{index}>(?!))")
+        self.pattern = re.compile(r"(?=\b(?:" + "|".join(groups) + "))") if groups else None
+
+    def first_match(self, text: str) -> Optional[str]:
+        """The highest-priority label with any keyword in `text` (expected lowercase), or None."""
+        if self.pattern is None:
+            return None
+        best = None
+        for match in self.pattern.finditer(text):
+            # The lookahead matches only through one of the named groups.
+            assert match.lastgroup is not None
+            index = int(match.lastgroup[1:])
+            if best is None or index < best:
+                best = index
+                if best == 0:
+                    break
+        return self.labels[best] if best is not None else None
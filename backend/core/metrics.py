@@ -0,0 +1,187 @@
+# backend/core/metrics.py
+
+import bisect
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Sequence, Tuple, TypeVar
+
+from backend.core.config import settings
+
+# Latency buckets in seconds, from sub-millisecond SQL to multi-second Gmail batches.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Items handled per call, for throughput per batch.
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(pairs: Sequence[Tuple[str, str]]) -> str:
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in pairs) + "}" if pairs else ""
+
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, registry: "MetricsRegistry", name: str, help_text: str, label_names: Sequence[str]):
+        self.registry = registry
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+    @abstractmethod
+    def _samples(self) -> List[str]:
+        ...
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self._values: Dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        if not self.registry.enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        return [f"{self.name}{_format_labels(list(zip(self.label_names, key)))} {value:g}" for key, value in sorted(values.items())]
+
+
+class _Timer:
+    """Context manager that observes its block's duration in a histogram."""
+    __slots__ = ("histogram", "labels", "started")
+
+    def __init__(self, histogram: "Histogram", labels: dict):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+        return False
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, registry, name, help_text, label_names, buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(registry, name, help_text, label_names)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket (non-cumulative, +Inf last), sum]
+        self._series: Dict[tuple, list] = {}
+
+    def observe(self, value: float, **labels):
+        if not self.registry.enabled:
+            return
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def time(self, **labels) -> _Timer:
+        return _Timer(self, labels)
+
+    def count(self, **labels) -> int:
+        series = self._series.get(self._key(labels))
+        return sum(series[0]) if series else 0
+
+    def totals(self) -> Dict[tuple, Tuple[int, float]]:
+        """(count, sum) per label set, keyed by label values in label_names order."""
+        with self._lock:
+            return {key: (sum(counts), total) for key, (counts, total) in self._series.items()}
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            series = {key: (list(counts), total) for key, (counts, total) in self._series.items()}
+        lines = []
+        for key, (counts, total) in sorted(series.items()):
+            pairs = list(zip(self.label_names, key))
+            cumulative = 0
+            for bound, count in zip([*self.buckets, "+Inf"], counts):
+                cumulative += count
+                le = bound if bound == "+Inf" else f"{bound:g}"
+                lines.append(f"{self.name}_bucket{_format_labels([*pairs, ('le', le)])} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(pairs)} {total:g}")
+            lines.append(f"{self.name}_count{_format_labels(pairs)} {cumulative}")
+        return lines
+
+
+MetricT = TypeVar("MetricT", bound=_Metric)
+
+
+class MetricsRegistry:
+    """
+    In-process counters and histograms, rendered in the Prometheus text format at /metrics.
+    Recording is a dict lookup and a lock per observation and is done per batch or per
+    request, never per item; with METRICS_ENABLED off it returns immediately.
+    """
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._metrics: Dict[str, _Metric] = {}
+
+    def counter(self, name: str, help_text: str, label_names: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(self, name, help_text, label_names))
+
+    def histogram(self, name: str, help_text: str, label_names: Sequence[str] = (), buckets: Optional[Sequence[float]] = None) -> Histogram:
+        return self._register(Histogram(self, name, help_text, label_names, buckets or LATENCY_BUCKETS))
+
+    def _register(self, metric: MetricT) -> MetricT:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(line for metric in self._metrics.values() for line in metric.render()) + "\n"
+
+# The single registry shared by every service in the process
+metrics = MetricsRegistry(enabled=settings.METRICS_ENABLED)
+
+# --- Ingestion ---
+PIPELINE_STAGE_SECONDS = metrics.histogram(
+    "aperture_pipeline_stage_seconds", "Time a pipeline stage's handler spent on one batch.", ("pipeline", "stage"))
+PIPELINE_STAGE_BATCH_ITEMS = metrics.histogram(
+    "aperture_pipeline_stage_batch_items", "Items per batch handled by a pipeline stage.", ("pipeline", "stage"), BATCH_SIZE_BUCKETS)
+PIPELINE_STAGE_ITEMS = metrics.counter(
+    "aperture_pipeline_stage_items_total", "Items handled by a pipeline stage, by outcome.", ("pipeline", "stage", "outcome"))
+INGESTION_STEP_SECONDS = metrics.histogram(
+    "aperture_ingestion_step_seconds", "Time spent in one call to an ingestion dependency (Gmail, encoder, Chroma, SQLite).", ("step",))
+EMBEDDING_CACHE_LOOKUPS = metrics.counter(
+    "aperture_embedding_cache_lookups_total", "Texts looked up in the embedding cache before encoding, by outcome (hit, miss).", ("outcome",))
+
+# --- Classification ---
+CLASSIFICATION_SECONDS = metrics.histogram(
+    "aperture_classification_seconds", "Time spent classifying one call's emails, by step (rules, ner).", ("step",))
+CLASSIFIED_EMAILS = metrics.counter(
+    "aperture_classified_emails_total", "Emails classified, by category.", ("category",))
+
+# --- Search ---
+SEARCH_SECONDS = metrics.histogram(
+    "aperture_search_seconds", "Search latency by mode and step (vector, keyword, enrich, total).", ("mode", "step"))
+SEARCH_RESULTS = metrics.histogram(
+    "aperture_search_results", "Results returned per search.", ("mode",), BATCH_SIZE_BUCKETS)
+SEARCH_REQUESTS = metrics.counter(
+    "aperture_search_requests_total", "Searches served, by mode and outcome.", ("mode", "outcome"))
@@ -0,0 +1,140 @@
+# backend/core/mime.py
+
+import base64
+import codecs
+from dataclasses import dataclass, field
+from html.parser import HTMLParser
+from typing import Dict, List, Optional
+
+from backend.core.config import settings
+
+# Elements whose text is never shown, and elements that end a line of text.
+_HIDDEN_TAGS = {"script", "style", "head", "title"}
+_BLOCK_TAGS = {"p", "div", "br", "li", "tr", "h1", "h2", "h3", "h4", "h5", "h6", "blockquote", "pre", "table", "hr"}
+
+
+@dataclass
+class MimeContent:
+    """Everything ingestion takes from a message payload."""
+    body_text: str = ""
+    attachments: List[dict] = field(default_factory=list)
+    # Images referenced from the HTML body by Content-ID (logos, signatures); not attachments.
+    inline_images: List[dict] = field(default_factory=list)
+    # True when a body part was cut at max_body_bytes.
+    truncated: bool = False
+
+
+class _HtmlText(HTMLParser):
+    """Collects the visible text of an HTML document, one line per block element."""
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.chunks: List[str] = []
+        self._hidden = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _HIDDEN_TAGS:
+            self._hidden += 1
+        elif tag in _BLOCK_TAGS:
+            self.chunks.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in _HIDDEN_TAGS:
+            self._hidden = max(0, self._hidden - 1)
+        elif tag in _BLOCK_TAGS:
+            self.chunks.append("\n")
+
+    def handle_data(self, data):
+        if not self._hidden:
+            self.chunks.append(data)
+
+    def text(self) -> str:
+        lines = (" ".join(line.split()) for line in "".join(self.chunks).splitlines())
+        return "\n".join(line for line in lines if line)
+
+
+def html_to_text(html: str) -> str:
+    parser = _HtmlText()
+    parser.feed(html)
+    parser.close()
+    return parser.text()
+
+
+def _headers(part: dict) -> Dict[str, str]:
+    return {header["name"].lower(): header["value"] for header in part.get("headers", [])}
+
+def _charset(headers: Dict[str, str]) -> str:
+    for param in headers.get("content-type", "").split(";")[1:]:
+        name, _, value = param.strip().partition("=")
+        if name.lower() == "charset" and value:
+            charset = value.strip('"\'')
+            try:
+                codecs.lookup(charset)
+                return charset
+            except LookupError:
+                break
+    return "utf-8"
+
+def _decode(data: str, limit: int) -> memoryview:
+    """
+    Decodes at most `limit` bytes of a base64url body. Only the base64 characters that
+    cover those bytes are decoded, so a huge part never materializes in full.
+    """
+    if limit <= 0:
+        return memoryview(b"")
+    chars = -(-limit // 3) * 4
+    chunk = data[:chars]
+    raw = base64.urlsafe_b64decode(chunk + "=" * (-len(chunk) % 4))
+    return memoryview(raw)[:limit]
+
+
+def walk_payload(payload: dict, max_body_bytes: Optional[int] = None) -> MimeContent:
+    """
+    Walks a Gmail `format=full` payload once, depth first in document order, collecting the
+    text/plain body (all plain parts, e.g. a forward's note and the forwarded message), the
+    HTML parts as a fallback for HTML-only mail, inline images and attachment metadata.
+    Decoded text is capped at `max_body_bytes` per kind, whatever the size of the parts.
+    """
+    max_body_bytes = settings.MIME_MAX_BODY_BYTES if max_body_bytes is None else max_body_bytes
+    content = MimeContent()
+    plain: List[str] = []
+    html: List[str] = []
+    budget = {"text/plain": max_body_bytes, "text/html": max_body_bytes}
+
+    stack = [payload]
+    while stack:
+        part = stack.pop()
+        mime_type = (part.get("mimeType") or "").lower()
+        children = part.get("parts")
+        if children:
+            # multipart/* and message/rfc822: visit the children in order.
+            stack.extend(reversed(children))
+            continue
+
+        body = part.get("body") or {}
+        filename = part.get("filename") or ""
+        headers = _headers(part)
+        content_id = headers.get("content-id", "").strip("<>")
+        if filename or (mime_type.startswith("image/") and content_id):
+            disposition = headers.get("content-disposition", "").split(";")[0].strip().lower()
+            meta = {"filename": filename, "mime_type": mime_type or "application/octet-stream", "size": body.get("size", 0)}
+            if mime_type.startswith("image/") and content_id and disposition != "attachment":
+                content.inline_images.append({**meta, "content_id": content_id})
+            else:
+                content.attachments.append(meta)
+            continue
+
+        data = body.get("data")
+        if mime_type in budget and data:
+            remaining = budget[mime_type]
+            raw = _decode(data, remaining)
+            if len(data) * 3 // 4 > remaining:
+                content.truncated = True
+            budget[mime_type] -= len(raw)
+            text = codecs.decode(raw, _charset(headers), "ignore")
+            (plain if mime_type == "text/plain" else html).append(text)
+
+    if plain:
+        content.body_text = "\n\n".join(plain)
+    elif html:
+        content.body_text = html_to_text("".join(html))
+    return content
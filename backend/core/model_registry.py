@@ -0,0 +1,110 @@
+# backend/core/model_registry.py
+
+import logging
+import resource
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from backend.core.config import settings
+
+# Registry names of the shared models.
+NER_MODEL = "ner"
+EMBEDDING_MODEL = "embedding"
+EMAIL_COLLECTION = "email_collection"
+CHUNK_COLLECTION = "chunk_collection"
+
+# Only the spaCy NER component is used; these never need to run.
+NER_DISABLED_PIPES = ["tagger", "parser", "attribute_ruler", "lemmatizer"]
+
+
+def _rss_mb() -> float:
+    """Current resident set size of the process in MB (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * resource.getpagesize() / (1024 * 1024)
+    except (OSError, IndexError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class ModelRegistry:
+    """
+    Process-wide home of the heavy models (and the Chroma collection). Each one is
+    loaded once, the first time it is asked for (or by warm_up() in the background),
+    and then shared by every service.
+    Loads of different models can run concurrently; callers asking for a model that is
+    still loading wait for that load instead of starting another.
+    """
+    def __init__(self):
+        self._loaders: Dict[str, Callable[[], Any]] = {}
+        self._models: Dict[str, Any] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._warm: Dict[str, bool] = {}
+        self.load_stats: Dict[str, dict] = {}
+
+    def register(self, name: str, loader: Callable[[], Any], warm: bool = True):
+        """Adds a model; with warm=False, warm_up() leaves it for its first get()."""
+        self._loaders[name] = loader
+        self._locks[name] = threading.Lock()
+        self._warm[name] = warm
+
+    def get(self, name: str) -> Any:
+        model = self._models.get(name)
+        if model is not None:
+            return model
+        with self._locks[name]:
+            if name not in self._models:
+                self._models[name] = self._load(name)
+            return self._models[name]
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._models
+
+    def warm_up(self, names: Optional[Iterable[str]] = None):
+        """Loads the given models (default: all registered with warm=True), logging and skipping failures."""
+        for name in names or [name for name in self._loaders if self._warm[name]]:
+            try:
+                self.get(name)
+            except Exception as e:
+                logging.error(f"Warm-up of model '{name}' failed: {e}", exc_info=True)
+
+    def status(self) -> dict:
+        return {name: {"loaded": self.is_loaded(name), **self.load_stats.get(name, {})} for name in self._loaders}
+
+    def _load(self, name: str) -> Any:
+        rss_before = _rss_mb()
+        started = time.perf_counter()
+        model = self._loaders[name]()
+        elapsed = time.perf_counter() - started
+        rss_after = _rss_mb()
+        self.load_stats[name] = {"load_seconds": round(elapsed, 2), "rss_delta_mb": round(rss_after - rss_before, 1), "rss_mb": round(rss_after, 1)}
+        logging.info(f"Loaded model '{name}' in {elapsed:.2f}s (+{rss_after - rss_before:.1f} MB, process RSS {rss_after:.1f} MB)")
+        return model
+
+
+def _load_ner():
+    import spacy
+    return spacy.load(settings.SPACY_MODEL_NAME, disable=NER_DISABLED_PIPES)
+
+def _load_embedding_model():
+    from backend.core.encoders import load_encoder
+    return load_encoder()
+
+def _chroma_client():
+    import chromadb
+    from chromadb.config import Settings as ChromaSettings
+    return chromadb.PersistentClient(path=settings.CHROMA_DB_PATH, settings=ChromaSettings(anonymized_telemetry=False))
+
+def _load_email_collection():
+    return _chroma_client().get_or_create_collection(name="emails")
+
+def _load_chunk_collection():
+    return _chroma_client().get_or_create_collection(name="email_chunks")
+
+# The single registry shared by every service in the process
+model_registry = ModelRegistry()
+model_registry.register(NER_MODEL, _load_ner)
+model_registry.register(EMBEDDING_MODEL, _load_embedding_model)
+model_registry.register(EMAIL_COLLECTION, _load_email_collection)
+# Only chunk embedding uses the chunk collection; with it off, nothing needs it at startup.
+model_registry.register(CHUNK_COLLECTION, _load_chunk_collection, warm=settings.EMBED_CHUNKS_ENABLED)
@@ -0,0 +1,211 @@
+# backend/core/pipeline.py
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Iterable, List, Optional
+
+from backend.core.metrics import PIPELINE_STAGE_BATCH_ITEMS, PIPELINE_STAGE_ITEMS, PIPELINE_STAGE_SECONDS
+
+# Marks the end of the input; each worker that receives it exits.
+_STOP = object()
+
+
+class CompletionTracker:
+    """
+    Counts down the items of one unit of work (e.g. a chunk of message IDs) as they
+    leave the pipeline. `future` resolves with the item count once every item is done,
+    or with the first exception if any item failed.
+    """
+    def __init__(self, expected: int):
+        self.future: Future = Future()
+        self._expected = expected
+        self._remaining = expected
+        self._lock = threading.Lock()
+        if expected == 0:
+            self.future.set_result(0)
+
+    def done(self, count: int = 1):
+        with self._lock:
+            self._remaining -= count
+            if self._remaining <= 0 and not self.future.done():
+                self.future.set_result(self._expected)
+
+    def fail(self, exception: BaseException):
+        with self._lock:
+            if not self.future.done():
+                self.future.set_exception(exception)
+
+
+class Stage:
+    """
+    One step of a pipeline: a bounded input queue drained by `workers` threads.
+    The handler takes a list of items and returns the items to pass downstream.
+    Workers pull up to `batch_size` items at a time, waiting at most `flush_timeout`
+    seconds for a batch to fill once its first item has arrived.
+    """
+    def __init__(
+        self,
+        name: str,
+        handler: Callable[[List[Any]], Iterable[Any]],
+        workers: int = 1,
+        queue_size: int = 100,
+        batch_size: int = 1,
+        flush_timeout: float = 0.0,
+        on_error: Optional[Callable[[List[Any], Exception], None]] = None,
+    ):
+        self.name = name
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+        self.flush_timeout = flush_timeout
+        self.on_error = on_error
+        self.queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.downstream: Optional["Stage"] = None
+        # Set by the Pipeline; labels this stage's metrics.
+        self.pipeline_name = ""
+
+        self._threads: List[threading.Thread] = []
+        self._alive = 0
+        self._lock = threading.Lock()
+        self.processed = 0
+        self.emitted = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self._alive = self.workers
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"pipeline-{self.name}-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def put(self, item: Any):
+        """Blocks while the queue is full, which is what pushes back on faster upstream stages."""
+        self.queue.put(item)
+
+    def stop(self):
+        for _ in range(self.workers):
+            self.queue.put(_STOP)
+
+    def join(self):
+        for thread in self._threads:
+            thread.join()
+
+    def _next_batch(self) -> tuple[List[Any], bool]:
+        """Returns (batch, stop_seen)."""
+        first = self.queue.get()
+        if first is _STOP:
+            return [], True
+        batch = [first]
+        deadline = time.perf_counter() + self.flush_timeout
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _work(self):
+        stop_seen = False
+        while not stop_seen:
+            batch, stop_seen = self._next_batch()
+            if not batch:
+                continue
+            started = time.perf_counter()
+            failed = False
+            try:
+                outputs = list(self.handler(batch) or [])
+            except Exception as e:
+                outputs, failed = [], True
+                with self._lock:
+                    self.errors += 1
+                logging.error(f"Pipeline stage '{self.name}' failed on {len(batch)} items: {e}", exc_info=True)
+                if self.on_error:
+                    self.on_error(batch, e)
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.processed += len(batch)
+                self.emitted += len(outputs)
+                self.busy_seconds += elapsed
+            labels = {"pipeline": self.pipeline_name, "stage": self.name}
+            PIPELINE_STAGE_SECONDS.observe(elapsed, **labels)
+            PIPELINE_STAGE_BATCH_ITEMS.observe(len(batch), **labels)
+            PIPELINE_STAGE_ITEMS.inc(len(batch), outcome="failed" if failed else "processed", **labels)
+            PIPELINE_STAGE_ITEMS.inc(len(outputs), outcome="emitted", **labels)
+            if self.downstream:
+                for output in outputs:
+                    self.downstream.put(output)
+
+        # The last worker out tells the next stage there is nothing more coming.
+        with self._lock:
+            self._alive -= 1
+            last_out = self._alive == 0
+        if last_out:
+            self.finished_at = time.perf_counter()
+            if self.downstream:
+                self.downstream.stop()
+
+    def stats(self) -> dict:
+        elapsed = (self.finished_at or time.perf_counter()) - self.started_at if self.started_at else 0.0
+        return {
+            "workers": self.workers,
+            "queue_depth": self.queue.qsize(),
+            "queue_capacity": self.queue.maxsize,
+            "processed": self.processed,
+            "emitted": self.emitted,
+            "errors": self.errors,
+            "throughput_per_sec": round(self.processed / elapsed, 2) if elapsed > 0 else 0.0,
+            "utilization": round(self.busy_seconds / (elapsed * self.workers), 3) if elapsed > 0 else 0.0,
+        }
+
+
+class Pipeline:
+    """A chain of stages joined by bounded queues."""
+    def __init__(self, name: str, stages: List[Stage]):
+        self.name = name
+        self.stages = stages
+        for stage in stages:
+            stage.pipeline_name = name
+        for upstream, downstream in zip(stages, stages[1:]):
+            upstream.downstream = downstream
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def start(self) -> "Pipeline":
+        self.started_at = time.time()
+        for stage in self.stages:
+            stage.start()
+        return self
+
+    def submit(self, item: Any):
+        self.stages[0].put(item)
+
+    def close(self):
+        """Signals end of input and waits for every stage to drain."""
+        self.stages[0].stop()
+        for stage in self.stages:
+            stage.join()
+        self.finished_at = time.time()
+
+    @property
+    def running(self) -> bool:
+        return self.started_at is not None and self.finished_at is None
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "running": self.running,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "stages": {stage.name: stage.stats() for stage in self.stages},
+        }
@@ -1,27 +1,187 @@
 # backend/core/search_service.py
-import chromadb
-from sentence_transformers import SentenceTransformer
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import parseaddr
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import ColumnElement, func, or_
+
+from backend.core.config import settings
+from backend.core.metrics import SEARCH_SECONDS
+from backend.core.model_registry import EMAIL_COLLECTION, EMBEDDING_MODEL, model_registry
 from backend.models.search import SearchResponse, SearchResultItem
 from backend.db.database import SessionLocal
 from backend.db import models
 
+def sender_address(sender: Optional[str]) -> str:
+    """The bare, lowercased address from a From header ("Ann <Ann@X.com>" -> "ann@x.com")."""
+    return parseaddr(sender or "")[1].lower()
+
+
+def vector_metadata(sender: Optional[str], subject: Optional[str], category: Optional[str], received_at: Optional[datetime], has_attachment: bool) -> dict:
+    """The Chroma metadata stored with each email vector; SearchFilters.chroma_where() filters on it."""
+    # Chroma rejects None metadata values.
+    return {
+        "sender": sender or "",
+        "sender_address": sender_address(sender),
+        "subject": subject or "",
+        "category": category or "General",
+        "received_at": int(_as_utc(received_at).timestamp()) if received_at else 0,
+        "has_attachment": has_attachment,
+    }
+
+
+def chunk_id(email_id: str, index: int) -> str:
+    """ID of an email's `index`-th body chunk in the chunk collection."""
+    return f"{email_id}#{index}"
+
+
+def best_chunk_per_email(metadatas: Sequence[dict]) -> List[str]:
+    """
+    Collapses chunk hits (closest first) to email IDs, each ranked by its closest chunk,
+    so an email with many matching chunks doesn't crowd others out of the candidates.
+    """
+    return list(dict.fromkeys(metadata["email_id"] for metadata in metadatas))
+
+
+def _as_utc(value: datetime) -> datetime:
+    """Naive datetimes are taken to be UTC, which is how the emails table stores them."""
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+@dataclass
+class SearchFilters:
+    """
+    Metadata filters for /search. Each one is pushed down into both indexes, as a Chroma
+    `where` clause and as SQL conditions on the keyword query, so filtering happens before
+    the candidate limit rather than on the few candidates that come back.
+    """
+    category: Optional[str] = None
+    sender: Optional[str] = None
+    received_after: Optional[datetime] = None
+    received_before: Optional[datetime] = None
+    has_attachment: Optional[bool] = None
+
+    def chroma_where(self) -> Optional[dict]:
+        clauses: List[Dict[str, Any]] = []
+        if self.category:
+            clauses.append({"category": {"$eq": self.category}})
+        if self.sender:
+            clauses.append({"sender_address": {"$eq": sender_address(self.sender)}})
+        if self.received_after:
+            clauses.append({"received_at": {"$gte": int(_as_utc(self.received_after).timestamp())}})
+        if self.received_before:
+            clauses.append({"received_at": {"$lt": int(_as_utc(self.received_before).timestamp())}})
+        if self.has_attachment is not None:
+            clauses.append({"has_attachment": {"$eq": self.has_attachment}})
+        if not clauses:
+            return None
+        return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+    def sql_conditions(self) -> List[ColumnElement[bool]]:
+        conditions: List[ColumnElement[bool]] = []
+        if self.category:
+            conditions.append(models.Email.category == self.category)
+        if self.sender:
+            address = sender_address(self.sender)
+            # "_" is common in addresses; escape it and "%" so they only match themselves.
+            pattern = address.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            conditions.append(or_(func.lower(models.Email.sender) == address, func.lower(models.Email.sender).like(f"%<{pattern}>", escape="\\")))
+        if self.received_after:
+            conditions.append(models.Email.received_at >= _as_utc(self.received_after).replace(tzinfo=None))
+        if self.received_before:
+            conditions.append(models.Email.received_at < _as_utc(self.received_before).replace(tzinfo=None))
+        if self.has_attachment is not None:
+            conditions.append(models.Email.attachment_count > 0 if self.has_attachment else models.Email.attachment_count == 0)
+        return conditions
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """
+    Merges ranked ID lists into one: each ID scores sum(1 / (k + rank)) over the lists it
+    appears in (rank starting at 1). Returns (id, score) pairs, best first; ties keep
+    first-seen order.
+    """
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, item_id in enumerate(ranking, start=1):
+            scores[item_id] = scores.get(item_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda pair: pair[1], reverse=True)
+
+
+def normalize_query(query: str) -> str:
+    """Case- and whitespace-insensitive form of a query (the encoder is uncased)."""
+    return " ".join(query.lower().split())
+
+
+class QueryEmbeddingCache:
+    """A thread-safe, bounded LRU map from normalized query to its embedding."""
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            embedding = self._entries.get(key)
+            if embedding is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return embedding
+
+    def put(self, key: str, embedding: List[float]):
+        with self._lock:
+            self._entries[key] = embedding
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+
 class SearchService:
     def __init__(self):
         """
-        Initializes the search service, loading the model and connecting to ChromaDB.
+        Initializes the search service. The vector model and the ChromaDB collection are
+        shared with the indexing service through the model registry.
         """
-        print("Loading Vector model for Search...")
+        self.query_cache = QueryEmbeddingCache(settings.QUERY_EMBEDDING_CACHE_SIZE)
+
+    @property
+    def vector_model(self):
         # Re-use the same model as the indexing service for consistent vectors
-        self.vector_model = SentenceTransformer('all-MiniLM-L6-v2')
-        print("Model loaded.")
+        return model_registry.get(EMBEDDING_MODEL)
 
-        # Connect to the same ChromaDB instance and collection
-        self.chroma_client = chromadb.Client()
-        # Assumes the collection has already been created by the indexing service
-        self.collection = self.chroma_client.get_or_create_collection(name="emails")
+    @property
+    def collection(self):
+        return model_registry.get(EMAIL_COLLECTION)
 
-        # Get a database session for retrieving metadata from SQLite
-        self.db = SessionLocal()
+    def embed_query(self, query: str) -> List[float]:
+        """
+        Embeds a search query with the ingestion encoder, so queries and emails share one
+        vector space. Repeated queries (up to case and whitespace) are served from the cache.
+        """
+        key = normalize_query(query)
+        embedding = self.query_cache.get(key)
+        if embedding is None:
+            embedding = self.vector_model.encode(key).tolist()
+            self.query_cache.put(key, embedding)
+        return embedding
 
     def find_results(self, query: str) -> SearchResponse:
         """
@@ -29,9 +189,12 @@ class SearchService:
         and retrieves corresponding metadata from SQLite.
         """
         print(f"Core logic received search for: '{query}'")
+        with SEARCH_SECONDS.time(mode="service", step="total"):
+            return self._find_results(query)
 
+    def _find_results(self, query: str) -> SearchResponse:
         # 1. Create a vector embedding for the user's query
-        query_embedding = self.vector_model.encode(query).tolist()
+        query_embedding = self.embed_query(query)
 
         # 2. Query ChromaDB to find the 10 most similar email IDs
         try:
@@ -52,7 +215,8 @@ class SearchService:
         distances = results['distances'][0]
 
         # Fetch all matching emails from SQLite in a single, efficient query
-        db_emails = self.db.query(models.Email).filter(models.Email.id.in_(email_ids)).all()
+        with SessionLocal() as db:
+            db_emails = db.query(models.Email).filter(models.Email.id.in_(email_ids)).all()
         
         # Create a dictionary for quick lookups by ID
         email_map = {email.id: email for email in db_emails}
@@ -69,12 +233,12 @@ class SearchService:
                 final_results.append(
                     SearchResultItem(
                         id=email_details.id,
-                        sender=email_details.sender,
-                        subject=email_details.subject,
-                        preview=email_details.snippet, # Use the snippet from SQLite
+                        sender=email_details.sender or "",
+                        subject=email_details.subject or "",
+                        preview=email_details.snippet or "", # Use the snippet from SQLite
                         relevance_score=round(relevance_score, 2),
-                        has_attachment=True if email_details.attachments else False,
-                        category=email_details.category
+                        has_attachment=email_details.attachment_count > 0,
+                        category=email_details.category or "General"
                     )
                 )
 
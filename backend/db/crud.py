@@ -1,8 +1,25 @@
 # backend/db/crud.py
 
+from datetime import datetime, timezone
+from email.utils import parseaddr
+
+from sqlalchemy import column, select, table, text, tuple_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
 from . import models
 
+# Keep IN (...) lists and multi-row VALUES well under SQLite's bound-parameter limit.
+SQL_CHUNK_SIZE = 500
+
+# Emails in this category are grouped into job_applications.
+JOB_CATEGORY = "Job Application"
+
+EMAILS_FTS = table("emails_fts", column("email_id"))
+EMAILS_FTS_INSERT = text(
+    "INSERT INTO emails_fts (email_id, subject, sender, snippet, body) "
+    "VALUES (:email_id, :subject, :sender, :snippet, :body)"
+)
+
 def get_email_by_id(db: Session, email_id: str):
     """
     Queries the database to find an email by its unique ID.
@@ -16,4 +33,287 @@ def create_email(db: Session, email: models.Email):
     db.add(email)
     db.commit()
     db.refresh(email)
-    return email
\ No newline at end of file
+    return email
+
+def get_sync_value(db: Session, key: str):
+    """
+    Returns the stored value for a sync bookkeeping key, or None if it was never set.
+    """
+    state = db.get(models.SyncState, key)
+    return state.value if state else None
+
+def set_sync_value(db: Session, key: str, value):
+    """
+    Inserts or updates a sync bookkeeping value. The caller owns the commit.
+    """
+    state = db.get(models.SyncState, key)
+    if state is None:
+        db.add(models.SyncState(key=key, value=value))
+    else:
+        state.value = value
+
+def delete_emails(db: Session, email_ids):
+    """
+    Deletes emails (and their attachments) by ID, taking them out of any job application
+    timeline they were part of. Returns the number of emails removed.
+    """
+    email_ids = list(email_ids)
+    if not email_ids:
+        return 0
+    remove_from_job_applications(db, email_ids)
+    thread_ids = {
+        thread_id or email_id
+        for thread_id, email_id in db.query(models.Email.thread_id, models.Email.id).filter(models.Email.id.in_(email_ids))
+    }
+    db.query(models.Attachment).filter(models.Attachment.email_id.in_(email_ids)).delete(synchronize_session=False)
+    deleted = db.query(models.Email).filter(models.Email.id.in_(email_ids)).delete(synchronize_session=False)
+    rebuild_threads(db, thread_ids)
+    return deleted
+
+def update_email_labels(db: Session, labels_by_id: dict):
+    """
+    Overwrites the stored Gmail labels for each known email ID.
+    """
+    for email_id, label_ids in labels_by_id.items():
+        db.query(models.Email).filter(models.Email.id == email_id).update(
+            {models.Email.label_ids: ",".join(label_ids)}, synchronize_session=False
+        )
+
+
+def get_existing_email_ids(db: Session, email_ids) -> set:
+    """
+    Returns the subset of `email_ids` already stored, using one IN (...) query per 500 IDs.
+    """
+    email_ids = list(email_ids)
+    existing: set[str] = set()
+    for start in range(0, len(email_ids), SQL_CHUNK_SIZE):
+        chunk = email_ids[start:start + SQL_CHUNK_SIZE]
+        existing.update(row[0] for row in db.query(models.Email.id).filter(models.Email.id.in_(chunk)))
+    return existing
+
+def get_all_email_ids(db: Session) -> set:
+    """
+    Returns the ID of every stored email.
+    """
+    return set(db.scalars(select(models.Email.id)))
+
+def bulk_insert_emails(db: Session, email_rows: list, attachment_rows: list, bodies: dict | None = None) -> set:
+    """
+    Inserts email rows with INSERT ... ON CONFLICT DO NOTHING and returns the IDs that were
+    actually inserted. Attachment rows (dicts with an `email_id`) are only written for those
+    emails, so a message that was already stored never gets duplicate attachments. The
+    inserted emails are also added to the full-text index, with their body text taken from
+    `bodies` (email ID -> text). The caller owns the commit.
+    """
+    inserted: set[str] = set()
+    for start in range(0, len(email_rows), SQL_CHUNK_SIZE):
+        stmt = (
+            sqlite_insert(models.Email)
+            .values(email_rows[start:start + SQL_CHUNK_SIZE])
+            .on_conflict_do_nothing(index_elements=[models.Email.id])
+            .returning(models.Email.id)
+        )
+        inserted.update(db.execute(stmt).scalars())
+
+    attachment_rows = [row for row in attachment_rows if row["email_id"] in inserted]
+    for start in range(0, len(attachment_rows), SQL_CHUNK_SIZE):
+        db.execute(sqlite_insert(models.Attachment).values(attachment_rows[start:start + SQL_CHUNK_SIZE]))
+
+    bodies = bodies or {}
+    search_rows = [
+        {"email_id": row["id"], "subject": row.get("subject") or "", "sender": row.get("sender") or "",
+         "snippet": row.get("snippet") or "", "body": bodies.get(row["id"], "")}
+        for row in email_rows if row["id"] in inserted
+    ]
+    if search_rows:
+        db.execute(EMAILS_FTS_INSERT, search_rows)
+
+    new_rows = [row for row in email_rows if row["id"] in inserted]
+    upsert_threads(db, new_rows)
+    upsert_job_applications(db, new_rows)
+    return inserted
+
+def fts_match_expression(query: str) -> str:
+    """
+    Turns free text into an FTS5 query: every word must match, punctuation inside a word
+    (an email address, an order number) is matched as a phrase, and the last word also
+    matches as a prefix so results keep up with typing. Returns "" for an empty query.
+    """
+    terms = ['"' + term.replace('"', '""') + '"' for term in query.split()]
+    if not terms:
+        return ""
+    terms[-1] += "*"
+    return " ".join(terms)
+
+def keyword_search(db: Session, query: str, limit: int, conditions=()) -> list:
+    """
+    Returns up to `limit` email IDs matching `query` in the full-text index, best first.
+    Ranked by BM25 with subject hits weighted above sender, snippet and body hits.
+    `conditions` are extra WHERE clauses on models.Email, applied before the limit.
+    """
+    match = fts_match_expression(query)
+    if not match:
+        return []
+    stmt = (
+        select(EMAILS_FTS.c.email_id)
+        .where(text("emails_fts MATCH :match").bindparams(match=match))
+        .order_by(text("bm25(emails_fts, 0.0, 4.0, 2.0, 1.0, 1.0)"))
+        .limit(limit)
+    )
+    if conditions:
+        stmt = stmt.join(models.Email, models.Email.id == EMAILS_FTS.c.email_id).where(*conditions)
+    return list(db.execute(stmt).scalars())
+
+def job_company_key(company) -> str:
+    return (company or "").strip().lower()
+
+def _naive_utc(received_at) -> datetime:
+    """Stored DateTimes are naive UTC; ingestion hands over aware ones."""
+    if received_at is None:
+        received_at = datetime.now(timezone.utc)
+    if received_at.tzinfo is not None:
+        received_at = received_at.astimezone(timezone.utc).replace(tzinfo=None)
+    return received_at
+
+def _timeline_time(received_at) -> str:
+    """Timeline timestamps use SQLite's DateTime text format, in UTC, so they sort as strings."""
+    return _naive_utc(received_at).isoformat(sep=" ", timespec="microseconds")
+
+def _apply_timeline(application: models.JobApplication, timeline: list):
+    """Sets an application's timeline and the summary columns derived from it."""
+    timeline = sorted(timeline, key=lambda event: (event["received_at"], event["email_id"]))
+    latest = timeline[-1]
+    application.timeline = timeline
+    application.status = latest["status"]
+    application.subject = latest["subject"]
+    application.latest_email_id = latest["email_id"]
+    application.first_seen_at = datetime.fromisoformat(timeline[0]["received_at"])
+    application.last_updated_at = datetime.fromisoformat(latest["received_at"])
+    application.email_count = len(timeline)
+
+def upsert_job_applications(db: Session, email_rows: list):
+    """
+    Folds newly stored job emails into their applications (company + thread), creating
+    applications as needed. Emails may arrive in any order; the status always comes from
+    the most recently received one. The caller owns the commit.
+    """
+    job_rows = [row for row in email_rows if row.get("category") == JOB_CATEGORY]
+    if not job_rows:
+        return
+    thread_ids = {row["thread_id"] or row["id"] for row in job_rows}
+    applications: dict[tuple[str, str], models.JobApplication] = {
+        (application.company_key, application.thread_id): application
+        for application in db.query(models.JobApplication).filter(models.JobApplication.thread_id.in_(thread_ids))
+    }
+    timelines: dict[tuple[str, str], list[dict]] = {}
+    for row in job_rows:
+        key = (job_company_key(row.get("job_company")), row["thread_id"] or row["id"])
+        if key not in applications:
+            applications[key] = models.JobApplication(company_key=key[0], thread_id=key[1], company=row.get("job_company"), timeline=[])
+            db.add(applications[key])
+        timeline = timelines.setdefault(key, list(applications[key].timeline or []))
+        timeline.append({
+            "email_id": row["id"],
+            "status": row.get("job_status") or "Applied",
+            "subject": row.get("subject"),
+            "received_at": _timeline_time(row.get("received_at")),
+        })
+    for key, timeline in timelines.items():
+        _apply_timeline(applications[key], timeline)
+    # Sessions don't autoflush; later batches in the same transaction must see these rows.
+    db.flush()
+
+def remove_from_job_applications(db: Session, email_ids):
+    """Drops deleted emails from their applications' timelines, deleting emptied applications."""
+    email_ids = set(email_ids)
+    thread_ids = {
+        row[0] or row[1]
+        for row in db.query(models.Email.thread_id, models.Email.id).filter(models.Email.id.in_(email_ids), models.Email.category == JOB_CATEGORY)
+    }
+    if not thread_ids:
+        return
+    for application in db.query(models.JobApplication).filter(models.JobApplication.thread_id.in_(thread_ids)):
+        timeline = [event for event in application.timeline if event["email_id"] not in email_ids]
+        if not timeline:
+            db.delete(application)
+        elif len(timeline) != len(application.timeline):
+            _apply_timeline(application, timeline)
+    db.flush()
+
+def job_applications_page_query(statuses=None, cursor=None, limit: int = 50):
+    """
+    A SELECT for one page of job applications, newest activity first. `cursor` is the
+    (last_updated_at, id) of the last row of the previous page; seeking past it with
+    the (status,) last_updated_at, id index keeps every page equally cheap.
+    """
+    stmt = select(models.JobApplication)
+    if statuses:
+        stmt = stmt.where(models.JobApplication.status.in_(statuses))
+    if cursor:
+        stmt = stmt.where(tuple_(models.JobApplication.last_updated_at, models.JobApplication.id) < tuple_(*cursor))
+    return stmt.order_by(models.JobApplication.last_updated_at.desc(), models.JobApplication.id.desc()).limit(limit)
+
+def _fold_into_thread(thread: models.Thread, row: dict):
+    """Adds one email (a row dict, as stored) to a thread's rollup."""
+    received_at = _naive_utc(row.get("received_at"))
+    thread.message_count = (thread.message_count or 0) + 1
+    address = parseaddr(row.get("sender") or "")[1].lower()
+    if address and address not in (thread.participants or []):
+        thread.participants = sorted([*(thread.participants or []), address])
+    if thread.first_received_at is None or received_at < thread.first_received_at:
+        thread.first_received_at = received_at
+    if thread.last_received_at is None or received_at >= thread.last_received_at:
+        thread.last_received_at = received_at
+        thread.latest_email_id = row["id"]
+        thread.subject = row.get("subject")
+        thread.latest_category = row.get("category")
+        thread.latest_job_status = row.get("job_status")
+
+def upsert_threads(db: Session, email_rows: list):
+    """Folds newly stored emails into their thread rollups. The caller owns the commit."""
+    if not email_rows:
+        return
+    thread_ids = {row["thread_id"] or row["id"] for row in email_rows}
+    threads: dict[str, models.Thread] = {thread.thread_id: thread for thread in db.query(models.Thread).filter(models.Thread.thread_id.in_(thread_ids))}
+    for row in sorted(email_rows, key=lambda row: (_naive_utc(row.get("received_at")), row["id"])):
+        thread_id = row["thread_id"] or row["id"]
+        if thread_id not in threads:
+            threads[thread_id] = models.Thread(thread_id=thread_id, participants=[])
+            db.add(threads[thread_id])
+        _fold_into_thread(threads[thread_id], row)
+    db.flush()
+
+def rebuild_threads(db: Session, thread_ids):
+    """
+    Recomputes the given threads from their remaining emails (through ix_emails_thread_id),
+    deleting threads that have none left. Used after deletes, which can't be folded out of
+    a rollup incrementally.
+    """
+    thread_ids = set(thread_ids)
+    if not thread_ids:
+        return
+    threads = {thread.thread_id: thread for thread in db.query(models.Thread).filter(models.Thread.thread_id.in_(thread_ids))}
+    for thread in threads.values():
+        thread.message_count, thread.participants = 0, []
+        thread.first_received_at = thread.last_received_at = None
+    emails = (
+        db.query(models.Email.id, models.Email.thread_id, models.Email.sender, models.Email.subject,
+                 models.Email.received_at, models.Email.category, models.Email.job_status)
+        .filter(models.Email.thread_id.in_(thread_ids) | models.Email.id.in_(thread_ids))
+        .order_by(models.Email.received_at, models.Email.id)
+    )
+    for email in emails:
+        thread_id = email.thread_id or email.id
+        if thread_id in threads:
+            _fold_into_thread(threads[thread_id], email._asdict())
+    for thread in threads.values():
+        if not thread.message_count:
+            db.delete(thread)
+    db.flush()
+
+def threads_page_query(cursor=None, limit: int = 50):
+    """A SELECT for one page of threads, most recent activity first, seeking past `cursor` (last_received_at, thread_id)."""
+    stmt = select(models.Thread)
+    if cursor:
+        stmt = stmt.where(tuple_(models.Thread.last_received_at, models.Thread.thread_id) < tuple_(*cursor))
+    return stmt.order_by(models.Thread.last_received_at.desc(), models.Thread.thread_id.desc()).limit(limit)
@@ -1,14 +1,92 @@
 # backend/db/database.py
-from sqlalchemy import create_engine
+from typing import AsyncIterator
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from .models import Base
 
 from backend.core.config import settings
 
 DATABASE_URL = f"sqlite:///./{settings.SQLITE_PATH}"
+ASYNC_DATABASE_URL = f"sqlite+aiosqlite:///./{settings.SQLITE_PATH}"
+
+def sqlite_pragmas() -> list:
+    """The PRAGMAs run on every new connection under the configured storage profile."""
+    if settings.SQLITE_PROFILE != "tuned":
+        return []
+    return [
+        f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}",
+        f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}",
+        f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE}",
+        f"PRAGMA cache_size={settings.SQLITE_CACHE_SIZE}",
+        f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}",
+    ]
+
+def _apply_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for pragma in sqlite_pragmas():
+        cursor.execute(pragma)
+    cursor.close()
+
+def create_reader_engine(url: str = DATABASE_URL):
+    """Pooled connections for request handlers and other readers."""
+    pool_options = {}
+    if settings.SQLITE_PROFILE == "tuned":
+        pool_options = {"pool_size": settings.SQLITE_POOL_SIZE, "max_overflow": settings.SQLITE_MAX_OVERFLOW}
+    reader = create_engine(url, connect_args={"check_same_thread": False}, **pool_options)
+    event.listen(reader, "connect", _apply_pragmas)
+    return reader
+
+def create_async_reader_engine(url: str = ASYNC_DATABASE_URL):
+    """The reader pool for async request handlers, with the same pragmas as the sync one."""
+    pool_options = {}
+    if settings.SQLITE_PROFILE == "tuned":
+        pool_options = {"pool_size": settings.SQLITE_POOL_SIZE, "max_overflow": settings.SQLITE_MAX_OVERFLOW}
+    reader = create_async_engine(url, **pool_options)
+    event.listen(reader.sync_engine, "connect", _apply_pragmas)
+    return reader
+
+def create_writer_engine(url: str = DATABASE_URL):
+    """
+    A single pooled connection that every write goes through, so writers queue up in
+    the pool instead of contending for SQLite's lock. Transactions start with BEGIN
+    IMMEDIATE, taking the write lock up front rather than failing to upgrade a read
+    lock halfway through.
+    """
+    writer = create_engine(
+        url,
+        connect_args={"check_same_thread": False},
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=settings.SQLITE_WRITER_TIMEOUT,
+    )
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+    @event.listens_for(writer, "connect")
+    def _connect(dbapi_connection, connection_record):
+        _apply_pragmas(dbapi_connection, connection_record)
+        # Let SQLAlchemy's "begin" event, not the sqlite3 driver, open transactions.
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(writer, "begin")
+    def _begin(connection):
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+    return writer
+
+engine = create_reader_engine()
+writer_engine = create_writer_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Sessions that write. Only one is connected at a time; the next waits for it to finish.
+WriterSession = sessionmaker(autocommit=False, autoflush=False, bind=writer_engine)
+
+async_engine = create_async_reader_engine()
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    """FastAPI dependency: an AsyncSession for the duration of one request."""
+    async with AsyncSessionLocal() as session:
+        yield session
 
 def create_db_and_tables():
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    Base.metadata.create_all(bind=engine)
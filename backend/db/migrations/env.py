@@ -20,8 +20,10 @@ from backend.core.config import settings  # noqa: E402
 # Alembic Config object, provides access to the .ini file values.
 config = context.config
 
-# Interpret the config file for Python logging.
-fileConfig(config.config_file_name)
+# Interpret the config file for Python logging. alembic.ini carries no logging
+# sections (the app configures logging itself), so only do this when present.
+if config.config_file_name is not None and config.file_config.has_section("formatters"):
+    fileConfig(config.config_file_name)
 
 # Metadata for 'autogenerate'
 target_metadata = Base.metadata
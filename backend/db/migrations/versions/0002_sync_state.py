@@ -0,0 +1,29 @@
+"""Add sync_state table and emails.label_ids for history-based sync.
+
+Revision ID: 0002_sync_state
+Revises: 0001_initial
+Create Date: 2026-10-18
+"""
+from alembic import op  # type: ignore
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0002_sync_state"
+down_revision = "0001_initial"
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_table(
+        "sync_state",
+        sa.Column("key", sa.String(), primary_key=True),
+        sa.Column("value", sa.String(), nullable=True),
+        sa.Column("updated_at", sa.DateTime()),
+    )
+    op.add_column("emails", sa.Column("label_ids", sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("emails") as batch_op:
+        batch_op.drop_column("label_ids")
+    op.drop_table("sync_state")
@@ -0,0 +1,34 @@
+"""Add the emails_fts full-text index for keyword and hybrid search.
+
+Revision ID: 0003_emails_fts
+Revises: 0002_sync_state
+Create Date: 2026-10-18
+"""
+from alembic import op  # type: ignore
+
+# revision identifiers, used by Alembic.
+revision = "0003_emails_fts"
+down_revision = "0002_sync_state"
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.execute(
+        "CREATE VIRTUAL TABLE emails_fts USING fts5("
+        "email_id UNINDEXED, subject, sender, snippet, body, "
+        "tokenize = 'unicode61 remove_diacritics 2')"
+    )
+    op.execute(
+        "CREATE TRIGGER emails_fts_delete AFTER DELETE ON emails BEGIN "
+        "DELETE FROM emails_fts WHERE email_id = old.id; END"
+    )
+    # Message bodies were never stored, so existing mail is indexed on its headers and snippet.
+    op.execute(
+        "INSERT INTO emails_fts (email_id, subject, sender, snippet, body) "
+        "SELECT id, coalesce(subject, ''), coalesce(sender, ''), coalesce(snippet, ''), '' FROM emails"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS emails_fts_delete")
+    op.execute("DROP TABLE IF EXISTS emails_fts")
@@ -0,0 +1,22 @@
+"""Index the columns /search filters on.
+
+Revision ID: 0004_search_filter_indexes
+Revises: 0003_emails_fts
+Create Date: 2026-10-18
+"""
+from alembic import op  # type: ignore
+
+# revision identifiers, used by Alembic.
+revision = "0004_search_filter_indexes"
+down_revision = "0003_emails_fts"
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_index("ix_emails_category", "emails", ["category"])
+    op.create_index("ix_attachments_email_id", "attachments", ["email_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_attachments_email_id", table_name="attachments")
+    op.drop_index("ix_emails_category", table_name="emails")
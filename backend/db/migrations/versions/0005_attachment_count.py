@@ -0,0 +1,26 @@
+"""Add emails.attachment_count so result lists don't lazy-load attachments per row.
+
+Revision ID: 0005_attachment_count
+Revises: 0004_search_filter_indexes
+Create Date: 2026-10-18
+"""
+from alembic import op  # type: ignore
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0005_attachment_count"
+down_revision = "0004_search_filter_indexes"
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.add_column("emails", sa.Column("attachment_count", sa.Integer(), nullable=False, server_default="0"))
+    op.execute(
+        "UPDATE emails SET attachment_count = "
+        "(SELECT count(*) FROM attachments WHERE attachments.email_id = emails.id)"
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("emails") as batch_op:
+        batch_op.drop_column("attachment_count")
@@ -0,0 +1,71 @@
+"""Add the job_applications table behind the job tracker and fill it from stored mail.
+
+Revision ID: 0006_job_applications
+Revises: 0005_attachment_count
+Create Date: 2026-10-18
+"""
+from alembic import op  # type: ignore
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0006_job_applications"
+down_revision = "0005_attachment_count"
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_table(
+        "job_applications",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("company_key", sa.String(), nullable=False),
+        sa.Column("thread_id", sa.String(), nullable=False),
+        sa.Column("company", sa.String(), nullable=True),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("subject", sa.String()),
+        sa.Column("latest_email_id", sa.String()),
+        sa.Column("first_seen_at", sa.DateTime()),
+        sa.Column("last_updated_at", sa.DateTime(), nullable=False),
+        sa.Column("email_count", sa.Integer(), nullable=False),
+        sa.Column("timeline", sa.JSON(), nullable=False),
+        sa.UniqueConstraint("company_key", "thread_id", name="uq_job_applications_company_thread"),
+    )
+    op.create_index("ix_job_applications_thread", "job_applications", ["thread_id"])
+    op.create_index("ix_job_applications_updated", "job_applications", ["last_updated_at", "id"])
+    op.create_index("ix_job_applications_status_updated", "job_applications", ["status", "last_updated_at", "id"])
+
+    # Group the job emails already stored into applications.
+    bind = op.get_bind()
+    rows = bind.execute(sa.text(
+        "SELECT id, thread_id, job_company, job_status, subject, received_at FROM emails "
+        "WHERE category = 'Job Application' ORDER BY received_at, id"
+    )).fetchall()
+    applications: dict[tuple[str, str], dict] = {}
+    for email_id, thread_id, company, status, subject, received_at in rows:
+        key = ((company or "").strip().lower(), thread_id or email_id)
+        application = applications.setdefault(key, {"company": company, "timeline": []})
+        application["timeline"].append({"email_id": email_id, "status": status or "Applied", "subject": subject, "received_at": str(received_at) if received_at else None})
+
+    table = sa.table(
+        "job_applications",
+        *[sa.column(name) for name in ("company_key", "thread_id", "company", "status", "subject", "latest_email_id", "first_seen_at", "last_updated_at", "email_count")],
+        sa.column("timeline", sa.JSON()),
+    )
+    values = []
+    for (company_key, thread_id), application in applications.items():
+        timeline = application["timeline"]
+        latest = timeline[-1]
+        values.append({
+            "company_key": company_key, "thread_id": thread_id, "company": application["company"],
+            "status": latest["status"], "subject": latest["subject"], "latest_email_id": latest["email_id"],
+            "first_seen_at": timeline[0]["received_at"], "last_updated_at": latest["received_at"] or "1970-01-01 00:00:00",
+            "email_count": len(timeline), "timeline": timeline,
+        })
+    if values:
+        op.bulk_insert(table, values)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_job_applications_status_updated", table_name="job_applications")
+    op.drop_index("ix_job_applications_updated", table_name="job_applications")
+    op.drop_index("ix_job_applications_thread", table_name="job_applications")
+    op.drop_table("job_applications")
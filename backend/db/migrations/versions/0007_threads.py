@@ -0,0 +1,66 @@
+"""Index emails.thread_id and add the threads rollup, filled from stored mail.
+
+Revision ID: 0007_threads
+Revises: 0006_job_applications
+Create Date: 2026-10-18
+"""
+from email.utils import parseaddr
+
+from alembic import op  # type: ignore
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0007_threads"
+down_revision = "0006_job_applications"
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_index("ix_emails_thread_id", "emails", ["thread_id"])
+    op.create_table(
+        "threads",
+        sa.Column("thread_id", sa.String(), primary_key=True),
+        sa.Column("message_count", sa.Integer(), nullable=False),
+        sa.Column("participants", sa.JSON(), nullable=False),
+        sa.Column("first_received_at", sa.DateTime()),
+        sa.Column("last_received_at", sa.DateTime(), nullable=False),
+        sa.Column("latest_email_id", sa.String()),
+        sa.Column("subject", sa.String()),
+        sa.Column("latest_category", sa.String()),
+        sa.Column("latest_job_status", sa.String()),
+    )
+    op.create_index("ix_threads_last_received", "threads", ["last_received_at", "thread_id"])
+
+    # Roll up the emails already stored; ordered so the last email seen is the latest.
+    bind = op.get_bind()
+    rows = bind.execute(sa.text(
+        "SELECT id, thread_id, sender, subject, received_at, category, job_status FROM emails ORDER BY received_at, id"
+    ))
+    threads: dict[str, dict] = {}
+    for email_id, thread_id, sender, subject, received_at, category, job_status in rows:
+        received_at = received_at or "1970-01-01 00:00:00.000000"
+        thread = threads.setdefault(thread_id or email_id, {
+            "thread_id": thread_id or email_id, "message_count": 0, "participants": set(), "first_received_at": received_at,
+        })
+        thread["message_count"] += 1
+        address = parseaddr(sender or "")[1].lower()
+        if address:
+            thread["participants"].add(address)
+        thread.update(last_received_at=received_at, latest_email_id=email_id, subject=subject,
+                      latest_category=category, latest_job_status=job_status)
+
+    table = sa.table(
+        "threads",
+        *[sa.column(name) for name in ("thread_id", "message_count", "first_received_at", "last_received_at",
+                                       "latest_email_id", "subject", "latest_category", "latest_job_status")],
+        sa.column("participants", sa.JSON()),
+    )
+    values = [{**thread, "participants": sorted(thread["participants"])} for thread in threads.values()]
+    for start in range(0, len(values), 500):
+        op.bulk_insert(table, values[start:start + 500])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_threads_last_received", table_name="threads")
+    op.drop_table("threads")
+    op.drop_index("ix_emails_thread_id", table_name="emails")
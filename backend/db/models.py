@@ -1,39 +1,126 @@
 # backend/db/models.py
 
-from sqlalchemy import Column, String, DateTime, ForeignKey, Integer
-from sqlalchemy.orm import relationship, declarative_base
+from sqlalchemy import DDL, JSON, Column, String, DateTime, ForeignKey, Index, Integer, UniqueConstraint, event
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 from datetime import datetime
+from typing import List, Optional
 
-Base = declarative_base()
+class Base(DeclarativeBase):
+    pass
 
 class Email(Base):
     __tablename__ = "emails"
 
-    id = Column(String, primary_key=True, index=True)
-    thread_id = Column(String)
-    sender = Column(String)
-    subject = Column(String)
-    snippet = Column(String)
-    category = Column(String, default="General")
-    job_company = Column(String, nullable=True)
-    job_status = Column(String, default="Applied") # e.g., Applied, Interview, Offer, Rejected
+    id: Mapped[str] = mapped_column(String, primary_key=True, index=True)
+    thread_id: Mapped[Optional[str]] = mapped_column(String, index=True)
+    sender: Mapped[Optional[str]] = mapped_column(String)
+    subject: Mapped[Optional[str]] = mapped_column(String)
+    snippet: Mapped[Optional[str]] = mapped_column(String)
+    category: Mapped[Optional[str]] = mapped_column(String, default="General", index=True)
+    job_company: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    job_status: Mapped[Optional[str]] = mapped_column(String, default="Applied") # e.g., Applied, Interview, Offer, Rejected
 
     # --- NEW AND CRUCIAL COLUMN ---
     # This will store the UTC timestamp of when the email was received.
     # It's indexed for fast lookups to find the latest email.
-    received_at = Column(DateTime, default=datetime.utcnow, index=True)
+    received_at: Mapped[Optional[datetime]] = mapped_column(DateTime, default=datetime.utcnow, index=True)
+
+    # Comma-separated Gmail label IDs, kept current by the history sync.
+    label_ids: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+
+    # Number of attachments, written with the email so lists can show it without a join.
+    attachment_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
 
     # Relationship to attachments
-    attachments = relationship("Attachment", back_populates="email")
+    attachments: Mapped[List["Attachment"]] = relationship("Attachment", back_populates="email")
+
+# Full-text index over each email's headers, snippet and body text (see migration
+# 0003_emails_fts). It is an FTS5 virtual table, so it is not mapped; ingestion writes
+# to it through crud.bulk_insert_emails and a trigger removes rows for deleted emails.
+EMAILS_FTS_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS emails_fts USING fts5("
+    "email_id UNINDEXED, subject, sender, snippet, body, "
+    "tokenize = 'unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS emails_fts_delete AFTER DELETE ON emails BEGIN "
+    "DELETE FROM emails_fts WHERE email_id = old.id; END",
+]
+for statement in EMAILS_FTS_DDL:
+    # Lets metadata.create_all() (used for test databases) build the same schema as the migrations.
+    event.listen(Email.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
 
 class Attachment(Base):
     __tablename__ = "attachments"
 
-    id = Column(Integer, primary_key=True, index=True)
-    filename = Column(String)
-    mime_type = Column(String)
-    size = Column(Integer)
-    email_id = Column(String, ForeignKey("emails.id"))
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    filename: Mapped[Optional[str]] = mapped_column(String)
+    mime_type: Mapped[Optional[str]] = mapped_column(String)
+    size: Mapped[Optional[int]] = mapped_column(Integer)
+    email_id: Mapped[Optional[str]] = mapped_column(String, ForeignKey("emails.id"), index=True)
 
     # Relationship to email
-    email = relationship("Email", back_populates="attachments")
+    email: Mapped[Optional["Email"]] = relationship("Email", back_populates="attachments")
+
+class JobApplication(Base):
+    """
+    One row per job application (company + Gmail thread), maintained incrementally by
+    ingestion so the job tracker never scans the emails table.
+    """
+    __tablename__ = "job_applications"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    # Lowercased company name ("" when unknown); with thread_id, identifies the application.
+    company_key: Mapped[str] = mapped_column(String, nullable=False)
+    thread_id: Mapped[str] = mapped_column(String, nullable=False)
+    company: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    # Status, subject and email of the most recently received email in the application.
+    status: Mapped[str] = mapped_column(String, nullable=False)
+    subject: Mapped[Optional[str]] = mapped_column(String)
+    latest_email_id: Mapped[Optional[str]] = mapped_column(String)
+    first_seen_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    last_updated_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    email_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    # [{"email_id", "status", "subject", "received_at"}, ...], oldest first.
+    timeline: Mapped[List[dict]] = mapped_column(JSON, nullable=False, default=list)
+
+    __table_args__ = (
+        UniqueConstraint("company_key", "thread_id", name="uq_job_applications_company_thread"),
+        # Ingestion and deletion look applications up by thread alone.
+        Index("ix_job_applications_thread", "thread_id"),
+        # Keyset pagination, newest first, with and without a status filter.
+        Index("ix_job_applications_updated", "last_updated_at", "id"),
+        Index("ix_job_applications_status_updated", "status", "last_updated_at", "id"),
+    )
+
+class Thread(Base):
+    """
+    Per-conversation rollup of the emails table, maintained incrementally by ingestion
+    so thread lists never group over emails.
+    """
+    __tablename__ = "threads"
+
+    # Gmail thread ID (the email ID for mail stored without one).
+    thread_id: Mapped[str] = mapped_column(String, primary_key=True)
+    message_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    # Sorted, lowercased sender addresses.
+    participants: Mapped[List[str]] = mapped_column(JSON, nullable=False, default=list)
+    first_received_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    # None only while crud is (re)building the rollup in memory; never stored.
+    last_received_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=False)
+    # Taken from the most recently received email in the thread.
+    latest_email_id: Mapped[Optional[str]] = mapped_column(String)
+    subject: Mapped[Optional[str]] = mapped_column(String)
+    latest_category: Mapped[Optional[str]] = mapped_column(String)
+    latest_job_status: Mapped[Optional[str]] = mapped_column(String)
+
+    __table_args__ = (
+        # Keyset pagination, most recent activity first.
+        Index("ix_threads_last_received", "last_received_at", "thread_id"),
+    )
+
+class SyncState(Base):
+    """Small key/value store for sync bookkeeping, e.g. the last Gmail historyId."""
+    __tablename__ = "sync_state"
+
+    key = Column(String, primary_key=True)
+    value = Column(String, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -18,11 +18,17 @@ from backend.core.logging_setup import configure_logging
 configure_logging()
 
 from backend.db.migrate import run_migrations
-from backend.api import search, auth, ingest, jobs, logger
+from backend.api import search, auth, ingest, jobs, logger, metrics, threads
 from backend.core.config import settings
+from backend.core.embedding_cache import embedding_cache
 from backend.core.ingestion_service import ingestion_service
+from backend.core.model_registry import model_registry
 from backend.core.auth_service import get_user_credentials, build_google_service
 
+def _log_warmup_failure(task: asyncio.Task):
+    if not task.cancelled() and task.exception():
+        logging.error("Model warm-up failed", exc_info=task.exception())
+
 # This runs once when the application starts
 
 
@@ -31,11 +37,18 @@ async def lifespan(app: FastAPI):
     # This block runs on application startup
     print("--- Aperture Backend starting up ---")
     
-    log_manager.set_main_loop()
+    log_manager.start()
 
     # Ensure database schema exists before handling requests
     run_migrations()
 
+    # Models load in a worker thread so the server starts answering right away;
+    # anything that needs a model before then simply waits for that one load.
+    # The task is kept on app.state so it is not garbage-collected mid-load.
+    if settings.MODEL_WARMUP_ON_STARTUP:
+        app.state.model_warmup = asyncio.create_task(to_thread.run_sync(model_registry.warm_up))
+        app.state.model_warmup.add_done_callback(_log_warmup_failure)
+
     async def startup_ingestion_task():
         # Wait a few seconds for the server to be fully ready
         await asyncio.sleep(5)
@@ -58,6 +71,8 @@ async def lifespan(app: FastAPI):
     yield
     # This block runs on application shutdown
     print("--- Aperture Backend shutting down ---")
+    await log_manager.stop()
+    embedding_cache.close()
 
 # --- FastAPI App Initialization ---
 app = FastAPI(
@@ -79,9 +94,11 @@ app.include_router(auth.router, prefix="/api/v1/auth", tags=["Authentication"])
 app.include_router(ingest.router, prefix="/api/v1/ingest", tags=["Ingestion"])
 app.include_router(search.router, prefix="/api/v1/search", tags=["Search"])
 app.include_router(jobs.router, prefix="/api/v1/jobs", tags=["Jobs"])
+app.include_router(threads.router, prefix="/api/v1/threads", tags=["Threads"])
 app.include_router(logger.router, prefix="/api/v1/log", tags=["Logging"])
+app.include_router(metrics.router, tags=["Metrics"])
 
 @app.get("/", tags=["Health Check"])
 def read_root():
     """A simple health check endpoint."""
-    return {"status": "ok", "message": f"Welcome to {settings.APP_NAME} v{app.version}"}
\ No newline at end of file
+    return {"status": "ok", "message": f"Welcome to {settings.APP_NAME} v{app.version}", "models": model_registry.status()}
\ No newline at end of file
@@ -0,0 +1,154 @@
+"""Endpoint latency at high client concurrency.
+
+Seeds a scratch database, starts the API under uvicorn, and has ``--clients``
+concurrent HTTP clients call ``/search`` (keyword mode, so no model is loaded)
+and ``/jobs`` back to back for ``--seconds``. Reports p50/p95/p99 latency and
+throughput::
+
+    python -m benchmarks.bench_api_latency --clients 200 --seconds 15
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.bench_sqlite_concurrency import QUERIES, email_rows
+
+
+def seed(seed_emails: int) -> None:
+    """Runs in a subprocess with SQLITE_PATH pointing at the scratch database."""
+    from backend.db import crud
+    from backend.db.database import WriterSession
+    from backend.db.migrate import run_migrations
+
+    run_migrations()
+    for start in range(0, seed_emails, 500):
+        rows = email_rows(start, min(500, seed_emails - start), seed=start)
+        db = WriterSession()
+        try:
+            crud.bulk_insert_emails(db, rows, [], bodies={row["id"]: row["snippet"] for row in rows})
+            db.commit()
+        finally:
+            db.close()
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _wait_until_up(base_url: str, timeout: float = 60.0) -> None:
+    import httpx
+
+    deadline = time.perf_counter() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.perf_counter() < deadline:
+            try:
+                if (await client.get(f"{base_url}/")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError("API server did not start")
+
+
+async def load(base_url: str, clients: int, seconds: float, jobs_share: float) -> dict:
+    import httpx
+
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + seconds
+
+    async def client_loop(index: int, client: "httpx.AsyncClient"):
+        nonlocal errors
+        rng = random.Random(index)
+        while time.perf_counter() < deadline:
+            path = "/api/v1/jobs/" if rng.random() < jobs_share else f"/api/v1/search/?mode=keyword&query={rng.choice(QUERIES)}"
+            started = time.perf_counter()
+            try:
+                ok = (await client.get(base_url + path)).status_code == 200
+            except httpx.HTTPError:
+                ok = False
+            latencies.append(time.perf_counter() - started)
+            errors += not ok
+
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(limits=limits, timeout=120.0) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(client_loop(i, client) for i in range(clients)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+
+    def percentile(p: float) -> float:
+        return round(latencies[max(0, int(len(latencies) * p) - 1)] * 1000, 1)
+
+    return {
+        "clients": clients,
+        "requests": len(latencies),
+        "errors": errors,
+        "requests_per_sec": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "p95_ms": percentile(0.95),
+        "p99_ms": percentile(0.99),
+    }
+
+
+def run(clients: int, seconds: float, seed_emails: int, jobs_share: float) -> dict:
+    # DATABASE_URL is relative to the working directory, so the scratch database lives under it.
+    scratch = tempfile.mkdtemp(prefix="bench_api_", dir=".")
+    env = {**os.environ, "SQLITE_PATH": os.path.join(os.path.basename(scratch), "bench.db"),
+           "CHROMA_DB_PATH": os.path.join(scratch, "chroma"), "MODEL_WARMUP_ON_STARTUP": "false"}
+    port = _free_port()
+    server = None
+    try:
+        subprocess.run([sys.executable, "-m", "benchmarks.bench_api_latency", "--seed", str(seed_emails)],
+                       env=env, check=True, capture_output=True)
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "backend.main:app", "--port", str(port), "--log-level", "warning", "--no-access-log"],
+            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        base_url = f"http://127.0.0.1:{port}"
+        asyncio.run(_wait_until_up(base_url))
+        result = asyncio.run(load(base_url, clients, seconds, jobs_share))
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    print(f"{result['clients']} clients: p50 {result['p50_ms']} ms, p95 {result['p95_ms']} ms, p99 {result['p99_ms']} ms, "
+          f"{result['requests_per_sec']} req/s ({result['errors']} errors)")
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--seconds", type=float, default=15.0)
+    parser.add_argument("--seed-emails", type=int, default=2000)
+    parser.add_argument("--jobs-share", type=float, default=0.2, help="Fraction of requests that go to /jobs.")
+    parser.add_argument("--seed", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--json", dest="json_path", help="Also write the results to this file.")
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        seed(args.seed)
+        return
+
+    result = run(args.clients, args.seconds, args.seed_emails, args.jobs_share)
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({"benchmark": "api_latency", "results": result}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
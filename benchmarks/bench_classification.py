@@ -0,0 +1,69 @@
+"""Keyword rule matching: per-keyword regex loop vs. the compiled matcher.
+
+Runs the bundled classification rules over synthetic email texts both ways
+and reports microseconds per email. spaCy is not loaded; only the rule
+matching that every email goes through is timed::
+
+    python -m benchmarks.bench_classification --emails 5000
+"""
+import argparse
+import json
+import os
+import re
+import time
+
+from backend.core.keyword_matcher import KeywordMatcher
+from benchmarks.bench_embedding import synthetic_texts
+
+RULES_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend", "core", "classification_rules.json")
+
+
+def legacy_first_match(rules: dict, text: str):
+    """The matching loop ClassificationService used before the compiled matcher."""
+    for label, keywords in rules.items():
+        if any(re.search(r'\b' + re.escape(kw) + r'\b', text) for kw in keywords):
+            return label
+    return None
+
+
+def run(emails: int) -> dict:
+    with open(RULES_PATH) as rules_file:
+        rules = json.load(rules_file)["general_rules"]
+    texts = [text.lower() for text in synthetic_texts(emails)]
+    matcher = KeywordMatcher(rules)
+
+    started = time.perf_counter()
+    legacy = [legacy_first_match(rules, text) for text in texts]
+    legacy_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    compiled = [matcher.first_match(text) for text in texts]
+    compiled_seconds = time.perf_counter() - started
+
+    if legacy != compiled:
+        raise AssertionError("compiled matcher disagrees with the legacy loop")
+    result = {
+        "emails": len(texts),
+        "legacy_us_per_email": round(legacy_seconds / len(texts) * 1e6, 2),
+        "compiled_us_per_email": round(compiled_seconds / len(texts) * 1e6, 2),
+        "speedup": round(legacy_seconds / compiled_seconds, 1) if compiled_seconds else None,
+    }
+    print(f"legacy   {result['legacy_us_per_email']:8.2f} us/email")
+    print(f"compiled {result['compiled_us_per_email']:8.2f} us/email  ({result['speedup']}x)")
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--emails", type=int, default=5000)
+    parser.add_argument("--json", dest="json_path", help="Also write the results to this file.")
+    args = parser.parse_args()
+
+    result = run(args.emails)
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({"benchmark": "classification", "results": result}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
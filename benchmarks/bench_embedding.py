@@ -0,0 +1,137 @@
+"""Embedding throughput, memory and parity per encoder backend and micro-batch size.
+
+Encodes the same synthetic ``Subject + snippet`` texts the ingestion embed
+stage builds, once per batch size, and reports emails/sec on CPU::
+
+    python -m benchmarks.bench_embedding --emails 2048 --batch-sizes 1 16 64 256
+    python -m benchmarks.bench_embedding --backends torch torch_int8 onnx
+
+Each backend (see ``backend/core/encoders.py``) runs in its own subprocess, so
+the reported resident memory is that backend's alone. When ``torch`` is among
+the backends, every other backend's vectors are compared with its fp32 output
+by cosine similarity, the same check as the parity test in
+``tests/test_encoders.py``.
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+SUBJECTS = [
+    "Your application for {role} at {company}",
+    "Order confirmation #{num}",
+    "Weekly newsletter: {topic}",
+    "Interview invitation - {role}",
+    "Invoice {num} from {company}",
+    "Re: {topic} follow-up",
+]
+WORDS = "please find attached the latest update regarding your account meeting schedule team project review thanks".split()
+
+
+def synthetic_texts(count: int, seed: int = 42) -> list[str]:
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(count):
+        subject = rng.choice(SUBJECTS).format(
+            role=rng.choice(["Software Engineer", "Data Scientist", "PM"]),
+            company=rng.choice(["Acme", "Globex", "Initech"]),
+            num=rng.randint(10000, 99999),
+            topic=rng.choice(["pricing", "roadmap", "hiring", "security"]),
+        )
+        snippet = " ".join(rng.choice(WORDS) for _ in range(rng.randint(15, 40)))
+        texts.append(f"Subject: {subject}\n\n{snippet}")
+    return texts
+
+
+def run(emails: int, batch_sizes: list[int], model_name: str, backend: str, vectors_path: str, parity_texts: int) -> dict:
+    """Runs inside the per-backend subprocess."""
+    from backend.core.encoders import load_encoder
+    from backend.core.model_registry import _rss_mb
+
+    rss_before = _rss_mb()
+    started = time.perf_counter()
+    model = load_encoder(backend, model_name)
+    load_seconds = time.perf_counter() - started
+    rss_loaded = _rss_mb()
+    texts = synthetic_texts(emails)
+    model.encode(texts[:32], batch_size=32)  # warm-up
+    np.save(vectors_path, np.asarray(model.encode(texts[:parity_texts], batch_size=64), dtype=np.float32))
+
+    results = []
+    for batch_size in batch_sizes:
+        started = time.perf_counter()
+        for start in range(0, len(texts), batch_size):
+            model.encode(texts[start:start + batch_size], batch_size=batch_size)
+        elapsed = time.perf_counter() - started
+        results.append({"batch_size": batch_size, "emails": len(texts), "seconds": round(elapsed, 3), "emails_per_sec": round(len(texts) / elapsed, 1)})
+    return {
+        "backend": backend,
+        "load_seconds": round(load_seconds, 2),
+        # Includes importing the backend's runtime (torch, onnxruntime), which is part of its footprint.
+        "load_rss_mb": round(rss_loaded - rss_before, 1),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "results": results,
+    }
+
+
+def run_backends(args: argparse.Namespace) -> list[dict]:
+    scratch = tempfile.mkdtemp(prefix="bench_embedding_")
+    runs, vectors = [], {}
+    for backend in args.backends:
+        vectors_path = os.path.join(scratch, f"{backend}.npy")
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_embedding", "--worker", "--backends", backend, "--vectors", vectors_path,
+             "--emails", str(args.emails), "--batch-sizes", *map(str, args.batch_sizes), "--model", args.model, "--parity-texts", str(args.parity_texts)],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        vectors[backend] = np.load(vectors_path)
+        runs.append(result)
+        throughput = ", ".join(f"batch {r['batch_size']}: {r['emails_per_sec']}/s" for r in result["results"])
+        print(f"{backend:>10}: load {result['load_seconds']}s (+{result['load_rss_mb']} MB, peak RSS {result['peak_rss_mb']} MB); {throughput}")
+
+    if "torch" in vectors:
+        reference = vectors["torch"]
+        for result in runs:
+            if result["backend"] != "torch":
+                other = vectors[result["backend"]]
+                cosine = np.sum(other * reference, axis=1) / (np.linalg.norm(other, axis=1) * np.linalg.norm(reference, axis=1))
+                result["parity"] = {"min_cosine": round(float(cosine.min()), 5), "mean_cosine": round(float(cosine.mean()), 5), "texts": len(cosine)}
+                print(f"{result['backend']:>10}: cosine to torch min {cosine.min():.5f}, mean {cosine.mean():.5f}")
+    for name in os.listdir(scratch):
+        os.remove(os.path.join(scratch, name))
+    os.rmdir(scratch)
+    return runs
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--emails", type=int, default=2048)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 16, 64, 256])
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--backends", nargs="+", default=["torch"], help="EMBEDDING_BACKEND values to compare.")
+    parser.add_argument("--parity-texts", type=int, default=256, help="Texts whose vectors are compared across backends.")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--vectors", help=argparse.SUPPRESS)
+    parser.add_argument("--json", dest="json_path", help="Also write the results to this file.")
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run(args.emails, args.batch_sizes, args.model, args.backends[0], args.vectors, args.parity_texts)))
+        return
+
+    runs = run_backends(args)
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({"benchmark": "embedding", "model": args.model, "backends": runs}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
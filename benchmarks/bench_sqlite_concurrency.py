@@ -0,0 +1,171 @@
+"""Read latency under concurrent ingestion, per SQLite storage profile.
+
+For each profile, a fresh database is seeded and an ingestion writer bulk-inserts
+batches of emails (the persist stage's write pattern) while reader threads call
+``/search`` (keyword mode, so no model is loaded) and ``/jobs`` in a loop.
+Reports read p50/p99 latency, failed reads and writer throughput::
+
+    python -m benchmarks.bench_sqlite_concurrency --seconds 10 --readers 8
+
+Each profile runs in its own subprocess because the engines are built from
+``Settings`` at import time.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from benchmarks.bench_embedding import synthetic_texts
+
+QUERIES = ["invoice", "application", "interview", "order confirmation", "newsletter roadmap", "security"]
+
+
+def email_rows(start: int, count: int, seed: int) -> list[dict]:
+    rng = random.Random(seed)
+    rows = []
+    for i, text in enumerate(synthetic_texts(count, seed=seed), start=start):
+        subject, snippet = text.split("\n\n", 1)
+        rows.append({
+            "id": f"bench-{i:08d}", "thread_id": f"thread-{i // 3:08d}", "label_ids": "INBOX,CATEGORY_PERSONAL",
+            "sender": f"sender{rng.randint(1, 200)}@example.com", "subject": subject[len("Subject: "):], "snippet": snippet[:200],
+            "received_at": datetime(2024, 1, 1, tzinfo=timezone.utc) + timedelta(minutes=i),
+            "category": rng.choice(["General", "Receipt", "Newsletter", "Job Application"]),
+            "job_company": None, "job_status": rng.choice([None, "Applied", "Interview"]), "attachment_count": 0,
+        })
+    return rows
+
+
+def worker(seconds: float, readers: int, seed_emails: int, batch_size: int) -> dict:
+    """Runs inside the subprocess, after SQLITE_PATH/SQLITE_PROFILE are set in the environment."""
+    import logging
+    from fastapi.testclient import TestClient
+
+    from backend.db import crud
+    from backend.db.database import WriterSession
+    from backend.db.migrate import run_migrations
+    from backend.main import app
+
+    run_migrations()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    def insert(rows):
+        db = WriterSession()
+        try:
+            crud.bulk_insert_emails(db, rows, [], bodies={row["id"]: row["snippet"] for row in rows})
+            db.commit()
+        finally:
+            db.close()
+
+    for start in range(0, seed_emails, 500):
+        insert(email_rows(start, min(500, seed_emails - start), seed=start))
+
+    stop = threading.Event()
+    written = [0]
+    write_errors = []
+
+    def write_loop():
+        next_id = seed_emails
+        while not stop.is_set():
+            try:
+                insert(email_rows(next_id, batch_size, seed=next_id))
+                written[0] += batch_size
+            except Exception as e:
+                write_errors.append(str(e))
+            next_id += batch_size
+
+    latencies, read_errors = [], []
+    lock = threading.Lock()
+
+    def read_loop(index: int):
+        client = TestClient(app)
+        rng = random.Random(index)
+        while not stop.is_set():
+            url = f"/api/v1/search/?mode=keyword&query={rng.choice(QUERIES)}" if rng.random() < 0.8 else "/api/v1/jobs/"
+            started = time.perf_counter()
+            try:
+                ok = client.get(url).status_code == 200
+            except Exception:
+                ok = False
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                if not ok:
+                    read_errors.append(url)
+
+    threads = [threading.Thread(target=write_loop)] + [threading.Thread(target=read_loop, args=(i,)) for i in range(readers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "reads": len(latencies),
+        "read_errors": len(read_errors),
+        "read_p50_ms": round(statistics.median(latencies) * 1000, 2) if latencies else None,
+        "read_p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 2) if latencies else None,
+        "reads_per_sec": round(len(latencies) / elapsed, 1),
+        "emails_written": written[0],
+        "writes_per_sec": round(written[0] / elapsed, 1),
+        "write_errors": len(write_errors),
+    }
+
+
+def run(profiles: list[str], seconds: float, readers: int, seed_emails: int, batch_size: int) -> list[dict]:
+    results = []
+    for profile in profiles:
+        # DATABASE_URL is relative to the working directory, so the scratch database lives under it.
+        scratch = tempfile.mkdtemp(prefix="bench_sqlite_", dir=".")
+        try:
+            env = {**os.environ, "SQLITE_PROFILE": profile, "SQLITE_PATH": os.path.join(os.path.basename(scratch), "bench.db"),
+                   "CHROMA_DB_PATH": os.path.join(scratch, "chroma"), "MODEL_WARMUP_ON_STARTUP": "false"}
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_sqlite_concurrency", "--worker", "--seconds", str(seconds),
+                 "--readers", str(readers), "--seed-emails", str(seed_emails), "--batch-size", str(batch_size)],
+                env=env, check=True, capture_output=True, text=True,
+            ).stdout
+            result = {"profile": profile, **json.loads(output.strip().splitlines()[-1])}
+        finally:
+            shutil.rmtree(scratch, ignore_errors=True)
+        results.append(result)
+        print(f"{profile:>8}: reads p50 {result['read_p50_ms']} ms, p99 {result['read_p99_ms']} ms, "
+              f"{result['reads_per_sec']} reads/s ({result['read_errors']} failed); "
+              f"{result['writes_per_sec']} emails/s written ({result['write_errors']} failed)")
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profiles", nargs="+", default=["default", "tuned"])
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--seed-emails", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=64, help="Emails per writer commit, as in the persist stage.")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--json", dest="json_path", help="Also write the results to this file.")
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(worker(args.seconds, args.readers, args.seed_emails, args.batch_size)))
+        return
+
+    results = run(args.profiles, args.seconds, args.readers, args.seed_emails, args.batch_size)
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({"benchmark": "sqlite_concurrency", "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""End-to-end throughput on synthetic mailboxes: ingestion, classification and search.
+
+For each mailbox size, a subprocess gets a scratch database and Chroma directory
+and then:
+
+1. Ingestion. A deterministic synthetic mailbox (see ``synthetic_mailbox.py``) is
+   served through the fake Gmail HTTP layer from ``tests/fake_gmail.py``, with
+   injectable latency and 429s, and fed through ``IngestionService`` (real
+   parsing, models, SQLite and Chroma). The time per step is read from
+   ``backend.core.metrics``.
+2. Classification. ``ClassificationService.classify_emails`` runs over the parsed
+   mailbox in ingestion-sized pages.
+3. Search. ``/search`` is called through the ASGI app in keyword and hybrid mode.
+4. Recall. The closing detail sentences of the mailbox (past the snippet, see
+   ``synthetic_mailbox.DETAIL_TEMPLATES``) are searched for in vector mode, and
+   recall@10 is the share of them that return an email containing the sentence.
+   With ``--chunks`` the mailbox is also indexed as body chunks, and recall is
+   reported with and without them, next to the chunk index size.
+
+Results are written as JSON so runs can be compared, e.g. before a deploy::
+
+    python -m benchmarks.bench_suite --sizes 1000 10000 100000 --json results.json
+    python -m benchmarks.bench_suite --sizes 1000 --compare results.json
+
+Each size runs in its own subprocess because the engines are built from
+``Settings`` at import time.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.bench_sqlite_concurrency import QUERIES
+from benchmarks.synthetic_mailbox import MailboxSpec, body_detail, generate_mailbox
+
+
+def _percentiles(latencies: list[float]) -> dict:
+    latencies = sorted(latencies)
+
+    def at(p: float) -> float:
+        return round(latencies[max(0, int(len(latencies) * p) - 1)] * 1000, 2)
+
+    return {"p50_ms": round(statistics.median(latencies) * 1000, 2), "p95_ms": at(0.95), "p99_ms": at(0.99)}
+
+
+def bench_ingestion(messages: list[dict], latency: float, throttle_rate: float) -> dict:
+    from unittest.mock import patch
+
+    from backend.core.embedding_cache import embedding_cache
+    from backend.core.ingestion_service import ingestion_service
+    from backend.core.metrics import INGESTION_STEP_SECONDS, PIPELINE_STAGE_SECONDS
+    from tests.fake_gmail import FakeGmailHttp, build_fake_gmail_service
+
+    http = FakeGmailHttp(messages, latency=latency, throttle_rate=throttle_rate)
+    with patch("backend.core.ingestion_service.build_google_service", side_effect=lambda creds: build_fake_gmail_service(http)):
+        started = time.perf_counter()
+        ok = ingestion_service.ingest_message_ids("synthetic-credentials", [message["id"] for message in messages])
+        elapsed = time.perf_counter() - started
+    stats = ingestion_service.pipeline_stats()
+    return {
+        "ok": ok,
+        "seconds": round(elapsed, 2),
+        "emails_per_sec": round(len(messages) / elapsed, 1),
+        "stored": stats["stages"]["persist"]["emitted"],
+        "gmail_http_calls": len(http.requests),
+        "gmail_throttled": http.throttled,
+        "embedding_cache_hit_rate": embedding_cache.stats()["hit_rate"],
+        "stage_seconds": {key[1]: round(total, 3) for key, (_, total) in PIPELINE_STAGE_SECONDS.totals().items()},
+        "step_seconds": {key[0]: round(total, 3) for key, (_, total) in INGESTION_STEP_SECONDS.totals().items()},
+    }
+
+
+def parse(messages: list[dict]) -> list:
+    from backend.core.ingestion_service import IngestItem, ingestion_service
+
+    return [ingestion_service._parse_stage(IngestItem(message["id"], tracker=None, email_data=message)) for message in messages]
+
+
+def bench_classification(items: list) -> dict:
+    from backend.core.classification_service import classification_service
+    from backend.core.config import settings
+
+    emails = [(item.subject, item.body_text) for item in items]
+    page = settings.GMAIL_BATCH_SIZE
+    started = time.perf_counter()
+    results = []
+    for start in range(0, len(emails), page):
+        results.extend(classification_service.classify_emails(emails[start:start + page]))
+    elapsed = time.perf_counter() - started
+    return {
+        "seconds": round(elapsed, 2),
+        "emails_per_sec": round(len(emails) / elapsed, 1),
+        "job_applications": sum(result["category"] == "Job Application" for result in results),
+    }
+
+
+def bench_search(searches: int, seed: int) -> dict:
+    import logging
+    from fastapi.testclient import TestClient
+
+    from backend.main import app
+
+    logging.getLogger().setLevel(logging.WARNING)
+    client = TestClient(app)
+    rng = random.Random(seed)
+    results = {}
+    for mode in ("keyword", "hybrid"):
+        latencies, errors = [], 0
+        for _ in range(searches):
+            started = time.perf_counter()
+            response = client.get("/api/v1/search/", params={"query": rng.choice(QUERIES), "mode": mode})
+            latencies.append(time.perf_counter() - started)
+            errors += response.status_code != 200
+        results[mode] = {**_percentiles(latencies), "searches": searches, "errors": errors}
+    return results
+
+
+def bench_recall(items: list, queries: int, seed: int, chunks: bool, k: int = 10) -> dict:
+    from fastapi.testclient import TestClient
+
+    from backend.core.config import settings
+    from backend.main import app
+
+    relevant: dict[str, set] = {}
+    for item in items:
+        detail = body_detail(item.body_text)
+        if detail:
+            relevant.setdefault(detail, set()).add(item.message_id)
+    details = random.Random(seed).sample(sorted(relevant), min(queries, len(relevant)))
+    if not details:
+        return {"queries": 0}
+    client = TestClient(app)
+    results = {"queries": len(details)}
+    for index_name, enabled in [("summary", False)] + ([("chunks", True)] if chunks else []):
+        settings.EMBED_CHUNKS_ENABLED = enabled
+        hits = 0
+        for detail in details:
+            response = client.get("/api/v1/search/", params={"query": detail, "mode": "vector"})
+            found = [result["id"] for result in response.json()["results"][:k]] if response.status_code == 200 else []
+            hits += any(email_id in relevant[detail] for email_id in found)
+        results[f"recall@{k}_{index_name}"] = round(hits / len(details), 3)
+    settings.EMBED_CHUNKS_ENABLED = chunks
+    return results
+
+
+def index_size(chroma_path: str) -> dict:
+    from backend.core.config import settings
+    from backend.core.ingestion_service import ingestion_service
+
+    size = {"email_vectors": ingestion_service.collection.count(),
+            "chroma_bytes": sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(chroma_path) for name in names)}
+    if settings.EMBED_CHUNKS_ENABLED:
+        size["chunk_vectors"] = ingestion_service.chunk_collection.count()
+    return size
+
+
+def worker(spec: MailboxSpec, latency: float, throttle_rate: float, searches: int) -> dict:
+    """Runs inside the subprocess, after SQLITE_PATH/CHROMA_DB_PATH are set in the environment."""
+    from backend.db.migrate import run_migrations
+
+    from backend.core.config import settings
+
+    run_migrations()
+    messages = list(generate_mailbox(spec))
+    items = parse(messages)
+    return {
+        "size": spec.size,
+        "chunks": settings.EMBED_CHUNKS_ENABLED,
+        "ingestion": bench_ingestion(messages, latency, throttle_rate),
+        "index": index_size(settings.CHROMA_DB_PATH),
+        "classification": bench_classification(items),
+        "search": bench_search(searches, spec.seed),
+        "recall": bench_recall(items, searches, spec.seed, settings.EMBED_CHUNKS_ENABLED),
+    }
+
+
+def run(sizes: list[int], args: argparse.Namespace) -> list[dict]:
+    results = []
+    for size in sizes:
+        # DATABASE_URL is relative to the working directory, so the scratch database lives under it.
+        scratch = tempfile.mkdtemp(prefix="bench_suite_", dir=".")
+        try:
+            env = {**os.environ, "SQLITE_PATH": os.path.join(os.path.basename(scratch), "bench.db"),
+                   "CHROMA_DB_PATH": os.path.join(scratch, "chroma"),
+                   "EMBEDDING_CACHE_PATH": os.path.join(scratch, "embedding_cache.db"), "MODEL_WARMUP_ON_STARTUP": "false",
+                   "GMAIL_BATCH_RETRY_BACKOFF": str(args.retry_backoff), "EMBED_CHUNKS_ENABLED": str(args.chunks).lower()}
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_suite", "--worker", "--sizes", str(size), "--seed", str(args.seed),
+                 "--latency-ms", str(args.latency_ms), "--throttle-rate", str(args.throttle_rate),
+                 "--attachment-ratio", str(args.attachment_ratio), "--job-ratio", str(args.job_ratio), "--searches", str(args.searches)],
+                env=env, check=True, capture_output=True, text=True,
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+        finally:
+            shutil.rmtree(scratch, ignore_errors=True)
+        results.append(result)
+        ingestion, classification, search, recall = result["ingestion"], result["classification"], result["search"], result["recall"]
+        print(f"{size:>7} emails: ingest {ingestion['emails_per_sec']} emails/s ({ingestion['gmail_throttled']} throttled), "
+              f"classify {classification['emails_per_sec']} emails/s, "
+              f"search keyword p95 {search['keyword']['p95_ms']} ms, hybrid p95 {search['hybrid']['p95_ms']} ms, "
+              f"recall@10 {recall.get('recall@10_summary')}"
+              + (f" -> {recall.get('recall@10_chunks')} with {result['index']['chunk_vectors']} chunk vectors" if args.chunks else ""))
+    return results
+
+
+def compare(results: list[dict], baseline_path: str) -> None:
+    """Prints each headline number next to the same size's value in a saved run."""
+    with open(baseline_path) as f:
+        baseline = {result["size"]: result for result in json.load(f)["results"]}
+    headline = [
+        ("ingest emails/s", lambda r: r["ingestion"]["emails_per_sec"]),
+        ("classify emails/s", lambda r: r["classification"]["emails_per_sec"]),
+        ("keyword p95 ms", lambda r: r["search"]["keyword"]["p95_ms"]),
+        ("hybrid p95 ms", lambda r: r["search"]["hybrid"]["p95_ms"]),
+        ("recall@10", lambda r: r.get("recall", {}).get("recall@10_chunks" if r.get("chunks") else "recall@10_summary")),
+        ("chroma MB", lambda r: round(r.get("index", {}).get("chroma_bytes", 0) / 1e6, 1)),
+    ]
+    for result in results:
+        before = baseline.get(result["size"])
+        if not before:
+            print(f"{result['size']:>7} emails: no baseline")
+            continue
+        changes = ", ".join(f"{name} {get(before)} -> {get(result)} ({(get(result) / get(before) - 1) * 100:+.1f}%)" for name, get in headline if get(before) and get(result) is not None)
+        print(f"{result['size']:>7} emails: {changes}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Simulated round trip per Gmail HTTP call.")
+    parser.add_argument("--throttle-rate", type=float, default=0.01, help="Share of message fetches answered with 429.")
+    parser.add_argument("--retry-backoff", type=float, default=0.05, help="GMAIL_BATCH_RETRY_BACKOFF for the run, in seconds.")
+    parser.add_argument("--attachment-ratio", type=float, default=0.15)
+    parser.add_argument("--job-ratio", type=float, default=0.1)
+    parser.add_argument("--searches", type=int, default=200, help="Searches per mode, and recall queries.")
+    parser.add_argument("--chunks", action="store_true", help="Also index full bodies as chunks (EMBED_CHUNKS_ENABLED) and report their cost and recall.")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--json", dest="json_path", help="Also write the results to this file.")
+    parser.add_argument("--compare", dest="baseline_path", help="A --json file from an earlier run to compare against.")
+    args = parser.parse_args()
+
+    if args.worker:
+        spec = MailboxSpec(size=args.sizes[0], seed=args.seed, attachment_ratio=args.attachment_ratio, job_ratio=args.job_ratio)
+        print(json.dumps(worker(spec, args.latency_ms / 1000, args.throttle_rate, args.searches)))
+        return
+
+    results = run(args.sizes, args)
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({"benchmark": "suite", "args": {k: v for k, v in vars(args).items() if k not in ("worker", "json_path", "baseline_path")},
+                       "results": results}, f, indent=2)
+    if args.baseline_path:
+        compare(results, args.baseline_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""Deterministic synthetic mailboxes for benchmarks.
+
+``generate_mailbox`` yields Gmail API message resources in ``format=full`` shape,
+the same shape ``tests/fake_gmail.py`` serves, so a mailbox can be fed straight
+through the real ingestion code. The same spec and seed always produce the same
+mailbox::
+
+    messages = list(generate_mailbox(MailboxSpec(size=10_000, job_ratio=0.2)))
+"""
+import base64
+import random
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from typing import Dict, Iterator, List, Optional
+
+# How each message's payload is laid out:
+#   plain        text/plain only
+#   alternative  multipart/alternative with text/plain and text/html
+#   mixed        multipart/mixed wrapping an alternative part, plus attachments
+#   html_only    text/html only
+#   forwarded    multipart/mixed with a short note and the original as message/rfc822
+DEFAULT_MIME_MIX = {"plain": 0.35, "alternative": 0.35, "mixed": 0.15, "html_only": 0.1, "forwarded": 0.05}
+
+COMPANIES = ["Acme Corporation", "Globex", "Initech", "Umbrella Labs", "Stark Industries", "Wayne Enterprises", "Hooli", "Vandelay Imports"]
+ROLES = ["Software Engineer", "Data Scientist", "Product Manager", "Site Reliability Engineer", "ML Engineer"]
+# (subject, body) templates per job status, worded like the mail the classification rules are written for.
+JOB_TEMPLATES = [
+    ("Your application for {role} at {company}", "Thank you for applying. We've received your application for the {role} role at {company} and our recruiting team will review it."),
+    ("Interview invitation - {role}", "{company} would like to invite you to interview for the {role} position. Please share your availability for next steps."),
+    ("{company} coding challenge", "As part of the {role} process at {company}, please complete the coding challenge within five days."),
+    ("Update on your {role} application", "Unfortunately, {company} has decided to move forward with other candidates for the {role} role."),
+    ("Job offer: {role}", "We are delighted to extend an offer of employment for the {role} position at {company}."),
+]
+OTHER_TEMPLATES = [
+    ("Order confirmation #{num}", "Thanks for your order. Your order #{num} has shipped and a receipt is attached."),
+    ("Invoice {num} from {company}", "Please find the billing statement for invoice {num} from {company}."),
+    ("Weekly newsletter: {topic}", "This week in {topic}. View in browser. Unsubscribe at any time."),
+    ("Re: {topic} follow-up", "Following up on the {topic} discussion from our meeting; notes below."),
+    ("Team update on {topic}", "Quick update regarding the {topic} project schedule and review."),
+]
+TOPICS = ["pricing", "roadmap", "hiring", "security", "migration", "budget"]
+# Closing paragraphs with a specific fact, placed after the filler so it is past the 200-character
+# snippet. Each is a search target only the full body contains (see bench_suite's recall check).
+DETAIL_PREFIX = "P.S. "
+DETAIL_TEMPLATES = [
+    "The {topic} offsite has moved to {city} on {weekday}.",
+    "Parking at the {city} office is now on level {level}.",
+    "Please bring your {item} to the {weekday} {topic} session.",
+    "The {city} badge printer is out of order until {weekday}.",
+    "Lunch on {weekday} is catered by a {cuisine} place near the {city} office.",
+]
+DETAIL_VALUES = {
+    "city": ["Lisbon", "Osaka", "Denver", "Nairobi", "Oslo", "Montreal", "Austin", "Melbourne"],
+    "weekday": ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"],
+    "item": ["laptop charger", "passport", "signed NDA", "parking permit", "security token"],
+    "cuisine": ["Ethiopian", "Peruvian", "Korean", "Lebanese", "Sicilian"],
+    "level": ["2", "3", "4", "5"],
+}
+FILLER = "please find the latest update regarding your account meeting schedule team project review thanks".split()
+ATTACHMENTS = [("report.pdf", "application/pdf"), ("invoice.pdf", "application/pdf"), ("photo.jpg", "image/jpeg"), ("notes.docx", "application/vnd.openxmlformats-officedocument.wordprocessingml.document")]
+
+
+@dataclass
+class MailboxSpec:
+    size: int = 1000
+    seed: int = 42
+    # Relative weights of the payload layouts above.
+    mime_mix: Dict[str, float] = field(default_factory=lambda: dict(DEFAULT_MIME_MIX))
+    # Share of messages carrying one to three attachments.
+    attachment_ratio: float = 0.15
+    # Share of messages written as job-application mail.
+    job_ratio: float = 0.1
+    # Share of messages ending with a DETAIL_PREFIX paragraph.
+    detail_ratio: float = 0.3
+    # Average messages per thread.
+    thread_length: float = 2.5
+    start: datetime = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def _b64(text: str) -> str:
+    return base64.urlsafe_b64encode(text.encode()).decode()
+
+def _text_part(mime_type: str, text: str) -> dict:
+    return {"mimeType": mime_type, "filename": "", "headers": [{"name": "Content-Type", "value": f"{mime_type}; charset=UTF-8"}],
+            "body": {"data": _b64(text), "size": len(text)}}
+
+def _html(text: str) -> str:
+    return "<html><body>" + "".join(f"<p>{line}</p>" for line in text.split("\n")) + "</body></html>"
+
+def _attachment_parts(rng: random.Random) -> List[dict]:
+    parts = []
+    for index in range(rng.randint(1, 3)):
+        filename, mime_type = rng.choice(ATTACHMENTS)
+        parts.append({"mimeType": mime_type, "filename": f"{index}-{filename}",
+                      "body": {"attachmentId": f"att-{rng.getrandbits(32):08x}", "size": rng.randint(10_000, 2_000_000)}})
+    return parts
+
+def _payload(rng: random.Random, layout: str, headers: List[dict], body: str, with_attachments: bool) -> dict:
+    if layout == "plain":
+        payload = _text_part("text/plain", body)
+    elif layout == "html_only":
+        payload = _text_part("text/html", _html(body))
+    elif layout == "alternative":
+        payload = {"mimeType": "multipart/alternative", "filename": "", "body": {"size": 0},
+                   "parts": [_text_part("text/plain", body), _text_part("text/html", _html(body))]}
+    elif layout == "mixed":
+        alternative = {"mimeType": "multipart/alternative", "filename": "", "body": {"size": 0},
+                       "parts": [_text_part("text/plain", body), _text_part("text/html", _html(body))]}
+        payload = {"mimeType": "multipart/mixed", "filename": "", "body": {"size": 0}, "parts": [alternative]}
+    elif layout == "forwarded":
+        original = {"mimeType": "message/rfc822", "filename": "", "body": {"size": 0},
+                    "parts": [_text_part("text/plain", body)]}
+        payload = {"mimeType": "multipart/mixed", "filename": "", "body": {"size": 0},
+                   "parts": [_text_part("text/plain", "FYI, see the forwarded message below."), original]}
+    else:
+        raise ValueError(f"Unknown MIME layout {layout!r}")
+
+    if with_attachments:
+        if not payload["mimeType"].startswith("multipart/mixed"):
+            payload = {"mimeType": "multipart/mixed", "filename": "", "body": {"size": 0}, "parts": [payload]}
+        payload["parts"].extend(_attachment_parts(rng))
+    payload["headers"] = headers
+    return payload
+
+
+def body_detail(body_text: str) -> Optional[str]:
+    """The closing detail sentence of a generated body, if it has one."""
+    last = body_text.rstrip().rsplit("\n", 1)[-1]
+    return last[len(DETAIL_PREFIX):] if last.startswith(DETAIL_PREFIX) else None
+
+
+def generate_mailbox(spec: MailboxSpec) -> Iterator[dict]:
+    """Yields ``spec.size`` Gmail message resources, oldest first."""
+    rng = random.Random(spec.seed)
+    layouts, weights = zip(*spec.mime_mix.items())
+    thread_index, thread_remaining, thread_subject = -1, 0, ""
+    for index in range(spec.size):
+        values = {"company": rng.choice(COMPANIES), "role": rng.choice(ROLES), "num": rng.randint(10000, 99999), "topic": rng.choice(TOPICS)}
+        subject, body = rng.choice(JOB_TEMPLATES if rng.random() < spec.job_ratio else OTHER_TEMPLATES)
+        if thread_remaining <= 0:
+            thread_index += 1
+            thread_remaining = max(1, round(rng.expovariate(1 / spec.thread_length)))
+            thread_subject = subject = subject.format(**values)
+        else:
+            subject = f"Re: {thread_subject}"
+        thread_remaining -= 1
+        body = body.format(**values) + "\n\n" + " ".join(rng.choice(FILLER) for _ in range(rng.randint(20, 120)))
+        if rng.random() < spec.detail_ratio:
+            detail_values = {"topic": values["topic"], **{name: rng.choice(options) for name, options in DETAIL_VALUES.items()}}
+            body += "\n\n" + DETAIL_PREFIX + rng.choice(DETAIL_TEMPLATES).format(**detail_values)
+
+        received_at = spec.start + timedelta(minutes=7 * index, seconds=rng.randint(0, 59))
+        sender_company = values["company"].split()[0].lower()
+        headers = [
+            {"name": "Subject", "value": subject},
+            {"name": "From", "value": f"{values['company']} <noreply{rng.randint(1, 50)}@{sender_company}.example>"},
+            {"name": "To", "value": "me@example.com"},
+            {"name": "Date", "value": format_datetime(received_at)},
+        ]
+        layout = rng.choices(layouts, weights)[0]
+        payload = _payload(rng, layout, headers, body, rng.random() < spec.attachment_ratio)
+        yield {
+            "id": f"synth-{spec.seed}-{index:07d}",
+            "threadId": f"synth-thread-{spec.seed}-{thread_index:07d}",
+            "labelIds": ["INBOX", rng.choice(["CATEGORY_PERSONAL", "CATEGORY_UPDATES", "CATEGORY_PROMOTIONS"])],
+            "snippet": body[:200],
+            "internalDate": str(int(received_at.timestamp() * 1000)),
+            "sizeEstimate": len(body) + 500,
+            "payload": payload,
+        }
@@ -26,7 +26,18 @@ document.addEventListener('DOMContentLoaded', () => {
         };
 
         socket.onmessage = (event) => {
-            logOutput.textContent += event.data + '\n';
+            // Each frame is {"records": [{ts, level, logger, message}, ...], "dropped"?: n}
+            const frame = JSON.parse(event.data);
+            let lines = '';
+            if (frame.dropped) {
+                lines += `--- ${frame.dropped} log records dropped (viewer fell behind) ---\n`;
+            }
+            for (const record of frame.records) {
+                const time = new Date(record.ts * 1000).toLocaleTimeString();
+                lines += `${time} - ${record.level} - ${record.logger} - ${record.message}\n`;
+                if (record.exc) lines += record.exc + '\n';
+            }
+            logOutput.textContent += lines;
             logOutput.scrollTop = logOutput.scrollHeight;
         };
 
@@ -0,0 +1,32 @@
+"""Shared database fixtures for tests."""
+import os
+
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool, StaticPool
+
+from backend.db import models
+
+
+def make_test_session_factory():
+    """An in-memory SQLite database with the app schema, shared across sessions."""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    models.Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def make_test_databases(directory: str):
+    """
+    A file-backed database under `directory` with the app schema, returned as a sync
+    session factory (for seeding and assertions) and an async one (for overriding
+    `get_async_db` in API tests). The file lets both engines see the same data.
+    """
+    path = os.path.join(directory, "test.db")
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    models.Base.metadata.create_all(bind=engine)
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=NullPool)
+    return (
+        sessionmaker(autocommit=False, autoflush=False, bind=engine),
+        async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False),
+    )
@@ -0,0 +1,213 @@
+"""A local fake of the Gmail REST API for tests.
+
+``FakeGmailHttp`` stands in for the ``httplib2.Http`` object that
+googleapiclient sends requests through. The service object itself is built
+from the static Gmail discovery document that ships with googleapiclient, so
+request serialization, the batch multipart format and error handling are all
+the real client code paths; only the network is fake.
+
+The benchmarks serve synthetic mailboxes through it too, with ``latency`` and
+``throttle_rate`` standing in for network round trips and Gmail's 429s.
+"""
+import base64
+import json
+import random
+import threading
+import time
+import urllib.parse
+from email.parser import Parser
+from typing import Dict, List, Optional
+
+import googleapiclient.discovery
+import httplib2
+
+BOUNDARY = "fake_gmail_batch_boundary"
+
+
+def make_message(
+    message_id: str,
+    subject: str = "Test Subject",
+    sender: str = "test@example.com",
+    body: str = "Test body",
+    date: str = "Mon, 1 Jan 2024 00:00:00 +0000",
+    thread_id: Optional[str] = None,
+    attachments: Optional[List[str]] = None,
+) -> dict:
+    """Builds a Gmail API message resource in ``format=full`` shape."""
+    parts = [{
+        "mimeType": "text/plain",
+        "filename": "",
+        "body": {"data": base64.urlsafe_b64encode(body.encode()).decode(), "size": len(body)},
+    }]
+    for filename in attachments or []:
+        parts.append({"mimeType": "application/pdf", "filename": filename, "body": {"attachmentId": f"att-{filename}", "size": 1024}})
+    return {
+        "id": message_id,
+        "threadId": thread_id or f"thread-{message_id}",
+        "labelIds": ["INBOX", "CATEGORY_PERSONAL"],
+        "snippet": body[:100],
+        "payload": {
+            "mimeType": "multipart/mixed",
+            "headers": [
+                {"name": "Subject", "value": subject},
+                {"name": "From", "value": sender},
+                {"name": "Date", "value": date},
+            ],
+            "parts": parts,
+        },
+    }
+
+
+class FakeGmailHttp:
+    """
+    Routes googleapiclient HTTP calls to an in-memory mailbox. ``latency`` seconds are
+    slept per HTTP call, and each message fetch (plain or inside a batch) is answered
+    with 429 rateLimitExceeded with probability ``throttle_rate``, from a seeded RNG.
+    """
+
+    def __init__(self, messages: Optional[List[dict]] = None, latency: float = 0.0, throttle_rate: float = 0.0, seed: int = 0):
+        self.messages: Dict[str, dict] = {m["id"]: m for m in messages or []}
+        self.latency = latency
+        self.throttle_rate = throttle_rate
+        self.throttled = 0
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        # Message ID -> list of HTTP statuses to return on the next fetches of it.
+        self.fail_next: Dict[str, List[int]] = {}
+        self.requests: List[str] = []  # every top-level request URI, for assertions
+        self.get_calls = 0
+        # Mailbox history, as users.history.list would report it.
+        self.history_id = 1000
+        self.history: List[dict] = []
+        self.oldest_history_id = self.history_id
+
+    # --- Mailbox mutations (each one is recorded in the history log) ---
+    def add_message(self, message: dict) -> None:
+        self.messages[message["id"]] = message
+        self._record("messagesAdded", {"message": self._summary(message)})
+
+    def delete_message(self, message_id: str) -> None:
+        message = self.messages.pop(message_id)
+        self._record("messagesDeleted", {"message": {"id": message_id, "threadId": message["threadId"]}})
+
+    def set_labels(self, message_id: str, label_ids: List[str]) -> None:
+        message = self.messages[message_id]
+        added = [label for label in label_ids if label not in message["labelIds"]]
+        removed = [label for label in message["labelIds"] if label not in label_ids]
+        message["labelIds"] = list(label_ids)
+        if added:
+            self._record("labelsAdded", {"message": self._summary(message), "labelIds": added})
+        if removed:
+            self._record("labelsRemoved", {"message": self._summary(message), "labelIds": removed})
+
+    def expire_history(self) -> None:
+        """Makes every historyId issued so far too old to list from."""
+        self.oldest_history_id = self.history_id + 1
+
+    def _record(self, kind: str, item: dict) -> None:
+        self.history_id += 1
+        self.history.append({"id": str(self.history_id), kind: [item]})
+
+    @staticmethod
+    def _summary(message: dict) -> dict:
+        return {"id": message["id"], "threadId": message["threadId"], "labelIds": list(message["labelIds"])}
+
+    # --- httplib2.Http interface ---
+    def request(self, uri, method="GET", body=None, headers=None, redirections=5, connection_type=None):
+        self.requests.append(uri)
+        if self.latency:
+            time.sleep(self.latency)
+        parsed = urllib.parse.urlparse(uri)
+        if parsed.path == "/batch":
+            return self._batch(body, headers or {})
+        status, payload = self._route(method, parsed.path, urllib.parse.parse_qs(parsed.query))
+        return self._response(status), json.dumps(payload).encode()
+
+    # --- Routing ---
+    def _route(self, method: str, path: str, query: dict):
+        prefix = "/gmail/v1/users/me/"
+        if not path.startswith(prefix):
+            return 404, {"error": {"code": 404, "message": f"Unknown path {path}"}}
+        resource = path[len(prefix):]
+        if resource == "profile":
+            return 200, {"emailAddress": "me@example.com", "historyId": str(self.history_id), "messagesTotal": len(self.messages)}
+        if resource == "history":
+            return self._list_history(query)
+        if resource == "messages":
+            return 200, self._list_messages(query)
+        if resource.startswith("messages/"):
+            return self._get_message(urllib.parse.unquote(resource.split("/", 1)[1]))
+        return 404, {"error": {"code": 404, "message": f"Unknown resource {resource}"}}
+
+    def _list_messages(self, query: dict) -> dict:
+        ids = list(self.messages)
+        # The one search the app sends; any other query lists the whole mailbox.
+        if query.get("q") == ["category:primary"]:
+            ids = [i for i in ids if "CATEGORY_PERSONAL" in self.messages[i]["labelIds"]]
+        max_results = int(query.get("maxResults", ["100"])[0])
+        start = int(query.get("pageToken", ["0"])[0])
+        page = ids[start:start + max_results]
+        response = {"messages": [{"id": i, "threadId": self.messages[i]["threadId"]} for i in page], "resultSizeEstimate": len(ids)}
+        if start + max_results < len(ids):
+            response["nextPageToken"] = str(start + max_results)
+        return response
+
+    def _list_history(self, query: dict):
+        start = int(query["startHistoryId"][0])
+        if start < self.oldest_history_id:
+            return 404, {"error": {"code": 404, "message": "Requested entity was not found."}}
+        records = [r for r in self.history if int(r["id"]) > start]
+        offset = int(query.get("pageToken", ["0"])[0])
+        max_results = int(query.get("maxResults", ["100"])[0])
+        response = {"history": records[offset:offset + max_results], "historyId": str(self.history_id)}
+        if offset + max_results < len(records):
+            response["nextPageToken"] = str(offset + max_results)
+        return 200, response
+
+    def _get_message(self, message_id: str):
+        self.get_calls += 1
+        failures = self.fail_next.get(message_id)
+        if failures:
+            status = failures.pop(0)
+            return status, {"error": {"code": status, "message": "Injected failure"}}
+        if self.throttle_rate:
+            with self._rng_lock:
+                throttled = self._rng.random() < self.throttle_rate
+            if throttled:
+                self.throttled += 1
+                return 429, {"error": {"code": 429, "message": "User-rate limit exceeded.", "errors": [{"reason": "rateLimitExceeded"}]}}
+        if message_id not in self.messages:
+            return 404, {"error": {"code": 404, "message": "Requested entity was not found."}}
+        return 200, self.messages[message_id]
+
+    # --- Batch endpoint ---
+    def _batch(self, body: str, headers: dict):
+        content_type = headers.get("content-type", "")
+        request = Parser().parsestr(f"content-type: {content_type}\r\n\r\n{body}")
+        parts = []
+        for part in request.get_payload():
+            content_id = part["Content-ID"]
+            request_line = part.get_payload().split("\n", 1)[0]
+            method, target, _ = request_line.split(" ", 2)
+            parsed = urllib.parse.urlparse(target)
+            status, payload = self._route(method, parsed.path, urllib.parse.parse_qs(parsed.query))
+            # The API answers with Content-ID "<response-" + original ID + ">".
+            parts.append(
+                f"--{BOUNDARY}\r\n"
+                "Content-Type: application/http\r\n"
+                f"Content-ID: <response-{content_id[1:-1]}>\r\n\r\n"
+                f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                "Content-Type: application/json; charset=UTF-8\r\n\r\n"
+                f"{json.dumps(payload)}\r\n"
+            )
+        content = "".join(parts) + f"--{BOUNDARY}--\r\n"
+        return self._response(200, f"multipart/mixed; boundary={BOUNDARY}"), content.encode()
+
+    @staticmethod
+    def _response(status: int, content_type: str = "application/json; charset=UTF-8"):
+        return httplib2.Response({"status": status, "content-type": content_type})
+
+
+def build_fake_gmail_service(http: FakeGmailHttp):
+    """Builds a real Gmail service object that talks to ``http`` instead of Google."""
+    return googleapiclient.discovery.build("gmail", "v1", http=http, static_discovery=True)
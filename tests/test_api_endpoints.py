@@ -1,19 +1,43 @@
+import tempfile
 import unittest
+from datetime import datetime, timezone
 from unittest.mock import patch, MagicMock
 from fastapi.testclient import TestClient
+from sqlalchemy import event
 from backend.main import app
+from backend.db import crud
+from backend.db.database import get_async_db
+from tests.db_helpers import make_test_databases
+from tests.test_crud import email_row
+
+def use_test_database(test_case, email_rows, attachment_rows=()):
+    """Seeds a fresh database and routes the API's async sessions to it for one test."""
+    tmp = tempfile.TemporaryDirectory()
+    test_case.addCleanup(tmp.cleanup)
+    session_factory, async_session_factory = make_test_databases(tmp.name)
+    db = session_factory()
+    crud.bulk_insert_emails(db, list(email_rows), list(attachment_rows))
+    db.commit()
+    db.close()
+
+    async def override_get_async_db():
+        async with async_session_factory() as session:
+            yield session
+
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    test_case.addCleanup(app.dependency_overrides.pop, get_async_db, None)
+    test_case.addCleanup(session_factory.kw['bind'].dispose)
+    return async_session_factory.kw['bind']
 
 class TestApiEndpoints(unittest.TestCase):
 
     def setUp(self):
         self.client = TestClient(app)
 
+    @patch('backend.api.search.search_service')
     @patch('backend.api.search.ingestion_service')
-    @patch('backend.api.search.SessionLocal')
-    def test_search_endpoint(self, mock_session_local, mock_ingestion_service):
-        # Setup mocks
-        mock_db_session = MagicMock()
-        mock_session_local.return_value = mock_db_session
+    def test_search_endpoint(self, mock_ingestion_service, mock_search_service):
+        use_test_database(self, [email_row('test_email_id', sender='test@example.com', subject='Test Subject', snippet='Test snippet')])
         mock_collection = MagicMock()
         mock_ingestion_service.collection = mock_collection
 
@@ -23,35 +47,34 @@ class TestApiEndpoints(unittest.TestCase):
             'documents': [['Test snippet']],
             'distances': [[0.1]]
         }
-        # Mock SQLAlchemy response
-        mock_email = MagicMock()
-        mock_email.id = 'test_email_id'
-        mock_email.sender = 'test@example.com'
-        mock_email.subject = 'Test Subject'
-        mock_email.category = 'General'
-        mock_email.attachments = []
-        mock_db_session.query.return_value.filter.return_value.all.return_value = [mock_email]
+        mock_search_service.embed_query.return_value = [0.1, 0.2]
 
         response = self.client.get("/api/v1/search/?query=test")
         self.assertEqual(response.status_code, 200)
+        # The query is embedded with the ingestion encoder, not Chroma's default embedder.
+        self.assertEqual(mock_collection.query.call_args.kwargs['query_embeddings'], [[0.1, 0.2]])
         data = response.json()
         self.assertEqual(data['status'], 'success')
         self.assertEqual(len(data['results']), 1)
         self.assertEqual(data['results'][0]['id'], 'test_email_id')
 
-    @patch('backend.api.jobs.SessionLocal')
-    def test_jobs_endpoint(self, mock_session_local):
-        # Setup mocks
-        mock_db_session = MagicMock()
-        mock_session_local.return_value = mock_db_session
+    @patch('backend.api.search.ingestion_service')
+    def test_keyword_mode_skips_vector_search(self, mock_ingestion_service):
+        use_test_database(self, [
+            email_row('kw_email_id', sender='a@example.com', subject='Order #48213', snippet='Shipped', category='Receipt'),
+            email_row('other_email_id', subject='Lunch'),
+        ])
+
+        response = self.client.get("/api/v1/search/?query=48213&mode=keyword")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r['id'] for r in response.json()['results']], ['kw_email_id'])
+        mock_ingestion_service.collection.query.assert_not_called()
 
-        # Mock SQLAlchemy response
-        mock_email = MagicMock()
-        mock_email.id = 'job_email_id'
-        mock_email.job_company = 'TestCorp'
-        mock_email.subject = 'Job Application'
-        mock_email.job_status = 'Applied'
-        mock_db_session.query.return_value.filter.return_value.all.return_value = [mock_email]
+    def test_jobs_endpoint(self):
+        use_test_database(self, [
+            email_row('job_email_id', job_company='TestCorp', subject='Job Application', job_status='Applied', category='Job Application'),
+            email_row('other_email_id', job_status=None),
+        ])
 
         response = self.client.get("/api/v1/jobs/")
         self.assertEqual(response.status_code, 200)
@@ -59,6 +82,90 @@ class TestApiEndpoints(unittest.TestCase):
         self.assertEqual(data['status'], 'success')
         self.assertEqual(len(data['results']), 1)
         self.assertEqual(data['results'][0]['company'], 'TestCorp')
+        self.assertEqual(data['results'][0]['status'], 'Applied')
+        self.assertEqual(data['results'][0]['latest_email_id'], 'job_email_id')
+        self.assertIsNone(data['next_cursor'])
+
+    def test_jobs_pages_by_cursor_and_filters_by_status(self):
+        use_test_database(self, [
+            email_row(f'job_{i}', job_company=f'Company {i}', category='Job Application',
+                      job_status='Interview' if i % 2 else 'Applied', received_at=datetime(2024, 1, 1 + i, tzinfo=timezone.utc))
+            for i in range(5)
+        ])
+
+        seen, cursor = [], None
+        while True:
+            response = self.client.get("/api/v1/jobs/", params={"limit": 2, **({"cursor": cursor} if cursor else {})})
+            self.assertEqual(response.status_code, 200)
+            seen += [r['latest_email_id'] for r in response.json()['results']]
+            cursor = response.json()['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(seen, ['job_4', 'job_3', 'job_2', 'job_1', 'job_0'])
+
+        response = self.client.get("/api/v1/jobs/", params={"status": "Interview"})
+        self.assertEqual([r['latest_email_id'] for r in response.json()['results']], ['job_3', 'job_1'])
+        self.assertEqual(self.client.get("/api/v1/jobs/", params={"cursor": "not-a-cursor"}).status_code, 400)
+
+    def test_threads_endpoint_pages_by_cursor(self):
+        use_test_database(self, [
+            email_row(f'm{i}', thread_id=f't{i % 3}', sender=f'p{i}@example.com', received_at=datetime(2024, 1, 1 + i, tzinfo=timezone.utc))
+            for i in range(6)
+        ])
+
+        first = self.client.get("/api/v1/threads/", params={"limit": 2}).json()
+        self.assertEqual([t['thread_id'] for t in first['results']], ['t2', 't1'])
+        self.assertEqual(first['results'][0]['message_count'], 2)
+        self.assertEqual(first['results'][0]['participants'], ['p2@example.com', 'p5@example.com'])
+        second = self.client.get("/api/v1/threads/", params={"limit": 2, "cursor": first['next_cursor']}).json()
+        self.assertEqual([t['thread_id'] for t in second['results']], ['t0'])
+        self.assertIsNone(second['next_cursor'])
+
+class TestQueryCounts(unittest.TestCase):
+    """List endpoints must not issue a query per result (e.g. lazy-loading attachments)."""
+
+    def setUp(self):
+        self.client = TestClient(app)
+        self.ids = [f"email_{i}" for i in range(12)]
+        async_engine = use_test_database(
+            self,
+            [email_row(i, subject="quarterly report", category="Job Application", job_status="Applied", attachment_count=1) for i in self.ids],
+            [{"email_id": i, "filename": "report.pdf", "mime_type": "application/pdf", "size": 1} for i in self.ids],
+        )
+
+        engine = async_engine.sync_engine
+        self.selects = []
+
+        def listener(conn, cursor, statement, *args):
+            if statement.lstrip().upper().startswith("SELECT"):
+                self.selects.append(statement)
+
+        event.listen(engine, "before_cursor_execute", listener)
+        self.addCleanup(event.remove, engine, "before_cursor_execute", listener)
+
+        mock_ingestion_service = MagicMock()
+        mock_ingestion_service.collection.query.return_value = {'ids': [self.ids], 'distances': [[0.1] * len(self.ids)]}
+        patchers = [
+            patch('backend.api.search.ingestion_service', mock_ingestion_service),
+            patch('backend.api.search.search_service'),
+        ]
+        for p in patchers:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def test_search_uses_a_fixed_number_of_queries(self):
+        response = self.client.get("/api/v1/search/?query=quarterly report")
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual(len(results), 12)
+        self.assertTrue(all(r['has_attachment'] for r in results))
+        # One FTS query and one enrichment query, however many results there are.
+        self.assertEqual(len(self.selects), 2)
+
+    def test_jobs_uses_one_query(self):
+        response = self.client.get("/api/v1/jobs/")
+        self.assertEqual(len(response.json()['results']), 12)
+        self.assertEqual(len(self.selects), 1)
 
 if __name__ == '__main__':
     unittest.main()
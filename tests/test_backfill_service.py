@@ -0,0 +1,132 @@
+import tempfile
+import threading
+import unittest
+import numpy as np
+from unittest.mock import MagicMock, patch
+from backend.core.backfill_service import BackfillService
+from backend.core.embedding_cache import EmbeddingCache
+from backend.core.ingestion_service import IngestionService
+from backend.core.model_registry import EMAIL_COLLECTION, EMBEDDING_MODEL, ModelRegistry
+from backend.core.pipeline import CompletionTracker
+from backend.core.config import settings
+from backend.db import models
+from tests.db_helpers import make_test_databases, make_test_session_factory
+from tests.fake_gmail import FakeGmailHttp, build_fake_gmail_service, make_message
+
+class RecordingIngestion:
+    """Stands in for the ingestion pipeline and remembers what it stored."""
+    def __init__(self, fail_on=None):
+        self.stored = []
+        self.fail_on = fail_on
+        self.lock = threading.Lock()
+
+    def filter_new_ids(self, message_ids):
+        return list(message_ids)
+
+    def start_pipeline(self, creds, fetch_workers=None):
+        return MagicMock()
+
+    def submit(self, pipeline, message_ids):
+        tracker = CompletionTracker(len(message_ids))
+        if self.fail_on in message_ids:
+            tracker.fail(RuntimeError("store failed"))
+            return tracker
+        with self.lock:
+            self.stored.extend(message_ids)
+        tracker.done(len(message_ids))
+        return tracker
+
+class TestBackfillService(unittest.TestCase):
+
+    def setUp(self):
+        self.fake_http = FakeGmailHttp([make_message(f"msg{i:03d}") for i in range(57)])
+        self.ingestion = RecordingIngestion()
+        session_factory = make_test_session_factory()
+        patchers = [
+            patch('backend.core.backfill_service.SessionLocal', session_factory),
+            patch('backend.core.backfill_service.WriterSession', session_factory),
+            patch('backend.core.backfill_service.get_user_credentials', return_value='dummy_credentials'),
+            patch('backend.core.backfill_service.build_google_service', side_effect=lambda creds: build_fake_gmail_service(self.fake_http)),
+            patch('backend.core.backfill_service.ingestion_service', self.ingestion),
+            patch.multiple(settings, BACKFILL_PAGE_SIZE=10, BACKFILL_CHUNK_SIZE=4),
+        ]
+        for p in patchers:
+            p.start()
+            self.addCleanup(p.stop)
+        self.service = BackfillService()
+
+    def test_walks_every_page(self):
+        result = self.service.run(workers=3)
+        self.assertIsNone(result['error'])
+        self.assertEqual(sorted(self.ingestion.stored), sorted(self.fake_http.messages))
+        self.assertEqual(result['pages'], 6)
+        self.assertEqual(result['checkpoint'], {})
+
+    def test_resumes_from_checkpoint(self):
+        self.ingestion.fail_on = "msg025"
+        result = self.service.run(workers=1)
+        self.assertIsNotNone(result['error'])
+        # Pages 1-2 and the first chunk of page 3 finished before the failing chunk.
+        self.assertEqual(result['checkpoint'], {"page_token": "20", "watermark": "msg023"})
+
+        self.ingestion.fail_on = None
+        self.ingestion.stored = []
+        result = self.service.run(workers=3)
+
+        self.assertIsNone(result['error'])
+        # Nothing up to the watermark is submitted again; chunks that were still in
+        # flight past it are re-submitted and skipped by the pipeline's dedup check.
+        self.assertEqual(sorted(self.ingestion.stored), [f"msg{i:03d}" for i in range(24, 57)])
+        self.assertEqual(result['checkpoint'], {})
+
+    def test_restart_ignores_checkpoint(self):
+        self.service.save_checkpoint({"page_token": "50", "watermark": None})
+        self.service.run(restart=True, workers=2)
+        self.assertEqual(len(self.ingestion.stored), 57)
+
+    # Stage batches the size of a backfill chunk, so no stage waits out its flush timeout.
+    @patch.multiple(settings, GMAIL_BATCH_RETRY_BACKOFF=0, GMAIL_BATCH_SIZE=4, EMBED_BATCH_SIZE=4, PIPELINE_PERSIST_BATCH_SIZE=4)
+    def test_chunk_gmail_keeps_failing_is_not_checkpointed(self):
+        encoder = MagicMock()
+        encoder.encode.side_effect = lambda texts, batch_size: np.zeros((len(texts), 8))
+        registry = ModelRegistry()
+        registry.register(EMBEDDING_MODEL, lambda: encoder)
+        registry.register(EMAIL_COLLECTION, MagicMock)
+        classifier = MagicMock()
+        classifier.classify_emails.side_effect = lambda emails: [{'category': 'General'} for _ in emails]
+        # A file-backed database, so the persist stage and the checkpoint writes each get their own connection.
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        session_factory, _ = make_test_databases(directory.name)
+        patchers = [
+            patch('backend.core.backfill_service.SessionLocal', session_factory),
+            patch('backend.core.backfill_service.WriterSession', session_factory),
+            patch('backend.core.backfill_service.ingestion_service', IngestionService()),
+            patch('backend.core.ingestion_service.SessionLocal', session_factory),
+            patch('backend.core.ingestion_service.WriterSession', session_factory),
+            patch('backend.core.ingestion_service.build_google_service', side_effect=lambda creds: build_fake_gmail_service(self.fake_http)),
+            patch('backend.core.ingestion_service.model_registry', registry),
+            patch('backend.core.ingestion_service.classification_service', classifier),
+            patch('backend.core.ingestion_service.embedding_cache', EmbeddingCache(':memory:', 'test-model', 1000)),
+        ]
+        for p in patchers:
+            p.start()
+            self.addCleanup(p.stop)
+        self.fake_http.fail_next["msg025"] = [503] * (settings.GMAIL_BATCH_MAX_RETRIES + 1)
+
+        result = self.service.run(workers=1)
+
+        self.assertIn("msg025", result['error'])
+        self.assertEqual(result['checkpoint'], {"page_token": "20", "watermark": "msg023"})
+
+        result = self.service.run(workers=3)
+
+        self.assertIsNone(result['error'])
+        db = session_factory()
+        try:
+            self.assertIsNotNone(db.get(models.Email, "msg025"))
+        finally:
+            db.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,21 @@
+import unittest
+from backend.core.chunking import chunk_text
+
+class TestChunkText(unittest.TestCase):
+
+    def test_windows_overlap(self):
+        text = " ".join(f"w{i}" for i in range(10))
+        self.assertEqual(chunk_text(text, max_tokens=4, overlap=1), ["w0 w1 w2 w3", "w3 w4 w5 w6", "w6 w7 w8 w9"])
+
+    def test_short_and_empty_text(self):
+        self.assertEqual(chunk_text("just  a\nfew words", max_tokens=10, overlap=2), ["just a few words"])
+        self.assertEqual(chunk_text("   ", max_tokens=10, overlap=2), [])
+
+    def test_chunks_per_text_are_capped(self):
+        text = " ".join(f"w{i}" for i in range(100))
+        chunks = chunk_text(text, max_tokens=10, overlap=0, max_chunks=3)
+        self.assertEqual(len(chunks), 3)
+        self.assertEqual(chunks[-1].split()[-1], "w29")
+
+if __name__ == '__main__':
+    unittest.main()
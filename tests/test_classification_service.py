@@ -1,5 +1,12 @@
+import json
+import os
+import re
+import tempfile
 import unittest
+from unittest.mock import patch
+import spacy
 from backend.core.classification_service import ClassificationService
+from backend.core.keyword_matcher import KeywordMatcher
 
 class TestClassificationService(unittest.TestCase):
 
@@ -30,15 +37,77 @@ class TestClassificationService(unittest.TestCase):
         result = self.service.classify_email(subject, body)
         self.assertEqual(result['category'], 'General')
 
-    def test_determine_job_status_rejected(self):
-        text = "unfortunately we have decided to move forward with other candidates"
-        status = self.service._determine_job_status(text)
-        self.assertEqual(status, 'Rejected')
+    def test_job_status_rejected(self):
+        subject = "Your application for Software Engineer"
+        body = "Unfortunately we have decided to move forward with other candidates."
+        result = self.service.classify_email(subject, body)
+        self.assertEqual((result['category'], result['status']), ('Job Application', 'Rejected'))
 
     def test_extract_company_name(self):
         doc = self.service.nlp("We are excited to have you interview at Google.")
         company = self.service._extract_company_name(doc)
         self.assertEqual(company, 'Google')
 
+    def test_batch_classification_matches_per_email_path(self):
+        emails = [
+            ("Your application at Stripe", "We've received your application. Next steps: coding challenge."),
+            ("Interview with Acme Corp", "Unfortunately we have decided to go with other candidates."),
+            ("Your order confirmation", "Here is your receipt."),
+            ("Weekly Newsletter", "Unsubscribe at any time."),
+            ("Hello there", "Just wanted to say hi."),
+            ("Application update from Globex", "Thanks for applying via LinkedIn."),
+        ]
+        expected = [self.service.classify_email(subject, body) for subject, body in emails]
+        self.assertEqual(self.service.classify_emails(emails, batch_size=2), expected)
+        self.assertEqual(self.service.classify_emails([]), [])
+
+    def test_trimmed_pipeline_finds_the_same_entities(self):
+        full_nlp = spacy.load("en_core_web_sm")
+        texts = ["We are excited to have you interview at Google.", "Your application to Microsoft via LinkedIn"]
+        for full_doc, trimmed_doc in zip(full_nlp.pipe(texts), self.service.nlp.pipe(texts)):
+            self.assertEqual([(e.text, e.label_) for e in full_doc.ents], [(e.text, e.label_) for e in trimmed_doc.ents])
+
+    def test_rule_priority_is_preserved(self):
+        # Newsletter keywords appear first in the text, but Receipt is the higher-priority rule.
+        result = self.service.classify_email("Daily digest", "Unsubscribe here. Your order confirmation is attached.")
+        self.assertEqual(result['category'], 'Receipt')
+
+    def test_compiled_matcher_matches_per_keyword_regex(self):
+        def legacy(rules, text):
+            for label, keywords in rules.items():
+                if any(re.search(r'\b' + re.escape(kw) + r'\b', text) for kw in keywords):
+                    return label
+            return None
+
+        texts = [
+            "we've received your application for the role",
+            "applications are open",  # "application" is not a whole word here
+            "your invoice and your order",
+            "next steps: coding challenge, then an interview",
+            "unfortunately the job offer was rescinded",
+            "nothing to see",
+            "cv attached; view in browser",
+        ]
+        for rules in (self.service.general_rules, self.service.job_status_rules):
+            matcher = KeywordMatcher(rules)
+            for text in texts:
+                self.assertEqual(matcher.first_match(text), legacy(rules, text), text)
+
+    def test_rules_hot_reload(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "rules.json")
+            rules = {"general_rules": {"Receipt": ["receipt"]}, "job_status_rules": {}, "common_orgs_to_ignore": []}
+            with open(path, "w") as f:
+                json.dump(rules, f)
+            service = ClassificationService(rules_path=path)
+            self.assertEqual(service.classify_email("Hi", "A coupon for you")['category'], 'General')
+
+            rules["general_rules"]["Promotion"] = ["coupon"]
+            with open(path, "w") as f:
+                json.dump(rules, f)
+            os.utime(path, (0, 0))  # force a different mtime even on coarse filesystems
+            with patch('backend.core.classification_service.settings.CLASSIFICATION_RULES_RELOAD_INTERVAL', 0):
+                self.assertEqual(service.classify_email("Hi", "A coupon for you")['category'], 'Promotion')
+
 if __name__ == '__main__':
     unittest.main()
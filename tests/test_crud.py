@@ -0,0 +1,137 @@
+import unittest
+from datetime import datetime, timezone
+from sqlalchemy import event
+from backend.db import crud, models
+from tests.db_helpers import make_test_session_factory
+
+def email_row(email_id, **overrides):
+    row = {
+        "id": email_id, "thread_id": f"thread-{email_id}", "label_ids": "INBOX", "sender": "a@example.com",
+        "subject": "Subject", "snippet": "Snippet", "received_at": datetime(2024, 1, 1, tzinfo=timezone.utc),
+        "category": "General", "job_company": None, "job_status": None,
+    }
+    row.update(overrides)
+    return row
+
+class TestBulkPersistence(unittest.TestCase):
+
+    def setUp(self):
+        self.session_factory = make_test_session_factory()
+        self.db = self.session_factory()
+        self.addCleanup(self.db.close)
+        self.statements = []
+        event.listen(self.db.get_bind(), "before_cursor_execute", self._count)
+        self.addCleanup(event.remove, self.db.get_bind(), "before_cursor_execute", self._count)
+
+    def _count(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def test_bulk_insert_skips_existing_rows(self):
+        crud.bulk_insert_emails(self.db, [email_row("a")], [{"email_id": "a", "filename": "a.pdf", "mime_type": "application/pdf", "size": 1}])
+        self.db.commit()
+
+        inserted = crud.bulk_insert_emails(
+            self.db,
+            [email_row("a", subject="Changed"), email_row("b")],
+            [{"email_id": "a", "filename": "dup.pdf", "mime_type": "application/pdf", "size": 1},
+             {"email_id": "b", "filename": "b.pdf", "mime_type": "application/pdf", "size": 2}],
+        )
+        self.db.commit()
+
+        self.assertEqual(inserted, {"b"})
+        self.assertEqual(self.db.get(models.Email, "a").subject, "Subject")
+        self.assertEqual(sorted(a.filename for a in self.db.query(models.Attachment)), ["a.pdf", "b.pdf"])
+
+    def test_bulk_insert_uses_one_statement_per_table(self):
+        rows = [email_row(f"m{i}") for i in range(100)]
+        attachments = [{"email_id": f"m{i}", "filename": f"{i}.pdf", "mime_type": "application/pdf", "size": 1} for i in range(100)]
+        self.statements.clear()
+        inserted = crud.bulk_insert_emails(self.db, rows, attachments)
+        self.assertEqual(len(inserted), 100)
+        # emails, attachments, the full-text index, and one lookup plus one insert for the thread rollups
+        self.assertEqual(len(self.statements), 5)
+
+    def test_job_applications_follow_the_latest_email(self):
+        def job(email_id, status, d):
+            return email_row(email_id, thread_id="t1", category="Job Application", job_company="Acme ", job_status=status,
+                             received_at=datetime(2024, 1, d, tzinfo=timezone.utc))
+
+        crud.bulk_insert_emails(self.db, [job("interview", "Interview", 5)], [])
+        # An older email arriving later must not overwrite the newer status.
+        crud.bulk_insert_emails(self.db, [job("applied", "Applied", 1), email_row("unrelated", thread_id="t1")], [])
+        self.db.commit()
+
+        application = self.db.query(models.JobApplication).one()
+        self.assertEqual((application.company_key, application.status, application.email_count), ("acme", "Interview", 2))
+        self.assertEqual([e["email_id"] for e in application.timeline], ["applied", "interview"])
+
+        crud.delete_emails(self.db, ["interview"])
+        self.db.commit()
+        self.db.refresh(application)
+        self.assertEqual((application.status, application.latest_email_id, application.email_count), ("Applied", "applied", 1))
+
+        crud.delete_emails(self.db, ["applied"])
+        self.db.commit()
+        self.assertEqual(self.db.query(models.JobApplication).count(), 0)
+
+    def test_thread_rollups_are_maintained(self):
+        def day(d):
+            return datetime(2024, 1, d, tzinfo=timezone.utc)
+
+        crud.bulk_insert_emails(self.db, [email_row("second", thread_id="t1", sender="Bob <Bob@x.com>", subject="Re: Hi", received_at=day(2))], [])
+        crud.bulk_insert_emails(self.db, [
+            email_row("first", thread_id="t1", sender="ann@x.com", subject="Hi", received_at=day(1)),
+            email_row("third", thread_id="t1", sender="ann@x.com", subject="Re: Hi", category="Job Application", job_status="Interview", received_at=day(3)),
+        ], [])
+        self.db.commit()
+
+        thread = self.db.get(models.Thread, "t1")
+        self.assertEqual((thread.message_count, thread.participants), (3, ["ann@x.com", "bob@x.com"]))
+        self.assertEqual((thread.first_received_at, thread.last_received_at), (datetime(2024, 1, 1), datetime(2024, 1, 3)))
+        self.assertEqual((thread.latest_email_id, thread.latest_category, thread.latest_job_status), ("third", "Job Application", "Interview"))
+
+        crud.delete_emails(self.db, ["third", "first"])
+        self.db.commit()
+        self.db.refresh(thread)
+        self.assertEqual((thread.message_count, thread.participants, thread.latest_email_id), (1, ["bob@x.com"], "second"))
+        crud.delete_emails(self.db, ["second"])
+        self.db.commit()
+        self.assertIsNone(self.db.get(models.Thread, "t1"))
+
+    def test_existing_ids_resolved_in_one_query(self):
+        crud.bulk_insert_emails(self.db, [email_row("a"), email_row("c")], [])
+        self.db.commit()
+        self.statements.clear()
+        self.assertEqual(crud.get_existing_email_ids(self.db, ["a", "b", "c", "d"]), {"a", "c"})
+        self.assertEqual(len([s for s in self.statements if s.lstrip().upper().startswith("SELECT")]), 1)
+
+class TestKeywordSearch(unittest.TestCase):
+
+    def setUp(self):
+        self.db = make_test_session_factory()()
+        self.addCleanup(self.db.close)
+        crud.bulk_insert_emails(
+            self.db,
+            [email_row("order", subject="Your order #48213 has shipped", sender="shop@store.example"),
+             email_row("offer", subject="Offer letter", sender="hr@acme.example"),
+             email_row("note", subject="Lunch?", snippet="Are you free")],
+            [],
+            bodies={"offer": "We are delighted to extend an offer from Acme Corporation."},
+        )
+        self.db.commit()
+
+    def test_exact_tokens_match(self):
+        self.assertEqual(crud.keyword_search(self.db, "#48213", 10), ["order"])
+        self.assertEqual(crud.keyword_search(self.db, "hr@acme.example", 10), ["offer"])
+        self.assertEqual(crud.keyword_search(self.db, "acme corporation", 10), ["offer"])
+        self.assertEqual(crud.keyword_search(self.db, "ship", 10), ["order"])  # prefix of the last word
+        self.assertEqual(crud.keyword_search(self.db, '"unbalanced', 10), [])
+        self.assertEqual(crud.keyword_search(self.db, "   ", 10), [])
+
+    def test_deleted_emails_leave_the_index(self):
+        crud.delete_emails(self.db, ["offer"])
+        self.db.commit()
+        self.assertEqual(crud.keyword_search(self.db, "offer", 10), [])
+
+if __name__ == '__main__':
+    unittest.main()
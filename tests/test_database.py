@@ -0,0 +1,63 @@
+import os
+import tempfile
+import threading
+import unittest
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+from backend.db.database import create_reader_engine, create_writer_engine
+
+class TestStorageProfile(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        url = f"sqlite:///{os.path.join(tmp.name, 'test.db')}"
+        self.reader = create_reader_engine(url)
+        self.writer = create_writer_engine(url)
+        self.addCleanup(self.reader.dispose)
+        self.addCleanup(self.writer.dispose)
+        with self.writer.begin() as conn:
+            conn.execute(text("CREATE TABLE counter (id INTEGER PRIMARY KEY, value INTEGER)"))
+            conn.execute(text("INSERT INTO counter VALUES (1, 0)"))
+
+    def test_pragmas_are_applied(self):
+        with self.reader.connect() as conn:
+            self.assertEqual(conn.execute(text("PRAGMA journal_mode")).scalar(), "wal")
+            self.assertEqual(conn.execute(text("PRAGMA synchronous")).scalar(), 1)  # NORMAL
+            self.assertEqual(conn.execute(text("PRAGMA busy_timeout")).scalar(), 5000)
+
+    def test_readers_are_not_blocked_by_an_open_write(self):
+        with self.writer.begin() as write:
+            write.execute(text("UPDATE counter SET value = 1"))
+            with self.reader.connect() as read:
+                # The uncommitted write is invisible, and the read doesn't wait for it.
+                self.assertEqual(read.execute(text("SELECT value FROM counter")).scalar(), 0)
+
+    def test_concurrent_writers_are_serialized(self):
+        WriterSession = sessionmaker(bind=self.writer)
+        errors = []
+
+        def increment():
+            for _ in range(20):
+                db = WriterSession()
+                try:
+                    value = db.execute(text("SELECT value FROM counter")).scalar()
+                    db.execute(text("UPDATE counter SET value = :value"), {"value": value + 1})
+                    db.commit()
+                except Exception as e:
+                    errors.append(e)
+                finally:
+                    db.close()
+
+        threads = [threading.Thread(target=increment) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        with self.reader.connect() as conn:
+            self.assertEqual(conn.execute(text("SELECT value FROM counter")).scalar(), 80)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from unittest.mock import MagicMock
+from backend.core.embedding_cache import EmbeddingCache
+
+def fake_encoder():
+    encoder = MagicMock()
+    encoder.encode.side_effect = lambda texts, batch_size: np.array([[len(text), 1.0] for text in texts], dtype=np.float32)
+    return encoder
+
+class TestEmbeddingCache(unittest.TestCase):
+
+    def setUp(self):
+        self.encoder = fake_encoder()
+        self.cache = EmbeddingCache(':memory:', 'test-model', max_entries=100)
+        self.addCleanup(self.cache.close)
+
+    def test_duplicates_are_encoded_once(self):
+        texts = ["Your receipt", "Your  receipt\n", "Interview invite", "Your receipt"]
+        first = self.cache.encode(self.encoder, texts, batch_size=8)
+        self.encoder.encode.assert_called_once_with(["Your receipt", "Interview invite"], batch_size=2)
+        np.testing.assert_array_equal(first[1], first[0])
+
+        second = self.cache.encode(self.encoder, ["Interview invite"], batch_size=8)
+        self.assertEqual(self.encoder.encode.call_count, 1)
+        np.testing.assert_array_equal(second[0], first[2])
+        self.assertEqual(self.cache.stats()['hits'], 3)
+        self.assertEqual(self.cache.stats()['misses'], 2)
+
+    def test_keys_include_the_model(self):
+        other = EmbeddingCache(':memory:', 'other-model', max_entries=100)
+        self.assertNotEqual(self.cache.key("same text"), other.key("same text"))
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = EmbeddingCache(':memory:', 'test-model', max_entries=2)
+        cache.encode(self.encoder, ["a"], batch_size=8)
+        cache.encode(self.encoder, ["bb"], batch_size=8)
+        cache.encode(self.encoder, ["a"], batch_size=8)
+        cache.encode(self.encoder, ["ccc"], batch_size=8)
+
+        self.assertEqual(cache.stats()['size'], 2)
+        self.assertIsNone(cache.get_many([cache.key("bb")])[0])
+        self.assertIsNotNone(cache.get_many([cache.key("a")])[0])
+
+    def test_entries_survive_a_restart(self):
+        path = os.path.join(tempfile.mkdtemp(), "cache.db")
+        cache = EmbeddingCache(path, 'test-model', max_entries=100)
+        cache.encode(self.encoder, ["persisted"], batch_size=8)
+        cache.close()
+
+        reopened = EmbeddingCache(path, 'test-model', max_entries=100)
+        self.addCleanup(reopened.close)
+        reopened.encode(self.encoder, ["persisted"], batch_size=8)
+        self.assertEqual(self.encoder.encode.call_count, 1)
+        self.assertEqual(reopened.stats()['size'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+from types import SimpleNamespace
+import numpy as np
+from backend.core.config import settings
+from backend.core.encoders import ONNX_BACKEND, TORCH_BACKEND, TORCH_INT8_BACKEND, OnnxEncoder, encoder_id, hub_model_id, load_encoder
+
+def model_is_cached(file_name):
+    try:
+        from huggingface_hub import try_to_load_from_cache
+    except ImportError:
+        return False
+    return isinstance(try_to_load_from_cache(hub_model_id(settings.EMBEDDING_MODEL_NAME), file_name), str)
+
+class FakeTokenizer:
+    """One token per word, padded to the longest text in the batch."""
+    def __call__(self, texts, padding, truncation, max_length, return_tensors):
+        lengths = [min(len(text.split()), max_length) for text in texts]
+        width = max(lengths)
+        ids = np.array([[len(word) for word in text.split()[:width]] + [0] * (width - length) for text, length in zip(texts, lengths)])
+        mask = np.array([[1] * length + [0] * (width - length) for length in lengths])
+        return {"input_ids": ids, "attention_mask": mask}
+
+class FakeSession:
+    """Token embedding = [word length, 1]; padding positions get a huge value that pooling must ignore."""
+    def get_inputs(self):
+        return [SimpleNamespace(name="input_ids"), SimpleNamespace(name="attention_mask"), SimpleNamespace(name="token_type_ids")]
+
+    def get_outputs(self):
+        return [SimpleNamespace(shape=["batch", "sequence", 2])]
+
+    def run(self, output_names, inputs):
+        assert inputs["token_type_ids"].shape == inputs["input_ids"].shape
+        ids = inputs["input_ids"].astype(np.float32)
+        padded = inputs["attention_mask"] == 0
+        return [np.stack([np.where(padded, 1e6, ids), np.where(padded, 1e6, 1.0)], axis=-1)]
+
+class TestOnnxEncoder(unittest.TestCase):
+
+    def test_mean_pooling_skips_padding_and_keeps_input_order(self):
+        encoder = OnnxEncoder(FakeSession(), FakeTokenizer(), normalize=False)
+        vectors = encoder.encode(["ab", "abcd ab abcdef", "a abc"], batch_size=8)
+        np.testing.assert_allclose(vectors, [[2, 1], [4, 1], [2, 1]])
+        np.testing.assert_allclose(encoder.encode("abcd ab abcdef"), [4, 1])
+
+    def test_vectors_are_normalized_like_the_model(self):
+        vectors = OnnxEncoder(FakeSession(), FakeTokenizer()).encode(["abc defg", "a"], batch_size=1)
+        np.testing.assert_allclose(np.linalg.norm(vectors, axis=1), [1.0, 1.0], rtol=1e-6)
+
+class TestBackendSelection(unittest.TestCase):
+
+    def test_unknown_backend_is_rejected(self):
+        with self.assertRaises(ValueError):
+            load_encoder("tensorflow")
+
+    def test_quantized_vectors_are_cached_separately(self):
+        ids = {encoder_id(backend) for backend in (TORCH_BACKEND, TORCH_INT8_BACKEND, ONNX_BACKEND)}
+        self.assertEqual(len(ids), 3)
+        self.assertEqual(encoder_id(TORCH_BACKEND), settings.EMBEDDING_MODEL_NAME)
+
+class TestBackendParity(unittest.TestCase):
+    """The quantized backends must stay in the fp32 model's vector space (needs the model in the local Hugging Face cache)."""
+
+    @classmethod
+    def setUpClass(cls):
+        if not model_is_cached("config.json"):
+            raise unittest.SkipTest(f"{settings.EMBEDDING_MODEL_NAME} is not in the local Hugging Face cache")
+        from benchmarks.bench_embedding import synthetic_texts
+        cls.texts = synthetic_texts(64)
+        cls.reference = load_encoder(TORCH_BACKEND).encode(cls.texts, batch_size=32)
+
+    def assert_parity(self, vectors):
+        cosine = np.sum(vectors * self.reference, axis=1) / (np.linalg.norm(vectors, axis=1) * np.linalg.norm(self.reference, axis=1))
+        self.assertGreater(cosine.min(), 0.99)
+
+    def test_torch_int8(self):
+        self.assert_parity(load_encoder(TORCH_INT8_BACKEND).encode(self.texts, batch_size=32))
+
+    @unittest.skipUnless(model_is_cached(settings.EMBEDDING_ONNX_FILE), "ONNX export not in the local Hugging Face cache")
+    def test_onnx(self):
+        self.assert_parity(load_encoder(ONNX_BACKEND).encode(self.texts, batch_size=32))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import unittest
+from backend.core.gmail_client import HistoryExpiredError, fetch_messages, get_current_history_id, list_history
+from tests.fake_gmail import FakeGmailHttp, build_fake_gmail_service, make_message
+
+class TestGmailBatchFetch(unittest.TestCase):
+
+    def setUp(self):
+        self.http = FakeGmailHttp([make_message(f"msg{i}") for i in range(7)])
+        self.service = build_fake_gmail_service(self.http)
+
+    def test_fetches_all_messages_in_batches(self):
+        ids = [f"msg{i}" for i in range(7)]
+        result = fetch_messages(self.service, ids, batch_size=3, backoff=0)
+        self.assertEqual(sorted(result.messages), sorted(ids))
+        self.assertEqual(result.failed, {})
+        # 7 messages at 3 per call -> 3 HTTP round trips, all to the batch endpoint
+        self.assertEqual(result.http_calls, 3)
+        self.assertTrue(all(uri.endswith("/batch") for uri in self.http.requests))
+        self.assertEqual(result.messages["msg4"]["threadId"], "thread-msg4")
+
+    def test_retries_only_failed_ids(self):
+        self.http.fail_next = {"msg1": [429, 503]}
+        result = fetch_messages(self.service, ["msg0", "msg1", "msg2"], batch_size=10, backoff=0)
+        self.assertIn("msg1", result.messages)
+        self.assertEqual(result.failed, {})
+        # 3 sub-requests on the first round, then msg1 alone on each retry round
+        self.assertEqual(self.http.get_calls, 5)
+        self.assertEqual(result.http_calls, 3)
+
+    def test_permanent_errors_are_not_retried(self):
+        result = fetch_messages(self.service, ["msg0", "missing"], batch_size=10, backoff=0)
+        self.assertIn("msg0", result.messages)
+        self.assertIn("missing", result.failed)
+        self.assertEqual(self.http.get_calls, 2)
+
+    def test_gives_up_after_max_retries(self):
+        self.http.fail_next = {"msg0": [500] * 10}
+        result = fetch_messages(self.service, ["msg0"], max_retries=2, backoff=0)
+        self.assertEqual(result.messages, {})
+        self.assertIn("msg0", result.failed)
+        self.assertEqual(self.http.get_calls, 3)
+
+    def test_batch_size_is_capped_at_gmail_limit(self):
+        self.http.messages = {m["id"]: m for m in (make_message(f"bulk{i}") for i in range(150))}
+        result = fetch_messages(self.service, list(self.http.messages), batch_size=500, backoff=0)
+        self.assertEqual(len(result.messages), 150)
+        self.assertEqual(result.http_calls, 2)
+
+class TestGmailHistory(unittest.TestCase):
+
+    def setUp(self):
+        self.http = FakeGmailHttp([make_message("old")])
+        self.service = build_fake_gmail_service(self.http)
+        self.start = get_current_history_id(self.service)
+
+    def test_collects_net_changes_across_pages(self):
+        self.http.add_message(make_message("a"))
+        self.http.add_message(make_message("b"))
+        self.http.delete_message("b")
+        self.http.set_labels("old", ["INBOX", "STARRED"])
+        changes = list_history(self.service, self.start, page_size=1)
+        self.assertEqual(list(changes.added), ["a"])
+        self.assertEqual(changes.deleted, {"b"})
+        self.assertEqual(changes.label_changes, {"old": ["INBOX", "STARRED"]})
+        self.assertEqual(changes.history_id, str(self.http.history_id))
+
+    def test_no_changes_keeps_history_id(self):
+        changes = list_history(self.service, self.start)
+        self.assertEqual((changes.added, changes.deleted, changes.label_changes), ({}, set(), {}))
+        self.assertEqual(changes.history_id, self.start)
+
+    def test_expired_history_id_raises(self):
+        self.http.expire_history()
+        with self.assertRaises(HistoryExpiredError):
+            list_history(self.service, self.start)
+
+if __name__ == '__main__':
+    unittest.main()
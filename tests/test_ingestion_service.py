@@ -1,68 +1,229 @@
 import unittest
+import numpy as np
 from unittest.mock import MagicMock, patch
-from backend.core.ingestion_service import IngestionService
+from backend.core.ingestion_service import IngestionService, HISTORY_ID_KEY
+from backend.core.model_registry import CHUNK_COLLECTION, EMAIL_COLLECTION, EMBEDDING_MODEL, ModelRegistry
+from backend.db import crud, models
+from backend.core.config import settings
+from backend.core.embedding_cache import EmbeddingCache
+from benchmarks.synthetic_mailbox import MailboxSpec, generate_mailbox
+from tests.db_helpers import make_test_session_factory
+from tests.fake_gmail import FakeGmailHttp, build_fake_gmail_service, make_message
 
 class TestIngestionService(unittest.TestCase):
 
-    @patch('backend.core.ingestion_service.get_user_credentials')
-    @patch('backend.core.ingestion_service.build_google_service')
-    @patch('backend.core.ingestion_service.SessionLocal')
-    @patch('backend.core.ingestion_service.chromadb.PersistentClient')
-    @patch('backend.core.ingestion_service.spacy.load')
-    @patch('backend.core.ingestion_service.SentenceTransformer')
-    @patch('backend.core.ingestion_service.classification_service')
-    def test_fetch_and_process_emails(self, mock_classification_service, mock_sentence_transformer, mock_spacy_load, mock_chromadb, mock_session_local, mock_build_google_service, mock_get_user_credentials):
-        # Setup mocks
-        mock_get_user_credentials.return_value = 'dummy_credentials'
-        mock_google_service = MagicMock()
-        mock_build_google_service.return_value = mock_google_service
-        mock_db_session = MagicMock()
-        mock_session_local.return_value = mock_db_session
-        mock_chroma_client = MagicMock()
-        mock_chromadb.return_value = mock_chroma_client
-        mock_collection = MagicMock()
-        mock_chroma_client.get_or_create_collection.return_value = mock_collection
-
-        # Mock Gmail API response
-        mock_google_service.users().messages().list().execute.return_value = {
-            'messages': [{'id': 'test_email_id'}]
-        }
-        mock_google_service.users().messages().get().execute.return_value = {
-            'id': 'test_email_id',
-            'threadId': 'test_thread_id',
-            'snippet': 'Test snippet',
-            'payload': {
-                'headers': [
-                    {'name': 'Subject', 'value': 'Test Subject'},
-                    {'name': 'From', 'value': 'test@example.com'},
-                    {'name': 'Date', 'value': 'Mon, 1 Jan 2024 00:00:00 +0000'}
-                ],
-                'parts': [
-                    {'mimeType': 'text/plain', 'body': {'data': 'VGVzdCBib2R5'}}
-                ]
-            }
-        }
+    def setUp(self):
+        self.session_factory = make_test_session_factory()
+        self.fake_http = FakeGmailHttp([make_message('test_email_id', thread_id='test_thread_id', body='Test body')])
+        self.mock_collection = MagicMock()
+        self.mock_chunk_collection = MagicMock()
+        self.encoder = MagicMock()
+        self.encoder.encode.side_effect = lambda texts, batch_size: np.zeros((len(texts), 384))
+        registry = ModelRegistry()
+        registry.register(EMBEDDING_MODEL, lambda: self.encoder)
+        registry.register(EMAIL_COLLECTION, lambda: self.mock_collection)
+        registry.register(CHUNK_COLLECTION, lambda: self.mock_chunk_collection)
 
+        patchers = [
+            patch('backend.core.ingestion_service.get_user_credentials', return_value='dummy_credentials'),
+            patch('backend.core.ingestion_service.build_google_service', return_value=build_fake_gmail_service(self.fake_http)),
+            patch('backend.core.ingestion_service.SessionLocal', self.session_factory),
+            patch('backend.core.ingestion_service.WriterSession', self.session_factory),
+            patch('backend.core.ingestion_service.model_registry', registry),
+            patch('backend.core.ingestion_service.embedding_cache', EmbeddingCache(':memory:', 'test-model', 1000)),
+            patch('backend.core.ingestion_service.classification_service'),
+        ]
+        mocks = [p.start() for p in patchers]
+        for p in patchers:
+            self.addCleanup(p.stop)
+
+        mock_classification_service = mocks[-1]
         # Mock classification service response
-        mock_classification_service.classify_email.return_value = {
-            'category': 'General',
-            'company': None,
-            'status': None
-        }
-
-        # Mock the database query to simulate that the email doesn't exist yet
-        mock_db_session.query.return_value.filter.return_value.first.return_value = None
-
-        # Instantiate and run the service
-        ingestion_service = IngestionService()
-        # We also need to mock the get_latest_email_date method to return None
-        ingestion_service.get_latest_email_date = MagicMock(return_value=None)
-        ingestion_service.fetch_and_process_emails(limit=1)
-
-        # Assertions
-        mock_db_session.add.assert_called_once()
-        mock_collection.add.assert_called_once()
-        mock_db_session.commit.assert_called_once()
+        mock_classification_service.classify_emails.side_effect = lambda emails: [
+            {'category': 'General', 'company': None, 'status': None} for _ in emails
+        ]
+        self.service = IngestionService()
+
+    def stored_ids(self):
+        db = self.session_factory()
+        try:
+            return sorted(email.id for email in db.query(models.Email).all())
+        finally:
+            db.close()
+
+    def stored_history_id(self):
+        db = self.session_factory()
+        try:
+            return crud.get_sync_value(db, HISTORY_ID_KEY)
+        finally:
+            db.close()
+
+    def test_fetch_and_process_emails(self):
+        self.service.fetch_and_process_emails(limit=1)
+
+        self.assertEqual(self.stored_ids(), ['test_email_id'])
+        self.mock_collection.add.assert_called_once()
+        # The first run is a full resync that records where history should resume from.
+        self.assertEqual(self.stored_history_id(), str(self.fake_http.history_id))
+
+    def test_embeddings_are_batched(self):
+        for i in range(3):
+            self.fake_http.messages[f'batch_{i}'] = make_message(f'batch_{i}', body=f'Batch body {i}')
+        self.service.vector_model.encode.side_effect = lambda texts, batch_size: np.zeros((len(texts), 384))
+
+        self.service.fetch_and_process_emails(limit=10)
+
+        # One model call and one Chroma write for the whole page instead of one per email.
+        self.service.vector_model.encode.assert_called_once()
+        self.assertEqual(len(self.service.vector_model.encode.call_args.args[0]), 4)
+        self.mock_collection.add.assert_called_once()
+        self.assertEqual(sorted(self.mock_collection.add.call_args.kwargs['ids']), ['batch_0', 'batch_1', 'batch_2', 'test_email_id'])
+
+    @patch.object(settings, 'EMBED_CHUNKS_ENABLED', True)
+    @patch.object(settings, 'EMBED_CHUNK_TOKENS', 4)
+    @patch.object(settings, 'EMBED_CHUNK_OVERLAP', 1)
+    def test_bodies_are_embedded_in_chunks(self):
+        self.fake_http.messages['long'] = make_message('long', body='one two three four five six seven')
+        self.service.vector_model.encode.side_effect = lambda texts, batch_size: np.zeros((len(texts), 384))
+
+        self.service.fetch_and_process_emails(limit=10)
+
+        # The summary vectors and the chunk vectors each take one model call.
+        self.assertEqual(self.service.vector_model.encode.call_count, 2)
+        add = self.mock_chunk_collection.add.call_args.kwargs
+        self.assertEqual(sorted(add['ids']), ['long#0', 'long#1', 'test_email_id#0'])
+        self.assertEqual(sorted((m['email_id'], m['chunk']) for m in add['metadatas']), [('long', 0), ('long', 1), ('test_email_id', 0)])
+
+        self.fake_http.delete_message('long')
+        self.service.fetch_and_process_emails(limit=10)
+        self.mock_chunk_collection.delete.assert_called_once_with(where={"email_id": {"$in": ['long']}})
+
+    def test_attachment_count_is_stored(self):
+        self.fake_http.messages['with_files'] = make_message('with_files', attachments=['a.pdf', 'b.pdf'])
+
+        self.service.fetch_and_process_emails(limit=10)
+
+        db = self.session_factory()
+        try:
+            self.assertEqual(db.get(models.Email, 'with_files').attachment_count, 2)
+            self.assertEqual(db.get(models.Email, 'test_email_id').attachment_count, 0)
+        finally:
+            db.close()
+
+    @patch.object(settings, 'GMAIL_BATCH_RETRY_BACKOFF', 0)
+    @patch.object(settings, 'GMAIL_BATCH_MAX_RETRIES', 8)
+    def test_synthetic_mailbox_survives_throttling(self):
+        messages = list(generate_mailbox(MailboxSpec(size=120, attachment_ratio=0.3)))
+        self.fake_http.messages = {m['id']: m for m in messages}
+        self.fake_http.throttle_rate = 0.1
+        self.service.vector_model.encode.side_effect = lambda texts, batch_size: np.zeros((len(texts), 384))
+
+        self.assertTrue(self.service.ingest_message_ids('dummy_credentials', list(self.fake_http.messages)))
+
+        self.assertGreater(self.fake_http.throttled, 0)
+        db = self.session_factory()
+        try:
+            stored = {email.id: email.attachment_count for email in db.query(models.Email)}
+        finally:
+            db.close()
+        self.assertEqual(stored, {m['id']: sum(bool(part.get('filename')) for part in m['payload'].get('parts', [])) for m in messages})
+
+    @patch.object(settings, 'EMBED_CHUNKS_ENABLED', True)
+    def test_vectors_of_a_rolled_back_group_are_removed(self):
+        with patch('sqlalchemy.orm.Session.commit', side_effect=RuntimeError("disk I/O error")):
+            self.service.fetch_and_process_emails(limit=10)
+
+        self.assertEqual(self.stored_ids(), [])
+        self.mock_collection.add.assert_called_once()
+        self.mock_collection.delete.assert_called_once_with(ids=['test_email_id'])
+        added_chunks = self.mock_chunk_collection.add.call_args.kwargs['ids']
+        self.mock_chunk_collection.delete.assert_called_once_with(ids=added_chunks)
+
+    def test_incremental_sync_uses_history(self):
+        self.service.fetch_and_process_emails(limit=10)
+        self.fake_http.add_message(make_message('new_email_id'))
+        self.fake_http.add_message(make_message('promo_email_id'))
+        self.fake_http.set_labels('promo_email_id', ['INBOX', 'CATEGORY_PROMOTIONS'])
+        self.fake_http.delete_message('test_email_id')
+        self.fake_http.requests.clear()
+
+        self.service.fetch_and_process_emails(limit=10)
+
+        self.assertEqual(self.stored_ids(), ['new_email_id'])
+        self.mock_collection.delete.assert_called_once_with(ids=['test_email_id'])
+        self.assertEqual(self.stored_history_id(), str(self.fake_http.history_id))
+        # Steady state never lists the mailbox; it only reads history and fetches what changed.
+        self.assertFalse(any('/messages?' in uri for uri in self.fake_http.requests))
+
+    @patch.object(settings, 'GMAIL_BATCH_RETRY_BACKOFF', 0)
+    def test_history_cursor_waits_for_messages_gmail_keeps_failing(self):
+        self.service.fetch_and_process_emails(limit=10)
+        cursor = self.stored_history_id()
+        self.fake_http.add_message(make_message('flaky_email_id'))
+        self.fake_http.fail_next['flaky_email_id'] = [503] * (settings.GMAIL_BATCH_MAX_RETRIES + 1)
+
+        self.service.fetch_and_process_emails(limit=10)
+
+        self.assertEqual(self.stored_ids(), ['test_email_id'])
+        self.assertEqual(self.stored_history_id(), cursor)
+
+        # Once Gmail recovers, the next sync picks the message up from the same cursor.
+        self.service.fetch_and_process_emails(limit=10)
+
+        self.assertEqual(self.stored_ids(), ['flaky_email_id', 'test_email_id'])
+        self.assertEqual(self.stored_history_id(), str(self.fake_http.history_id))
+
+    def test_label_changes_are_stored(self):
+        self.service.fetch_and_process_emails(limit=10)
+        self.fake_http.set_labels('test_email_id', ['INBOX', 'CATEGORY_PERSONAL', 'STARRED'])
+
+        self.service.fetch_and_process_emails(limit=10)
+
+        db = self.session_factory()
+        try:
+            self.assertEqual(db.get(models.Email, 'test_email_id').label_ids, 'INBOX,CATEGORY_PERSONAL,STARRED')
+        finally:
+            db.close()
+
+    def test_expired_history_falls_back_to_full_resync(self):
+        self.service.fetch_and_process_emails(limit=10)
+        self.fake_http.messages['late_email_id'] = make_message('late_email_id')
+        self.fake_http.expire_history()
+
+        self.service.fetch_and_process_emails(limit=10)
+
+        self.assertEqual(self.stored_ids(), ['late_email_id', 'test_email_id'])
+        self.assertEqual(self.stored_history_id(), str(self.fake_http.history_id))
+
+    @patch.object(settings, 'BACKFILL_PAGE_SIZE', 20)
+    def test_expired_history_catches_up_on_the_whole_gap(self):
+        stored = ['test_email_id', 'deleted_email_id', 'moved_email_id'] + [f'kept_{i:02d}' for i in range(25)]
+        for message_id in stored[1:]:
+            self.fake_http.add_message(make_message(message_id))
+        self.service.fetch_and_process_emails(limit=50)
+        # In Gmail but never stored; older than everything else, so it is left to the backfill.
+        self.fake_http.messages['older_email_id'] = make_message('older_email_id')
+
+        gap = [f'gap_{i:02d}' for i in range(60)]
+        for message_id in gap:
+            self.fake_http.add_message(make_message(message_id))
+        self.fake_http.delete_message('deleted_email_id')
+        self.fake_http.set_labels('moved_email_id', ['INBOX', 'CATEGORY_PROMOTIONS'])
+        self.fake_http.expire_history()
+        # Gmail lists newest first.
+        order = gap[::-1] + stored + ['older_email_id']
+        self.fake_http.messages = {message_id: self.fake_http.messages[message_id] for message_id in order if message_id in self.fake_http.messages}
+
+        self.service.fetch_and_process_emails(limit=50)
+
+        self.assertEqual(self.stored_ids(), sorted(set(stored + gap) - {'deleted_email_id'}))
+        self.mock_collection.delete.assert_called_once_with(ids=['deleted_email_id'])
+        db = self.session_factory()
+        try:
+            self.assertEqual(db.get(models.Email, 'moved_email_id').label_ids, 'INBOX,CATEGORY_PROMOTIONS')
+        finally:
+            db.close()
+        self.assertEqual(self.stored_history_id(), str(self.fake_http.history_id))
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,109 @@
+import asyncio
+import json
+import unittest
+from backend.api.logger import ConnectionManager, LogFilter
+
+def entry(message, level="INFO", logger="backend"):
+    return {"ts": 0.0, "level": level, "logger": logger, "message": message}
+
+def messages(frame):
+    return [record["message"] for record in json.loads(frame)["records"]]
+
+class FakeWebSocket:
+    def __init__(self, delay=0.0, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.frames = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        if self.fail:
+            raise RuntimeError("connection closed")
+        await asyncio.sleep(self.delay)
+        self.frames.append(text)
+
+class TestLogStream(unittest.TestCase):
+
+    def run_async(self, coro):
+        return asyncio.run(coro)
+
+    def test_records_are_batched_into_frames(self):
+        async def scenario():
+            manager = ConnectionManager(queue_size=100, flush_interval_ms=10, send_timeout=1)
+            viewer = FakeWebSocket()
+            await manager.connect(viewer)
+            for i in range(3):
+                manager.publish(entry(f"record {i}"))
+            manager.flush()
+            await asyncio.sleep(0.01)
+            return viewer, manager
+
+        viewer, manager = self.run_async(scenario())
+        self.assertEqual([messages(frame) for frame in viewer.frames], [["record 0", "record 1", "record 2"]])
+        self.assertEqual(manager.counters["frames_sent"], 1)
+
+    def test_slow_viewer_drops_its_oldest_records_without_delaying_others(self):
+        async def scenario():
+            manager = ConnectionManager(queue_size=5, flush_interval_ms=10, send_timeout=5)
+            slow, fast = FakeWebSocket(delay=0.2), FakeWebSocket()
+            await manager.connect(slow)
+            await manager.connect(fast)
+            manager.publish(entry("first"))
+            manager.flush()  # the slow viewer is now stuck sending "first"
+            for i in range(8):
+                manager.publish(entry(f"r{i}"))
+                manager.flush()
+                await asyncio.sleep(0.005)
+            await asyncio.sleep(0.01)
+            fast_frames = list(fast.frames)
+            await asyncio.sleep(0.25)
+            manager.flush()
+            await asyncio.sleep(0.25)
+            return manager, slow, fast_frames
+
+        manager, slow, fast_frames = self.run_async(scenario())
+        # The fast viewer got everything while the slow one was still on its first frame.
+        self.assertEqual([m for frame in fast_frames for m in messages(frame)], ["first"] + [f"r{i}" for i in range(8)])
+        self.assertEqual(messages(slow.frames[0]), ["first"])
+        self.assertEqual(messages(slow.frames[1]), [f"r{i}" for i in range(3, 8)])
+        self.assertEqual(json.loads(slow.frames[1])["dropped"], 3)
+        self.assertEqual(manager.counters["dropped"], 3)
+
+    def test_dead_viewers_are_removed(self):
+        async def scenario():
+            manager = ConnectionManager(queue_size=10, flush_interval_ms=10, send_timeout=1)
+            dead, live = FakeWebSocket(fail=True), FakeWebSocket()
+            await manager.connect(dead)
+            await manager.connect(live)
+            manager.publish(entry("hello"))
+            manager.flush()
+            await asyncio.sleep(0.01)
+            return manager, live
+
+        manager, live = self.run_async(scenario())
+        self.assertEqual(manager.stats()["clients"], 1)
+        self.assertEqual(manager.counters["disconnected"], 1)
+        self.assertEqual([messages(frame) for frame in live.frames], [["hello"]])
+
+    def test_late_viewer_gets_a_filtered_replay(self):
+        async def scenario():
+            manager = ConnectionManager(queue_size=10, flush_interval_ms=10, send_timeout=1, buffer_size=3)
+            manager.publish(entry("too old"))
+            manager.publish(entry("noise", logger="chromadb.telemetry"))
+            manager.publish(entry("warned", level="WARNING", logger="backend.core"))
+            manager.publish(entry("info", logger="backend.core.ingestion_service"))
+            viewer = FakeWebSocket()
+            await manager.connect(viewer, LogFilter("INFO", ["backend.core"]))
+            manager.publish(entry("debug", level="DEBUG", logger="backend.core"))
+            manager.publish(entry("live", logger="backend.core"))
+            manager.flush()
+            await asyncio.sleep(0.01)
+            return viewer
+
+        viewer = self.run_async(scenario())
+        self.assertEqual([m for frame in viewer.frames for m in messages(frame)], ["warned", "info", "live"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from backend.core.metrics import MetricsRegistry
+from backend.core.pipeline import Pipeline, Stage
+from backend.main import app
+from tests.test_api_endpoints import use_test_database
+from tests.test_crud import email_row
+
+class TestMetricsRegistry(unittest.TestCase):
+
+    def test_histogram_renders_cumulative_buckets(self):
+        registry = MetricsRegistry()
+        latency = registry.histogram("test_seconds", "Test latency.", ("step",), buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.5, 3.0):
+            latency.observe(value, step="encode")
+        registry.counter("test_items_total", "Test items.", ("outcome",)).inc(4, outcome="ok")
+
+        text = registry.render()
+        self.assertIn("# TYPE test_seconds histogram", text)
+        self.assertIn('test_seconds_bucket{step="encode",le="0.1"} 1', text)
+        self.assertIn('test_seconds_bucket{step="encode",le="1"} 3', text)
+        self.assertIn('test_seconds_bucket{step="encode",le="+Inf"} 4', text)
+        self.assertIn('test_seconds_sum{step="encode"} 4.05', text)
+        self.assertIn('test_seconds_count{step="encode"} 4', text)
+        self.assertIn('test_items_total{outcome="ok"} 4', text)
+
+    def test_disabled_registry_records_nothing(self):
+        registry = MetricsRegistry(enabled=False)
+        latency = registry.histogram("test_seconds", "Test latency.")
+        with latency.time():
+            pass
+        self.assertEqual(latency.count(), 0)
+
+class TestMetricsEndpoint(unittest.TestCase):
+
+    @patch('backend.api.search.ingestion_service')
+    def test_pipeline_and_search_series_are_exported(self, mock_ingestion_service):
+        use_test_database(self, [email_row('m1', subject='Quarterly report')])
+        pipeline = Pipeline("metrics-test", [Stage("double", lambda items: [i * 2 for i in items])]).start()
+        pipeline.submit(1)
+        pipeline.close()
+        client = TestClient(app)
+        client.get("/api/v1/search/?query=quarterly&mode=keyword")
+
+        response = client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers["content-type"].startswith("text/plain"))
+        self.assertIn('aperture_pipeline_stage_seconds_count{pipeline="metrics-test",stage="double"} 1', response.text)
+        self.assertIn('aperture_pipeline_stage_items_total{pipeline="metrics-test",stage="double",outcome="emitted"} 1', response.text)
+        self.assertIn('aperture_search_seconds_bucket{mode="keyword",step="keyword",le="+Inf"}', response.text)
+        self.assertIn('aperture_search_requests_total{mode="keyword",outcome="ok"}', response.text)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import base64
+import unittest
+from backend.core.mime import html_to_text, walk_payload
+
+def b64(data):
+    return base64.urlsafe_b64encode(data if isinstance(data, bytes) else data.encode()).decode()
+
+def text_part(mime_type, text, charset="utf-8"):
+    raw = text.encode(charset)
+    return {"mimeType": mime_type, "filename": "", "headers": [{"name": "Content-Type", "value": f'{mime_type}; charset="{charset}"'}],
+            "body": {"data": b64(raw), "size": len(raw)}}
+
+def multipart(subtype, *parts):
+    return {"mimeType": f"multipart/{subtype}", "filename": "", "body": {"size": 0}, "parts": list(parts)}
+
+class TestMimeWalker(unittest.TestCase):
+
+    def test_plain_part_nested_inside_mixed_and_alternative(self):
+        attachment = {"mimeType": "application/pdf", "filename": "resume.pdf", "body": {"attachmentId": "a1", "size": 1234}}
+        payload = multipart("mixed", multipart("alternative", text_part("text/plain", "Hello there"), text_part("text/html", "<p>Hello there</p>")), attachment)
+        content = walk_payload(payload)
+        self.assertEqual(content.body_text, "Hello there")
+        self.assertEqual(content.attachments, [{"filename": "resume.pdf", "mime_type": "application/pdf", "size": 1234}])
+        self.assertFalse(content.truncated)
+
+    def test_single_part_and_html_only_messages(self):
+        self.assertEqual(walk_payload(text_part("text/plain", "Just text")).body_text, "Just text")
+        html = "<html><head><style>p {color: red}</style></head><body><p>Interview&nbsp;on <b>Monday</b></p><div>See you</div></body></html>"
+        self.assertEqual(walk_payload(text_part("text/html", html)).body_text, "Interview on Monday\nSee you")
+
+    def test_forwarded_message_bodies_are_kept_in_order(self):
+        forwarded = {"mimeType": "message/rfc822", "filename": "", "body": {"size": 0}, "parts": [text_part("text/plain", "Original message")]}
+        content = walk_payload(multipart("mixed", text_part("text/plain", "FYI"), forwarded))
+        self.assertEqual(content.body_text, "FYI\n\nOriginal message")
+
+    def test_inline_images_are_not_attachments(self):
+        logo = {"mimeType": "image/png", "filename": "logo.png", "body": {"attachmentId": "i1", "size": 900},
+                "headers": [{"name": "Content-ID", "value": "<logo@example>"}, {"name": "Content-Disposition", "value": "inline"}]}
+        photo = {"mimeType": "image/jpeg", "filename": "photo.jpg", "body": {"attachmentId": "i2", "size": 5000},
+                 "headers": [{"name": "Content-ID", "value": "<photo@example>"}, {"name": "Content-Disposition", "value": "attachment; filename=photo.jpg"}]}
+        content = walk_payload(multipart("mixed", multipart("related", text_part("text/html", '<img src="cid:logo@example">Hi'), logo), photo))
+        self.assertEqual([image["content_id"] for image in content.inline_images], ["logo@example"])
+        self.assertEqual([attachment["filename"] for attachment in content.attachments], ["photo.jpg"])
+
+    def test_giant_bodies_are_capped(self):
+        content = walk_payload(text_part("text/plain", "x" * 100_000), max_body_bytes=1000)
+        self.assertEqual(len(content.body_text), 1000)
+        self.assertTrue(content.truncated)
+        # The budget is shared by every plain part of the message.
+        content = walk_payload(multipart("mixed", text_part("text/plain", "a" * 600), text_part("text/plain", "b" * 600)), max_body_bytes=1000)
+        self.assertEqual(content.body_text, "a" * 600 + "\n\n" + "b" * 400)
+        self.assertTrue(content.truncated)
+
+    def test_declared_charset_is_used(self):
+        self.assertEqual(walk_payload(text_part("text/plain", "Café résumé", charset="iso-8859-1")).body_text, "Café résumé")
+        part = text_part("text/plain", "Plain")
+        part["headers"] = [{"name": "Content-Type", "value": "text/plain; charset=x-unknown"}]
+        self.assertEqual(walk_payload(part).body_text, "Plain")
+
+    def test_html_to_text_drops_scripts(self):
+        self.assertEqual(html_to_text("<script>alert(1)</script><p>Visible</p>"), "Visible")
+
+if __name__ == '__main__':
+    unittest.main()
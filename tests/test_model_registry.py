@@ -0,0 +1,56 @@
+import threading
+import time
+import unittest
+from backend.core.model_registry import ModelRegistry
+
+class TestModelRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.loads = []
+        self.registry = ModelRegistry()
+
+        def slow_loader():
+            self.loads.append('slow')
+            time.sleep(0.05)
+            return object()
+
+        self.registry.register('slow', slow_loader)
+
+    def test_model_is_loaded_lazily_and_once(self):
+        self.assertFalse(self.registry.is_loaded('slow'))
+        self.assertEqual(self.loads, [])
+
+        first = self.registry.get('slow')
+        self.assertIs(self.registry.get('slow'), first)
+        self.assertEqual(self.loads, ['slow'])
+        self.assertIn('load_seconds', self.registry.status()['slow'])
+
+    def test_concurrent_callers_share_one_load(self):
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.registry.get('slow'))) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.loads, ['slow'])
+        self.assertEqual(len({id(model) for model in results}), 1)
+
+    def test_warm_up_survives_a_failing_loader(self):
+        self.registry.register('broken', lambda: 1 / 0)
+        self.registry.warm_up()
+
+        self.assertTrue(self.registry.is_loaded('slow'))
+        self.assertFalse(self.registry.is_loaded('broken'))
+
+    def test_warm_up_leaves_cold_models_for_their_first_use(self):
+        self.registry.register('cold', object, warm=False)
+        self.registry.warm_up()
+
+        self.assertTrue(self.registry.is_loaded('slow'))
+        self.assertFalse(self.registry.is_loaded('cold'))
+        self.registry.get('cold')
+        self.assertTrue(self.registry.is_loaded('cold'))
+
+if __name__ == '__main__':
+    unittest.main()
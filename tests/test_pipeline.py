@@ -0,0 +1,88 @@
+import threading
+import time
+import unittest
+from backend.core.pipeline import CompletionTracker, Pipeline, Stage
+
+class TestPipeline(unittest.TestCase):
+
+    def test_items_flow_through_every_stage(self):
+        results = []
+        lock = threading.Lock()
+
+        def collect(items):
+            with lock:
+                results.extend(items)
+            return items
+
+        pipeline = Pipeline("test", [
+            Stage("split", lambda jobs: [n for job in jobs for n in job], workers=2),
+            Stage("square", lambda items: [n * n for n in items], workers=3),
+            Stage("collect", collect, workers=1, batch_size=10, flush_timeout=0.05),
+        ]).start()
+        for job in ([1, 2], [3], [4, 5, 6]):
+            pipeline.submit(job)
+        pipeline.close()
+
+        self.assertEqual(sorted(results), [1, 4, 9, 16, 25, 36])
+        stats = pipeline.stats()
+        self.assertFalse(stats["running"])
+        self.assertEqual(stats["stages"]["split"]["processed"], 3)
+        self.assertEqual(stats["stages"]["split"]["emitted"], 6)
+        self.assertEqual(stats["stages"]["collect"]["processed"], 6)
+        self.assertEqual(stats["stages"]["collect"]["queue_depth"], 0)
+
+    def test_bounded_queues_apply_backpressure(self):
+        release = threading.Event()
+
+        def slow(items):
+            release.wait()
+            return items
+
+        pipeline = Pipeline("test", [
+            Stage("fast", lambda items: items, workers=1, queue_size=2),
+            Stage("slow", slow, workers=1, queue_size=2),
+        ]).start()
+        submitted = []
+
+        def producer():
+            for i in range(20):
+                pipeline.submit(i)
+                submitted.append(i)
+
+        thread = threading.Thread(target=producer, daemon=True)
+        thread.start()
+        time.sleep(0.2)
+        # 1 item held by each worker plus 2 waiting in each queue: the producer is blocked.
+        self.assertLessEqual(len(submitted), 6)
+        self.assertEqual(pipeline.stats()["stages"]["slow"]["queue_depth"], 2)
+
+        release.set()
+        thread.join()
+        pipeline.close()
+        self.assertEqual(pipeline.stats()["stages"]["slow"]["processed"], 20)
+
+    def test_stage_errors_fail_the_tracker(self):
+        tracker = CompletionTracker(2)
+
+        def explode(items):
+            raise ValueError("boom")
+
+        pipeline = Pipeline("test", [
+            Stage("explode", explode, on_error=lambda items, e: tracker.fail(e)),
+        ]).start()
+        pipeline.submit("item")
+        pipeline.close()
+
+        self.assertIsInstance(tracker.future.exception(), ValueError)
+        self.assertEqual(pipeline.stats()["stages"]["explode"]["errors"], 1)
+
+    def test_tracker_resolves_when_all_items_are_done(self):
+        tracker = CompletionTracker(3)
+        tracker.done(2)
+        self.assertFalse(tracker.future.done())
+        tracker.done()
+        self.assertEqual(tracker.future.result(), 3)
+        self.assertEqual(CompletionTracker(0).future.result(), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+import unittest
+import uuid
+from datetime import datetime, timezone
+import chromadb
+import numpy as np
+from unittest.mock import MagicMock, patch
+from backend.core.model_registry import EMBEDDING_MODEL, ModelRegistry
+from backend.core.search_service import QueryEmbeddingCache, SearchFilters, SearchService, best_chunk_per_email, reciprocal_rank_fusion, vector_metadata
+from backend.db import crud
+from tests.db_helpers import make_test_session_factory
+from tests.test_crud import email_row
+
+class TestQueryEmbeddingCache(unittest.TestCase):
+
+    def setUp(self):
+        self.encoder = MagicMock()
+        self.encoder.encode.side_effect = lambda text: np.full(3, len(text), dtype=float)
+        registry = ModelRegistry()
+        registry.register(EMBEDDING_MODEL, lambda: self.encoder)
+        patcher = patch('backend.core.search_service.model_registry', registry)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.service = SearchService()
+
+    def test_repeat_queries_skip_the_encoder(self):
+        first = self.service.embed_query("Interview  Invites")
+        second = self.service.embed_query("  interview invites ")
+
+        self.assertEqual(first, second)
+        self.encoder.encode.assert_called_once_with("interview invites")
+        self.assertEqual(self.service.query_cache.stats()['hit_rate'], 0.5)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = QueryEmbeddingCache(max_size=2)
+        cache.put("a", [1.0])
+        cache.put("b", [2.0])
+        cache.get("a")
+        cache.put("c", [3.0])
+
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), [1.0])
+        self.assertEqual(cache.stats()['size'], 2)
+
+class TestReciprocalRankFusion(unittest.TestCase):
+
+    def test_items_found_by_both_rankings_rise_to_the_top(self):
+        fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "d"]], k=60)
+
+        self.assertEqual([item_id for item_id, _ in fused], ["c", "a", "b", "d"])
+        self.assertAlmostEqual(fused[0][1], 1 / 63 + 1 / 61)
+
+    def test_single_ranking_keeps_its_order(self):
+        self.assertEqual([item_id for item_id, _ in reciprocal_rank_fusion([["x", "y"]])], ["x", "y"])
+
+class TestChunkCollapsing(unittest.TestCase):
+
+    def test_each_email_is_ranked_by_its_closest_chunk(self):
+        hits = [{"email_id": "b", "chunk": 3}, {"email_id": "a", "chunk": 0}, {"email_id": "b", "chunk": 0}, {"email_id": "c", "chunk": 1}]
+        self.assertEqual(best_chunk_per_email(hits), ["b", "a", "c"])
+
+class TestSearchFilters(unittest.TestCase):
+    """The same filters must select the same emails in Chroma and in the keyword index."""
+
+    EMAILS = [
+        # id, sender, category, received_at, attachment
+        ("jan_receipt", "Shop <Orders@Shop.example>", "Receipt", datetime(2024, 1, 15, tzinfo=timezone.utc), True),
+        ("feb_receipt", "orders@shop.example", "Receipt", datetime(2024, 2, 10, tzinfo=timezone.utc), False),
+        ("feb_offer", "HR <hr@acme.example>", "Job Application", datetime(2024, 2, 20, tzinfo=timezone.utc), True),
+    ]
+
+    def setUp(self):
+        self.db = make_test_session_factory()()
+        self.addCleanup(self.db.close)
+        crud.bulk_insert_emails(
+            self.db,
+            [email_row(i, sender=s, category=c, received_at=r, subject="update", attachment_count=int(a)) for i, s, c, r, a in self.EMAILS],
+            [{"email_id": i, "filename": "f.pdf", "mime_type": "application/pdf", "size": 1} for i, *_, a in self.EMAILS if a],
+        )
+        self.db.commit()
+        self.collection = chromadb.EphemeralClient().get_or_create_collection(name=f"test-{uuid.uuid4().hex}")
+        self.collection.add(
+            ids=[i for i, *_ in self.EMAILS],
+            embeddings=[[1.0, 0.0], [0.9, 0.1], [0.0, 1.0]],
+            metadatas=[vector_metadata(s, "update", c, r, a) for i, s, c, r, a in self.EMAILS],
+        )
+
+    def matches(self, filters):
+        vector = self.collection.query(query_embeddings=[[1.0, 0.0]], n_results=3, where=filters.chroma_where(), include=[])['ids'][0]
+        keyword = crud.keyword_search(self.db, "update", 10, filters.sql_conditions())
+        self.assertEqual(sorted(vector), sorted(keyword))
+        return sorted(keyword)
+
+    def test_no_filters(self):
+        self.assertIsNone(SearchFilters().chroma_where())
+        self.assertEqual(self.matches(SearchFilters()), ["feb_offer", "feb_receipt", "jan_receipt"])
+
+    def test_each_filter(self):
+        self.assertEqual(self.matches(SearchFilters(category="Receipt")), ["feb_receipt", "jan_receipt"])
+        self.assertEqual(self.matches(SearchFilters(sender="orders@shop.example")), ["feb_receipt", "jan_receipt"])
+        self.assertEqual(self.matches(SearchFilters(received_after=datetime(2024, 2, 1))), ["feb_offer", "feb_receipt"])
+        self.assertEqual(self.matches(SearchFilters(received_before=datetime(2024, 2, 1))), ["jan_receipt"])
+        self.assertEqual(self.matches(SearchFilters(has_attachment=False)), ["feb_receipt"])
+
+    def test_sender_wildcards_match_literally(self):
+        self.assertEqual(self.matches(SearchFilters(sender="h_@acme.example")), [])
+        self.assertEqual(self.matches(SearchFilters(sender="%@acme.example")), [])
+
+    def test_combined_filters(self):
+        filters = SearchFilters(category="Receipt", received_after=datetime(2024, 1, 1), received_before=datetime(2024, 2, 1), has_attachment=True)
+        self.assertEqual(self.matches(filters), ["jan_receipt"])
+
+if __name__ == '__main__':
+    unittest.main()